@@ -1,13 +1,36 @@
+import time
+_IMPORT_START = time.perf_counter() # Start-up report counts from here
+
 import pygame
-import random
+import atexit
 import sys
 import os
+import platform
+
+from simulation import (
+    ATE, DIED, DOWN, FOOD_TYPES, FPS_BASE, LEFT, RIGHT, UP,
+    FoodState, GameState, SnakeState,
+)
+# Modules only some features need (autopilot, multiplayer, replay, scores,
+# snapshot, array_renderer) are imported where they are used, to keep start-up short
+from assets import SoundLoader
+from camera import Camera
+from fonts import FontRegistry, TextCache
+from persistence import PersistentStore
+from profiler import FrameProfiler, StartupTimer
+from quality import QualityGovernor
+from renderer import DirtyRectRenderer
+from sprites import gradient_level, sprite_cache
 
 # --- Constants and Configurations ---
 WIDTH = 600
 HEIGHT = 400
 BLOCK_SIZE = 20
-FPS_BASE = 10
+CUBE_DEPTH = 5 # Depth of the 3D effect
+GRID_WIDTH = WIDTH // BLOCK_SIZE
+GRID_HEIGHT = HEIGHT // BLOCK_SIZE
+BOARD_WIDTH = GRID_WIDTH # Board size in cells; a bigger board scrolls with the head,
+BOARD_HEIGHT = GRID_HEIGHT # e.g. 2000 x 2000 for a huge arena
 
 # --- Colors ---
 BLACK = (0, 0, 0)
@@ -29,14 +52,58 @@ FOOD_YELLOW = (220, 180, 40)
 FOOD_BLUE = (60, 140, 210)
 FOOD_PURPLE = (160, 90, 200)
 
+# --- Rendering ---
+RENDER_MODE = "dirty" # "dirty": repaint changed cells only, "full": redraw every frame,
+                      # "array": rasterize the board with NumPy (flat cost at any snake length)
+RENDER_FPS = 0 # Frame cap for drawing and input polling; 0 follows the display refresh rate
+MAX_FRAME_TIME = 0.25 # Longest frame the simulation catches up on, in seconds
+MENU_IDLE_TIMEOUT = 250 # Milliseconds a menu sleeps waiting for input before checking for font updates
+QUALITY_GOVERNOR = True # Drop render quality tiers while drawing can't keep up with the render frame rate
+QUALITY_TIERS = { # Tier name: (sprite look, grid allowed), best first; see quality.py
+    "full": ("cube", True),
+    "flat": ("flat", True),
+    "no_grid": ("flat", False),
+}
+
+# --- Profiling ---
+PROFILE = False # Start with the frame profiler and its overlay on (toggle with F3)
+PROFILE_TRACE_FILE = None # e.g. "trace.json": Chrome trace of every frame, written on exit
+PROFILE_OVERLAY_REFRESH = 15 # Frames between overlay updates
+
+# --- Autopilot ---
+DEMO_EXIT_KEYS = (pygame.K_F2, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN) # End the demo
+
+# --- Multiplayer ---
+MULTIPLAYER_SERVER = None # e.g. ("localhost", 7777): F4 on the main menu joins (python multiplayer.py serve)
+DIRECTION_KEYS = {pygame.K_LEFT: LEFT, pygame.K_RIGHT: RIGHT, pygame.K_UP: UP, pygame.K_DOWN: DOWN}
+
+# --- Save States ---
+SAVE_FILE = "savegame.snks" # Snapshot of the game in progress, offered as Continue on the main menu
+AUTOSAVE_TICKS = 100 # Ticks between autosaves; written in the background
+
+# --- Replays ---
+REPLAY_DIR = None # e.g. "replays": record every game there (play back with replay.py)
+
 # --- Font Sizes ---
 FONT_LARGE = 80
 FONT_MEDIUM = 60
 FONT_NORMAL = 40
 FONT_SMALL = 30
 
-# --- Initialization ---
-pygame.init()
+# --- Start-up ---
+STARTUP_REPORT = False # Print how long each start-up stage took after the first frame
+SOUND_FILES = {
+    "move": os.path.join("assets", "SFX", "snake-hissing-6092.mp3"),
+    "eat": os.path.join("assets", "SFX", "eat-323883.mp3"),
+    "gameover": os.path.join("assets", "SFX", "game-over-retro-video-game-music-soundroll-melody-4-4-00-03.mp3"),
+}
+SOUND_CACHE_DIR = "sfx_cache" # Decoded effects, so later launches skip MP3 decoding; None to disable
+SOUND_CHANNELS = {"move": 1, "eat": 2, "gameover": 1} # Mixer channels reserved per effect
+SOUND_MIN_INTERVAL = {"move": 0.08} # Seconds between two plays of an effect; faster ones are dropped
+
+# Window events after which the screen contents can't be trusted
+WINDOW_EVENTS = (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE, pygame.WINDOWEXPOSED,
+                 pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED, pygame.WINDOWSHOWN)
 
 # --- Asset loading function ---
 def resource_path(relative_path):
@@ -48,161 +115,145 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-# --- High Score Handling ---
-HIGH_SCORE_FILE = "highscore.txt"
+def to_pixels(cell):
+    """Top-left pixel of a (possibly fractional) board cell."""
+    return (round(cell[0] * BLOCK_SIZE), round(cell[1] * BLOCK_SIZE))
+
+# --- Score Handling ---
+SCORE_DB = "scores.db" # SQLite history of every finished game
+HIGH_SCORE_FILE = "highscore.txt" # Older single high score; recorded in SCORE_DB if nothing there beats it
+PLAYER_NAME = "player" # Name runs on this cabinet are recorded under
+CABINET_NAME = platform.node() # Machine runs are recorded as played on
 SETTINGS_FILE = "settings.txt"
+SAVE_INTERVAL = 2.0 # Seconds the background writer waits to batch up changes
 
-class Snake:
+class Snake(SnakeState):
     """Represents the snake."""
-    def __init__(self):
-        self.body = [[WIDTH // 2, HEIGHT // 2]]
-        self.direction = (0, -BLOCK_SIZE) # (x_change, y_change)
-        self.length = 1
-
-    def move(self):
-        """Moves the snake one block in its current direction."""
-        head = self.body[-1]
-        new_head = [head[0] + self.direction[0], head[1] + self.direction[1]]
-        self.body.append(new_head)
-        if len(self.body) > self.length:
-            del self.body[0]
-
-    def grow(self, amount=1):
-        """Increases the length of the snake."""
-        self.length += amount
-
-    def change_direction(self, new_direction):
-        """Changes the snake's direction, preventing 180-degree turns."""
-        if (new_direction[0] != -self.direction[0] or \
-            new_direction[1] != -self.direction[1]):
-            self.direction = new_direction
-            return True
-        return False
-
-    def check_collision(self):
-        """Checks for collision with walls or self."""
-        head = self.body[-1]
-        if head[0] < 0 or head[0] >= WIDTH or head[1] < 0 or head[1] >= HEIGHT:
-            return True # Wall collision
-        if head in self.body[:-1]:
-            return True # Self collision
-        return False
-
-    def draw(self, surface):
-        """Draws the snake on the given surface with a 3D effect."""
-        offset = 5 # Depth of the 3D effect
-
-        # Draw body segments from tail to head so they overlap correctly
-        for i, block_pos in enumerate(self.body):
-            x, y = block_pos[0], block_pos[1]
+    def draw(self, surface, alpha=1.0, camera=None, look="cube"):
+        """Draws the snake on the given surface with a 3D effect.
+
+        ``alpha`` is how far the game is between the last tick and the next
+        one; the tail and head are drawn that far along their last move.
+        With a ``camera`` only the segments in its view are drawn, looked up
+        by cell instead of walking the whole body. ``look`` picks cheaper
+        sprites (see ``sprites.LOOKS``).
+        """
+        count = len(self.body)
+        body_sprites = sprite_cache.body_sprites(BLOCK_SIZE, CUBE_DEPTH, look=look)
+        head_sprite = sprite_cache.get("head", SNAKE_HEAD_COLOR, BLOCK_SIZE, CUBE_DEPTH, look)
+        tail, head = self.interpolated_ends(alpha)
+        if camera is None:
+            place = to_pixels
+            segments = ((i, x, y) for i, (x, y) in enumerate(self.body))
+        else:
+            place = camera.to_screen
+            segments = self.segments_in(*camera.visible_cells(CUBE_DEPTH))
 
-            # Define colors
-            if i == len(self.body) - 1:
-                # Head colors
-                top_color = SNAKE_HEAD_COLOR
-                side_color_1 = (top_color[0], max(0, top_color[1] - 40), max(0, top_color[2] - 20))
-                side_color_2 = (top_color[0], max(0, top_color[1] - 80), max(0, top_color[2] - 40))
-            else:
-                # Body colors with gradient
-                progress = i / max(len(self.body) - 1, 1) if len(self.body) > 1 else 1
-                g = 120 + int(60 * progress)
-                top_color = (20, g, 90)
-                side_color_1 = (top_color[0], max(0, top_color[1] - 30), max(0, top_color[2] - 20))
-                side_color_2 = (top_color[0], max(0, top_color[1] - 60), max(0, top_color[2] - 40))
-
-            # Points for the cube faces
-            top_face_pts = [(x, y), (x + BLOCK_SIZE, y), (x + BLOCK_SIZE, y + BLOCK_SIZE), (x, y + BLOCK_SIZE)]
-            right_face_pts = [(x + BLOCK_SIZE, y), (x + BLOCK_SIZE + offset, y + offset), (x + BLOCK_SIZE + offset, y + BLOCK_SIZE + offset), (x + BLOCK_SIZE, y + BLOCK_SIZE)]
-            bottom_face_pts = [(x, y + BLOCK_SIZE), (x + BLOCK_SIZE, y + BLOCK_SIZE), (x + BLOCK_SIZE + offset, y + BLOCK_SIZE + offset), (x + offset, y + BLOCK_SIZE + offset)]
-
-            # Draw the side faces first
-            pygame.draw.polygon(surface, side_color_2, bottom_face_pts)
-            pygame.draw.polygon(surface, side_color_1, right_face_pts)
-            
-            # Draw the top face
-            pygame.draw.polygon(surface, top_color, top_face_pts)
-            
-            # Draw a subtle highlight on the top-left edge
-            highlight_color = tuple(min(255, c + 50) for c in top_color)
-            pygame.draw.line(surface, highlight_color, (x + 2, y + 2), (x + BLOCK_SIZE - 2, y + 2), 2)
-            pygame.draw.line(surface, highlight_color, (x + 2, y + 2), (x + 2, y + BLOCK_SIZE - 2), 2)
+        # Blit body segments from tail to head so they overlap correctly
+        blits = []
+        if tail is not None:
+            blits.append((body_sprites[0], place(tail)))
+        for i, x, y in segments:
+            if i < count - 1:
+                blits.append((body_sprites[gradient_level(i, count)], place((x, y))))
+        blits.append((head_sprite, place(head)))
+        surface.blits(blits, doreturn=False)
 
 
-class Food:
+class Food(FoodState):
     """Represents the food."""
     TYPES = {
-        "normal": {"color": FOOD_RED, "power": 1},
-        "speed": {"color": FOOD_YELLOW, "power": 1, "effect": "speed_up", "duration": 200, "boost": 7},
-        "growth": {"color": FOOD_PURPLE, "power": 3},
-        "slow": {"color": FOOD_BLUE, "power": 1, "effect": "slow_down", "duration": 300, "boost": -5},
+        "normal": {"color": FOOD_RED, **FOOD_TYPES["normal"]},
+        "speed": {"color": FOOD_YELLOW, **FOOD_TYPES["speed"]},
+        "growth": {"color": FOOD_PURPLE, **FOOD_TYPES["growth"]},
+        "slow": {"color": FOOD_BLUE, **FOOD_TYPES["slow"]},
     }
 
-    def __init__(self):
-        self.respawn()
-
-    def respawn(self):
-        """Respawns the food at a new random location and type."""
-        self.type = random.choice(list(self.TYPES.keys()))
-        self.position = (random.randrange(0, WIDTH, BLOCK_SIZE),
-                         random.randrange(0, HEIGHT, BLOCK_SIZE))
-        self.properties = self.TYPES[self.type]
-
-    def draw(self, surface):
+    def draw(self, surface, camera=None, look="cube"):
         """Draws the food on the given surface with a 3D effect."""
-        offset = 5 # Depth of the 3D effect
-        x, y = self.position[0], self.position[1]
-        
-        top_color = self.properties["color"]
-        # Create darker and lighter versions for 3D effect
-        side_color_1 = tuple(max(0, c - 30) for c in top_color)
-        side_color_2 = tuple(max(0, c - 60) for c in top_color)
-        highlight_color = tuple(min(255, c + 60) for c in top_color)
-
-        # Points for the cube faces
-        top_face_pts = [(x, y), (x + BLOCK_SIZE, y), (x + BLOCK_SIZE, y + BLOCK_SIZE), (x, y + BLOCK_SIZE)]
-        right_face_pts = [(x + BLOCK_SIZE, y), (x + BLOCK_SIZE + offset, y + offset), (x + BLOCK_SIZE + offset, y + BLOCK_SIZE + offset), (x + BLOCK_SIZE, y + BLOCK_SIZE)]
-        bottom_face_pts = [(x, y + BLOCK_SIZE), (x + BLOCK_SIZE, y + BLOCK_SIZE), (x + BLOCK_SIZE + offset, y + BLOCK_SIZE + offset), (x + offset, y + BLOCK_SIZE + offset)]
-
-        # Draw the side faces first
-        pygame.draw.polygon(surface, side_color_2, bottom_face_pts)
-        pygame.draw.polygon(surface, side_color_1, right_face_pts)
-        
-        # Draw the top face
-        pygame.draw.polygon(surface, top_color, top_face_pts)
-        
-        # Draw a subtle highlight on the top-left edge
-        pygame.draw.line(surface, highlight_color, (x + 2, y + 2), (x + BLOCK_SIZE - 2, y + 2), 2)
-        pygame.draw.line(surface, highlight_color, (x + 2, y + 2), (x + 2, y + BLOCK_SIZE - 2), 2)
+        if self.position is None:
+            return # The board is full
+        sprite = sprite_cache.get("food", self.properties["color"], BLOCK_SIZE, CUBE_DEPTH, look)
+        surface.blit(sprite, to_pixels(self.position) if camera is None else camera.to_screen(self.position))
 
 
 class Game:
     """Manages the main game loop and states."""
     def __init__(self):
+        self.startup = StartupTimer(start=_IMPORT_START)
+        self.startup.mark("import")
         pygame.init()
+        self.startup.mark("pygame_init")
+        self.sounds = SoundLoader({name: resource_path(path) for name, path in SOUND_FILES.items()},
+                                  SOUND_CACHE_DIR, SOUND_CHANNELS, SOUND_MIN_INTERVAL)
+        self.sounds.start() # Decodes on a worker thread; silent until done
+        self.fonts = FontRegistry()
+        self.fonts.start_discovery() # Named fonts use the default font until this is done
+        self.text_cache = TextCache(self.fonts)
+        self.startup.mark("loaders_started")
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Snake Game")
-        pygame.display.set_icon(self._create_icon())
+        self.startup.mark("display")
+        self._icon_generation = None
+        self._update_icon()
+        self.startup.mark("icon")
         self.clock = pygame.time.Clock()
+        self.render_fps = RENDER_FPS or self._display_refresh_rate()
+        self.accumulator = 0.0 # Game time not yet consumed by simulation ticks
+        self.profiler = FrameProfiler(trace_path=PROFILE_TRACE_FILE)
+        self._profiler_panel = None
+        if PROFILE:
+            self.profiler.enable()
+        if PROFILE_TRACE_FILE:
+            atexit.register(self.profiler.dump_trace)
+        atexit.register(self._finish_replay)
+        self.store = PersistentStore(SAVE_INTERVAL)
+        self.store.start()
+        atexit.register(self.store.close) # Writes anything still pending on quit
+        self.scores = None # Opened by _score_store when the first game starts
+        self._run_ticket = None # Matches scores.standing once the last run has been ranked
+        self.renderer = DirtyRectRenderer((WIDTH, HEIGHT), BLOCK_SIZE, CUBE_DEPTH, BG_COLOR, GRID_COLOR, SNAKE_HEAD_COLOR)
+        self.camera = Camera(WIDTH, HEIGHT, BLOCK_SIZE, BOARD_WIDTH, BOARD_HEIGHT)
+        self._set_render_mode(RENDER_MODE)
+        self.quality = QualityGovernor(tuple(QUALITY_TIERS)) # Render quality tier; stats() for telemetry
         self.game_state = "SPLASH" # SPLASH, PLAYING, PAUSED, GAME_OVER, SETTINGS
         self.previous_game_state = "SPLASH"
-        self.score = 0
-        self.high_score = self._load_high_score()
-        self.speed_boost_timer = 0
-        self.speed_boost_amount = 0
+        self.state = self._new_state()
+        self.autopilot = None # Steers the snake in attract mode (F2)
+        self.online = None # Connection to a multiplayer server (F4)
+        self.online_camera = None
+        self._save_available = os.path.exists(SAVE_FILE)
+        self.high_score = 0 # Read from the score store along with opening it
         self.settings = self._load_settings()
         self.selected_button_index = 0
-        self._load_assets()
+        self._menu_view = None # What the menu on screen shows; it is redrawn when this changes
+        self._backdrop = pygame.Surface((WIDTH, HEIGHT)) # Last board frame, under the pause and game-over menus
+        self._overlays = {} # Dimming overlays by alpha
+        self._buttons = {} # Button surfaces by text, size and highlight
         self._apply_settings()
+        self.startup.mark("state_and_settings")
 
-    def _load_assets(self):
-        """Loads all game assets like sounds and fonts."""
+    def _display_refresh_rate(self):
+        """Refresh rate of the desktop, or 60 when it can't be queried."""
         try:
-            self.move_sound = pygame.mixer.Sound(resource_path(os.path.join("assets", "SFX", "snake-hissing-6092.mp3")))
-            self.eat_sound = pygame.mixer.Sound(resource_path(os.path.join("assets", "SFX", "eat-323883.mp3")))
-            self.gameover_sound = pygame.mixer.Sound(resource_path(os.path.join("assets", "SFX", "game-over-retro-video-game-music-soundroll-melody-4-4-00-03.mp3")))
-        except pygame.error as e:
-            print(f"Can't load sound: {e}")
-            self.move_sound = self.eat_sound = self.gameover_sound = None
+            rates = pygame.display.get_desktop_refresh_rates()
+        except (AttributeError, pygame.error):
+            rates = []
+        return rates[0] if rates and rates[0] > 0 else 60
+
+    def _set_render_mode(self, mode):
+        """Switches the board renderer to one of the RENDER_MODE choices."""
+        self.render_mode = mode
+        self.array_renderer = None
+        if mode == "array":
+            try:
+                from array_renderer import ArrayRenderer
+                self.array_renderer = ArrayRenderer(BLOCK_SIZE, CUBE_DEPTH, BG_COLOR, GRID_COLOR, SNAKE_HEAD_COLOR,
+                                                    {name: food["color"] for name, food in Food.TYPES.items()})
+            except ImportError as e:
+                print(f"{e}; using the dirty-rect renderer")
+                self.render_mode = "dirty"
+        self.renderer.invalidate()
 
     def _load_settings(self):
         """Loads settings from a file."""
@@ -223,36 +274,16 @@ class Game:
             return defaults
 
     def _save_settings(self):
-        """Saves the current settings to a file."""
-        with open(SETTINGS_FILE, 'w') as f:
-            for key, value in self.settings.items():
-                f.write(f"{key}={value}\n")
-
-    def _load_high_score(self):
-        """Loads the high score from a file."""
-        if not os.path.exists(HIGH_SCORE_FILE):
-            return 0
-        try:
-            with open(HIGH_SCORE_FILE, 'r') as f:
-                return int(f.read().strip())
-        except (IOError, ValueError):
-            return 0
-
-    def _save_high_score(self):
-        """Saves the high score to a file."""
-        with open(HIGH_SCORE_FILE, 'w') as f:
-            f.write(str(self.high_score))
+        """Queues the current settings to be written to a file."""
+        self.store.save(SETTINGS_FILE, "".join(f"{key}={value}\n" for key, value in self.settings.items()))
 
     def _create_icon(self):
         """Creates a 32x32 surface with a sleek, abstract 'S' for the window icon."""
         icon_surface = pygame.Surface((32, 32), pygame.SRCALPHA)
         icon_surface.fill(BG_COLOR)
 
-        try:
-            # Use a bold, blocky font for a modern look
-            font = pygame.font.SysFont('Arial Black', 38, bold=True)
-        except pygame.error:
-            font = pygame.font.SysFont(None, 42, bold=True)
+        # Use a bold, blocky font for a modern look
+        font = self.fonts.get('Arial Black', 38, bold=True)
 
         # Render a stylized 'S'
         s_shadow = font.render("S", True, (0, 80, 40))
@@ -263,16 +294,26 @@ class Game:
         
         return icon_surface
 
+    def _update_icon(self):
+        """Sets the window icon, again once the real fonts are available."""
+        if self._icon_generation != self.fonts.generation:
+            self._icon_generation = self.fonts.generation
+            pygame.display.set_icon(self._create_icon())
+
     def _apply_settings(self):
         """Applies the current settings, e.g., sound volume."""
-        if self.move_sound: self.move_sound.set_volume(self.settings['volume'])
-        if self.eat_sound: self.eat_sound.set_volume(self.settings['volume'])
-        if self.gameover_sound: self.gameover_sound.set_volume(self.settings['volume'])
-
-    def _draw_text(self, text, size, color, x, y, align="topleft"):
-        """Helper function to draw text on the screen."""
-        font = pygame.font.SysFont(None, size)
-        text_surface = font.render(text, True, color)
+        self.sounds.set_volume(self.settings['volume'])
+
+    def _startup_report(self):
+        """Prints the time-to-first-frame breakdown."""
+        self.startup.note("sounds", self.sounds.load_time)
+        self.startup.note("font_discovery", self.fonts.discovery_time)
+        for line in self.startup.report_lines():
+            print(line)
+
+    def _render_text(self, text, size, color, x, y, align="topleft", font=None):
+        """Helper function to render text (through the text cache) and position its rect."""
+        text_surface = self.text_cache.render(text, size, color, font)
         text_rect = text_surface.get_rect()
         if align == "topleft":
             text_rect.topleft = (x, y)
@@ -280,174 +321,460 @@ class Game:
             text_rect.topright = (x, y)
         elif align == "center":
             text_rect.center = (x, y)
-        self.screen.blit(text_surface, text_rect)
+        return text_surface, text_rect
 
-    def _draw_text_custom_font(self, font, text, color, x, y, align="topleft"):
-        """Helper function to draw text with a specific font object."""
-        text_surface = font.render(text, True, color)
-        text_rect = text_surface.get_rect()
-        if align == "topleft":
-            text_rect.topleft = (x, y)
-        elif align == "topright":
-            text_rect.topright = (x, y)
-        elif align == "center":
-            text_rect.center = (x, y)
+    def _draw_text(self, text, size, color, x, y, align="topleft", font=None):
+        """Helper function to draw text on the screen."""
+        text_surface, text_rect = self._render_text(text, size, color, x, y, align, font)
         self.screen.blit(text_surface, text_rect)
 
-    def _draw_button(self, text, index, total_buttons, y_offset, width=250, height=50):
-        """Helper to draw a menu button and highlight if selected."""
+    def _button_rect(self, index, y_offset, width=250, height=50):
+        """Screen rect of a menu button, for drawing and hit-testing."""
         x = WIDTH // 2 - width // 2
         y = y_offset + index * (height + 15)
-        
-        is_selected = (self.selected_button_index == index)
-        
-        color = UI_TEXT_HOVER if is_selected else WHITE
-        bg_color = UI_BG_HOVER if is_selected else UI_BG
+        return pygame.Rect(x, y, width, height)
 
-        button_rect = pygame.Rect(x, y, width, height)
-        pygame.draw.rect(self.screen, bg_color, button_rect, border_radius=8)
-        
-        self._draw_text(text, FONT_NORMAL, color, button_rect.centerx, button_rect.centery, align="center")
+    def _draw_button(self, text, index, total_buttons, y_offset, width=250, height=50):
+        """Helper to draw a menu button and highlight if selected."""
+        button_rect = self._button_rect(index, y_offset, width, height)
+        is_selected = (self.selected_button_index == index)
+        key = (text, width, height, is_selected, self.fonts.generation)
+        surface = self._buttons.get(key)
+        if surface is None:
+            color = UI_TEXT_HOVER if is_selected else WHITE
+            bg_color = UI_BG_HOVER if is_selected else UI_BG
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            pygame.draw.rect(surface, bg_color, surface.get_rect(), border_radius=8)
+            text_surface, text_rect = self._render_text(text, FONT_NORMAL, color, width // 2, height // 2, align="center")
+            surface.blit(text_surface, text_rect)
+            self._buttons[key] = surface
+        self.screen.blit(surface, button_rect)
         return button_rect
 
+    def _dim_overlay(self, alpha):
+        """Full-screen translucent black surface, built once per alpha."""
+        overlay = self._overlays.get(alpha)
+        if overlay is None:
+            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+            overlay.fill((0, 0, 0, alpha))
+            self._overlays[alpha] = overlay
+        return overlay
+
+    def _menu_stale(self, *view):
+        """True (once) if the menu on screen no longer matches the state and ``view``."""
+        key = (self.game_state, self.selected_button_index, self.fonts.generation, self.profiler.enabled) + view
+        if key == self._menu_view:
+            return False
+        self._menu_view = key
+        return True
+
+    def _menu_events(self):
+        """Sleeps until input arrives or MENU_IDLE_TIMEOUT passes, then returns the pending events."""
+        event = pygame.event.wait(MENU_IDLE_TIMEOUT)
+        if event.type == pygame.NOEVENT:
+            return []
+        events = [event] + pygame.event.get()
+        if any(event.type in WINDOW_EVENTS for event in events):
+            self._menu_view = None # The screen may have been lost
+        return events
+
+    def _new_state(self):
+        """Creates a fresh simulation whose snake and food know how to draw themselves."""
+        return GameState(BOARD_WIDTH, BOARD_HEIGHT, snake_factory=Snake, food_factory=Food)
+
+    @property
+    def snake(self):
+        """The simulated snake; the renderer only reads from it."""
+        return self.state.snake
+
+    @property
+    def food(self):
+        """The simulated food item."""
+        return self.state.food
+
+    @property
+    def score(self):
+        """Score of the current game."""
+        return self.state.score
+
+    def _score_store(self):
+        """The score history, opened the first time a game starts rather than at start-up."""
+        if self.scores is None:
+            from scores import ScoreStore, migrate_high_score
+            self.scores = ScoreStore(SCORE_DB, SAVE_INTERVAL, CABINET_NAME)
+            migrate_high_score(self.scores, HIGH_SCORE_FILE, PLAYER_NAME)
+            self.scores.start()
+            atexit.register(self.scores.close) # Inserts runs still queued on quit
+            self.high_score = max(self.high_score, self.scores.best())
+        return self.scores
+
     def _reset_game(self):
         """Resets the game to its initial state."""
-        self.snake = Snake()
-        self.food = Food()
-        self.score = 0
-        self.speed_boost_timer = 0
-        self.speed_boost_amount = 0
+        self._finish_replay()
+        self._score_store()
+        self.state = self._new_state()
+        if REPLAY_DIR:
+            from replay import ReplayWriter
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            path = os.path.join(REPLAY_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.state.seed}.snkr")
+            self.state.recorder = ReplayWriter(path, self.state)
+        self.autopilot = None
         self.game_state = "PLAYING"
 
+    def _start_demo(self):
+        """Starts a fresh game played by the autopilot until a key takes over."""
+        from autopilot import Autopilot
+        self._reset_game()
+        self.autopilot = Autopilot(self.state)
+
+    def _start_online(self):
+        """Joins the multiplayer server at MULTIPLAYER_SERVER."""
+        from multiplayer import BackgroundClient
+        self.online = BackgroundClient(*MULTIPLAYER_SERVER, snake_factory=Snake)
+        self.online.start()
+        self.game_state = "ONLINE"
+
+    def _leave_online(self):
+        """Disconnects from the server and goes back to the main menu."""
+        self.online.close()
+        self.online = None
+        self.game_state = "SPLASH"
+        self._menu_view = None
+
+    def _save_game(self):
+        """Snapshots the game in progress for Continue; the file is written in the background."""
+        if self.autopilot is not None or self.state.game_over:
+            return
+        import snapshot
+        self.store.save(SAVE_FILE, snapshot.dumps(self.state))
+        self._save_available = True
+
+    def _discard_save(self):
+        """Forgets the saved game."""
+        self.store.remove(SAVE_FILE)
+        self._save_available = False
+
+    def _continue_game(self):
+        """Resumes the saved game where it was left."""
+        import snapshot
+        self.store.flush() # The latest snapshot may still be pending
+        try:
+            state = snapshot.load(SAVE_FILE, snake_factory=Snake, food_factory=Food)
+        except (OSError, snapshot.SnapshotError) as e:
+            print(f"Can't load saved game: {e}")
+            self._discard_save()
+            return
+        self._finish_replay()
+        self._score_store()
+        self.state = state
+        self.autopilot = None
+        self.game_state = "PLAYING"
+
+    def _finish_replay(self):
+        """Closes the current game's replay, if it is being recorded."""
+        if self.state.recorder is not None:
+            self.state.recorder.finish(self.state)
+            self.state.recorder = None
+
     def run(self):
         """The main loop of the application."""
         running = True
+        frame_time = 0.0
         while running:
+            self.profiler.begin_frame()
+            dirty_rects = None
+            draw_start = None
+            drew = False
+            in_menu = self.game_state not in ("PLAYING", "ONLINE")
             if self.game_state == "SPLASH":
-                self._splash_screen()
+                drew = self._splash_screen()
             elif self.game_state == "PLAYING":
                 self._handle_events()
-                self._update_game_state()
-                self._draw_elements()
+                self.profiler.mark("events")
+                alpha = self._step_simulation(frame_time)
+                self.profiler.mark("update")
+                draw_start = time.perf_counter()
+                dirty_rects = self._draw_elements(alpha)
+                self.profiler.mark("draw")
+                if self.game_state != "PLAYING":
+                    self._backdrop.blit(self.screen, (0, 0)) # Menus dim this frame
+                    self._menu_view = None
+            elif self.game_state == "ONLINE":
+                self._handle_online_events()
+                self.profiler.mark("events")
+                if self.online is not None:
+                    self._draw_online()
+                self.profiler.mark("draw")
             elif self.game_state == "PAUSED":
-                self._pause_menu()
+                drew = self._pause_menu()
             elif self.game_state == "GAME_OVER":
-                self._game_over_screen()
+                drew = self._game_over_screen()
             elif self.game_state == "SETTINGS":
-                self._settings_screen()
-            
-            pygame.display.update()
-            
-            if self.game_state == "PLAYING":
-                current_fps = FPS_BASE + (self.snake.length // 5) + self.speed_boost_amount
-                self.clock.tick(current_fps)
+                drew = self._settings_screen()
+            if in_menu:
+                self.profiler.mark("events") # Menus wait for input, then draw if anything changed
+
+            if dirty_rects is not None:
+                pygame.display.update(dirty_rects)
+            elif not in_menu or drew:
+                if self.profiler.enabled and in_menu:
+                    _, panel, rect = self._profiler_overlay()
+                    self.screen.blit(panel, rect)
+                pygame.display.update()
+            self.profiler.mark("display")
+            self.profiler.end_frame()
+            if draw_start is not None:
+                draw_time = time.perf_counter() - draw_start # Drawing and display update, what the tiers can cut
+
+            if self.startup is not None:
+                self.startup.mark("first_frame")
+                if STARTUP_REPORT:
+                    self._startup_report()
+                self.startup = None
+            self._update_icon()
+
+            if self.game_state != "PLAYING":
+                self.renderer.invalidate() # Menus draw over the board
+
+            if self.game_state in ("PLAYING", "ONLINE"):
+                # Render and poll input at the display rate; the simulation keeps its own pace
+                frame_time = self.clock.tick(self.render_fps) / 1000.0
+                if draw_start is not None and QUALITY_GOVERNOR:
+                    # Drawing that overruns the frame period drops frames, however slow the ticks are
+                    self.quality.update(draw_time, 1.0 / self.render_fps, frame_time)
             else:
-                self.clock.tick(FPS_BASE) # Slower tick for menus
+                self.clock.tick(FPS_BASE) # Caps redraws during bursts of input; idle menus sleep in _menu_events
+                frame_time = 0.0
+                self.accumulator = 0.0
 
         pygame.quit()
         sys.exit()
 
+    def _step_simulation(self, frame_time):
+        """Runs the fixed-length ticks that fit in the elapsed time.
+
+        Each tick lasts ``1 / tick_rate`` seconds of game time, whatever the
+        render rate. Returns how far (0-1) the game is into the next tick,
+        for interpolating the snake.
+        """
+        self.accumulator += min(frame_time, MAX_FRAME_TIME)
+        tick_time = 1.0 / self.state.tick_rate(FPS_BASE)
+        while self.accumulator >= tick_time and self.game_state == "PLAYING":
+            self._update_game_state()
+            self.accumulator -= tick_time
+            tick_time = 1.0 / self.state.tick_rate(FPS_BASE)
+        if self.game_state != "PLAYING":
+            self.accumulator = 0.0
+            return 1.0
+        return self.accumulator / tick_time
+
     def _handle_events(self):
         """Handles events for the PLAYING state."""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                self._save_game() # Written by the store on exit
                 pygame.quit()
                 sys.exit()
+            if event.type in WINDOW_EVENTS:
+                self.renderer.invalidate()
             if event.type == pygame.KEYDOWN:
                 direction_changed = False
+                if self.autopilot is not None and event.key in DEMO_EXIT_KEYS:
+                    self._reset_game() # Leave the demo for a game of the player's own
+                    if event.key == pygame.K_F2:
+                        continue
                 if event.key == pygame.K_ESCAPE:
                     self.game_state = "PAUSED"
+                    self._save_game()
+                    self.store.flush()
+                elif event.key == pygame.K_F2:
+                    self._start_demo()
+                elif event.key == pygame.K_F3:
+                    self.profiler.toggle()
                 elif event.key == pygame.K_LEFT:
-                    direction_changed = self.snake.change_direction((-BLOCK_SIZE, 0))
+                    direction_changed = self.state.queue_direction(LEFT)
                 elif event.key == pygame.K_RIGHT:
-                    direction_changed = self.snake.change_direction((BLOCK_SIZE, 0))
+                    direction_changed = self.state.queue_direction(RIGHT)
                 elif event.key == pygame.K_UP:
-                    direction_changed = self.snake.change_direction((0, -BLOCK_SIZE))
+                    direction_changed = self.state.queue_direction(UP)
                 elif event.key == pygame.K_DOWN:
-                    direction_changed = self.snake.change_direction((0, BLOCK_SIZE))
+                    direction_changed = self.state.queue_direction(DOWN)
                 
-                if direction_changed and self.move_sound:
-                    self.move_sound.play()
+                if direction_changed:
+                    self.sounds.play("move")
 
-    def _update_game_state(self):
-        """Updates the game logic for the PLAYING state."""
-        # Update speed boost timer
-        if self.speed_boost_timer > 0:
-            self.speed_boost_timer -= 1
-        else:
-            self.speed_boost_amount = 0 # Reset boost when timer runs out
+    def _handle_online_events(self):
+        """Handles events while playing online; turns go straight to the server."""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.online.close()
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    self._leave_online()
+                    return
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                direction = DIRECTION_KEYS.get(event.key)
+                if direction is not None:
+                    self.online.send_turn(direction)
+                    self.sounds.play("move")
 
-        self.snake.move()
+    def _update_game_state(self):
+        """Advances the simulation one tick and reacts to what happened."""
+        if self.autopilot is not None:
+            if len(self.snake.body) >= self.autopilot.capacity:
+                self._start_demo() # Board full: the demo starts over
+            self.autopilot.steer()
+        event = self.state.step()
+
+        if event == DIED and self.autopilot is not None:
+            self._start_demo()
+            return
 
-        if self.snake.check_collision():
+        if event == DIED:
+            self._finish_replay()
             pygame.mixer.stop() # Stop all other sounds
-            if self.gameover_sound: 
-                self.gameover_sound.play()
+            self.sounds.play("gameover")
             self.game_state = "GAME_OVER"
+            self._run_ticket = self._score_store().record(self.score, len(self.snake.body), self.state.ticks,
+                                                  self.state.eaten, PLAYER_NAME, self.state.seed, rank=True)
+            self._discard_save()
+            self.store.flush()
             return
 
-        head = self.snake.body[-1]
-        if head[0] == self.food.position[0] and head[1] == self.food.position[1]:
-            power = self.food.properties["power"]
-            self.snake.grow(power)
-            self.score += power
-
-            # Handle special food effects
-            if self.food.type in ["speed", "slow"]:
-                self.speed_boost_timer = self.food.properties.get("duration", 200)
-                self.speed_boost_amount = self.food.properties.get("boost", 0)
-            elif self.food.type == "normal":
-                # Reset any active speed effects
-                self.speed_boost_timer = 0
-                self.speed_boost_amount = 0
-
-            if self.eat_sound: self.eat_sound.play()
-            
-            if self.score > self.high_score:
-                self.high_score = self.score
-                self._save_high_score()
+        if self.state.ticks % AUTOSAVE_TICKS == 0:
+            self._save_game()
+
+        if event == ATE:
+            self.sounds.play("eat")
             
-            self.food.respawn()
+            if self.score > self.high_score and self.autopilot is None:
+                self.high_score = self.score # Recorded with the rest of the run at game over
+
+    def _draw_elements(self, alpha=1.0):
+        """Draws all elements for the PLAYING state.
+
+        ``alpha`` interpolates the snake between the last two ticks. Returns
+        the rects that changed, or None if the whole screen must be updated.
+        Sprites and grid follow the quality governor's current tier.
+        """
+        look, grid = QUALITY_TIERS[self.quality.name]
+        grid = grid and self.settings['grid']
+        if self.render_mode == "dirty" and self.camera.fixed:
+            hud = [
+                (self.score, *self._render_text(f"Score: {self.score}", FONT_SMALL, WHITE, 10, 10)),
+                (self.high_score, *self._render_text(f"High Score: {self.high_score}", FONT_SMALL, UI_TEXT_HOVER, WIDTH - 10, 10, align="topright")),
+            ]
+            if self.profiler.enabled:
+                hud.append(self._profiler_overlay())
+            return self.renderer.render(self.screen, self.snake, self.food, hud, grid, alpha, look)
+
+        # A scrolling view changes every pixel, so it is always redrawn in full
+        self.camera.follow(self.snake.interpolated_ends(alpha)[1])
+        if self.array_renderer is not None:
+            self.array_renderer.render(self.screen, self.snake, self.food, grid, alpha, self.camera, look)
+        else:
+            self.screen.fill(BG_COLOR)
+            if grid:
+                self._draw_grid(self.camera)
+            self.snake.draw(self.screen, alpha, self.camera, look)
+            self.food.draw(self.screen, self.camera, look)
 
-    def _draw_elements(self):
-        """Draws all elements for the PLAYING state."""
-        self.screen.fill(BG_COLOR)
-        # Draw grid
+        self._draw_text(f"Score: {self.score}", FONT_SMALL, WHITE, 10, 10)
+        self._draw_text(f"High Score: {self.high_score}", FONT_SMALL, UI_TEXT_HOVER, WIDTH - 10, 10, align="topright")
+        if self.profiler.enabled:
+            _, panel, rect = self._profiler_overlay()
+            self.screen.blit(panel, rect)
+        return None
+
+    def _draw_grid(self, camera):
+        """Draws the grid lines in ``camera``'s view, if the grid is on."""
         if self.settings['grid']:
-            for i in range(0, WIDTH, BLOCK_SIZE):
+            columns, rows = camera.grid_lines()
+            for i in columns:
                 pygame.draw.line(self.screen, GRID_COLOR, (i, 0), (i, HEIGHT))
-            for j in range(0, HEIGHT, BLOCK_SIZE):
+            for j in rows:
                 pygame.draw.line(self.screen, GRID_COLOR, (0, j), (WIDTH, j))
 
-        self.snake.draw(self.screen)
-        self.food.draw(self.screen)
-
-        self._draw_text(f"Score: {self.score}", FONT_SMALL, WHITE, 10, 10)
-        self._draw_text(f"High Score: {self.high_score}", FONT_SMALL, UI_TEXT_HOVER, WIDTH - 10, 10, align="topright")
-
-    def _splash_screen(self):
-        """Displays the splash screen with menu options."""
+    def _draw_online(self):
+        """Draws the server's board as last received; nothing is simulated here."""
         self.screen.fill(BG_COLOR)
+        with self.online.lock:
+            board = self.online.board
+            if not board.synced and not board.snakes:
+                text = "Can't reach the server" if self.online.closed else "Connecting..."
+                self._draw_text(text, FONT_NORMAL, WHITE, WIDTH // 2, HEIGHT // 2, align="center")
+                return
+            camera = self.online_camera
+            if camera is None or (camera.board_width, camera.board_height) != (board.width, board.height):
+                camera = self.online_camera = Camera(WIDTH, HEIGHT, BLOCK_SIZE, board.width, board.height)
+            own = board.snakes.get(board.you)
+            if own is not None:
+                camera.follow(own.head)
+            self._draw_grid(camera)
+            for snake in board.snakes.values():
+                snake.draw(self.screen, 1.0, camera)
+            for cell, food_type in board.foods:
+                if cell >= 0:
+                    sprite = sprite_cache.get("food", Food.TYPES[food_type]["color"], BLOCK_SIZE, CUBE_DEPTH)
+                    self.screen.blit(sprite, camera.to_screen((cell % board.width, cell // board.width)))
+            score = board.scores.get(board.you, 0)
+            players = len(board.snakes)
+
+        self._draw_text(f"Score: {score}", FONT_SMALL, WHITE, 10, 10)
+        self._draw_text(f"Players: {players}", FONT_SMALL, UI_TEXT_HOVER, WIDTH - 10, 10, align="topright")
+        if self.online.closed:
+            self._draw_text("Disconnected", FONT_NORMAL, RED, WIDTH // 2, HEIGHT // 2, align="center")
+        elif own is None:
+            self._draw_text("Respawning...", FONT_NORMAL, WHITE, WIDTH // 2, HEIGHT // 2, align="center")
+        if self.profiler.enabled:
+            _, panel, rect = self._profiler_overlay()
+            self.screen.blit(panel, rect)
+
+    def _profiler_overlay(self):
+        """The profiler panel as ``(key, surface, rect)``, rebuilt every few frames."""
+        if self._profiler_panel is None or self.profiler.frames % PROFILE_OVERLAY_REFRESH == 0:
+            target_fps = self.render_fps if self.game_state == "PLAYING" else FPS_BASE
+            lines = self.profiler.overlay_lines(target_fps)
+            if self.autopilot is not None:
+                stats = self.autopilot.stats()
+                lines.append(f"{'autopilot':8s} p50 {stats['p50_ms']:6.2f}  p99 {stats['p99_ms']:6.2f} ms")
+            if QUALITY_GOVERNOR:
+                lines.append(f"{'quality':8s} {self.quality.name}  ({self.quality.changes} changes)")
+            font = self.fonts.get("monospace", 16)
+            line_height = font.get_linesize()
+            panel = pygame.Surface((300, line_height * len(lines) + 8), pygame.SRCALPHA)
+            panel.fill((0, 0, 0, 170))
+            for i, line in enumerate(lines):
+                panel.blit(font.render(line, True, WHITE), (6, 4 + i * line_height))
+            self._profiler_panel = (tuple(lines), panel, panel.get_rect(bottomleft=(10, HEIGHT - 10)))
+        return self._profiler_panel
 
-        # --- New Title/Logo ---
-        try:
-            title_font = pygame.font.SysFont('Arial Black', FONT_LARGE)
-        except pygame.error:
-            title_font = pygame.font.SysFont(None, FONT_LARGE + 10, bold=True)
-
-        title_text = "SNAKE"
-        center_x, center_y = WIDTH // 2, HEIGHT * 0.2
+    def _splash_screen(self):
+        """Displays the splash screen with menu options; returns True if it drew a new frame."""
+        buttons = (["Continue"] if self._save_available else []) + ["Play", "Settings", "Quit"]
+        top = HEIGHT * (0.4 if len(buttons) < 4 else 0.32)
+        self.selected_button_index %= len(buttons)
+        button_rects = [self._button_rect(i, top) for i in range(len(buttons))]
+        if self._menu_stale(len(buttons)):
+            self.screen.fill(BG_COLOR)
+
+            # --- New Title/Logo ---
+            title_font = 'Arial Black'
+            title_text = "SNAKE"
+            center_x, center_y = WIDTH // 2, HEIGHT * 0.2
+
+            self._draw_text(title_text, FONT_LARGE, (10, 10, 10), center_x + 5, center_y + 5, "center", title_font) # Deep shadow
+            self._draw_text(title_text, FONT_LARGE, SNAKE_HEAD_COLOR, center_x, center_y, "center", title_font) # Main color
+            self._draw_text(title_text, FONT_LARGE, tuple(min(255, c+80) for c in SNAKE_HEAD_COLOR), center_x - 2, center_y - 2, "center", title_font) # Highlight
+
+            for i, text in enumerate(buttons):
+                self._draw_button(text, i, len(buttons), top)
+            return True
 
-        self._draw_text_custom_font(title_font, title_text, (10, 10, 10), center_x + 5, center_y + 5, "center") # Deep shadow
-        self._draw_text_custom_font(title_font, title_text, SNAKE_HEAD_COLOR, center_x, center_y, "center") # Main color
-        self._draw_text_custom_font(title_font, title_text, tuple(min(255, c+80) for c in SNAKE_HEAD_COLOR), center_x - 2, center_y - 2, "center") # Highlight
-        
-        buttons = ["Play", "Settings", "Quit"]
-        button_rects = []
-        for i, text in enumerate(buttons):
-            button_rects.append(self._draw_button(text, i, len(buttons), HEIGHT * 0.4))
-        
-        for event in pygame.event.get():
+        for event in self._menu_events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -468,30 +795,40 @@ class Game:
                     self.selected_button_index = (self.selected_button_index - 1) % len(buttons)
                 elif event.key == pygame.K_DOWN:
                     self.selected_button_index = (self.selected_button_index + 1) % len(buttons)
+                elif event.key == pygame.K_F2:
+                    self._start_demo()
+                elif event.key == pygame.K_F4 and MULTIPLAYER_SERVER:
+                    self._start_online()
                 elif event.key == pygame.K_RETURN:
-                    if self.selected_button_index == 0: # Play
+                    choice = buttons[self.selected_button_index]
+                    if choice == "Continue":
+                        self._continue_game()
+                    elif choice == "Play":
+                        self._discard_save()
                         self._reset_game()
-                    elif self.selected_button_index == 1: # Settings
+                    elif choice == "Settings":
                         self.previous_game_state = "SPLASH"
                         self.game_state = "SETTINGS"
                         self.selected_button_index = 0
-                    elif self.selected_button_index == 2: # Quit
+                    elif choice == "Quit":
                         pygame.quit()
                         sys.exit()
+                    return False # The buttons may have changed
+        return False
 
     def _pause_menu(self):
-        """Displays the pause menu with options."""
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        self.screen.blit(overlay, (0, 0))
-        self._draw_text("Paused", FONT_MEDIUM + 10, UI_TEXT_HOVER, WIDTH // 2, HEIGHT * 0.2, align="center")
-
+        """Displays the pause menu with options; returns True if it drew a new frame."""
         buttons = ["Resume", "Settings", "Main Menu"]
-        button_rects = []
-        for i, text in enumerate(buttons):
-            button_rects.append(self._draw_button(text, i, len(buttons), HEIGHT * 0.4))
+        button_rects = [self._button_rect(i, HEIGHT * 0.4) for i in range(len(buttons))]
+        if self._menu_stale():
+            self.screen.blit(self._backdrop, (0, 0))
+            self.screen.blit(self._dim_overlay(150), (0, 0))
+            self._draw_text("Paused", FONT_MEDIUM + 10, UI_TEXT_HOVER, WIDTH // 2, HEIGHT * 0.2, align="center")
+            for i, text in enumerate(buttons):
+                self._draw_button(text, i, len(buttons), HEIGHT * 0.4)
+            return True
 
-        for event in pygame.event.get():
+        for event in self._menu_events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -510,7 +847,7 @@ class Game:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.game_state = "PLAYING"
-                    return
+                    return False
                 
                 if event.key == pygame.K_UP:
                     self.selected_button_index = (self.selected_button_index - 1) % len(buttons)
@@ -526,21 +863,22 @@ class Game:
                     elif self.selected_button_index == 2: # Main Menu
                         self.game_state = "SPLASH"
                         self.selected_button_index = 0
+        return False
 
     def _settings_screen(self):
-        """Displays the settings menu."""
-        self.screen.fill(BG_COLOR)
-        self._draw_text("Settings", FONT_MEDIUM, UI_TEXT_HOVER, WIDTH // 2, HEIGHT * 0.15, align="center")
-
+        """Displays the settings menu; returns True if it drew a new frame."""
         volume_text = f"Volume: < {int(self.settings['volume'] * 100)}% >"
         grid_text = f"Show Grid: {'On' if self.settings['grid'] else 'Off'}"
-        
+
         buttons = [volume_text, grid_text, "Back"]
-        button_rects = []
-        for i, text in enumerate(buttons):
-            button_rects.append(self._draw_button(text, i, len(buttons), HEIGHT * 0.35, width=350))
+        if self._menu_stale(volume_text, grid_text):
+            self.screen.fill(BG_COLOR)
+            self._draw_text("Settings", FONT_MEDIUM, UI_TEXT_HOVER, WIDTH // 2, HEIGHT * 0.15, align="center")
+            for i, text in enumerate(buttons):
+                self._draw_button(text, i, len(buttons), HEIGHT * 0.35, width=350)
+            return True
 
-        for event in pygame.event.get():
+        for event in self._menu_events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -565,23 +903,33 @@ class Game:
                     elif self.selected_button_index == 2: # Back
                         self.game_state = self.previous_game_state
                         self.selected_button_index = 0
+        return False
 
     def _game_over_screen(self):
-        """Displays the game over screen with menu options over the final game state."""
-        # Create a semi-transparent overlay to darken the background
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
-        self.screen.blit(overlay, (0, 0))
-
-        self._draw_text("Game Over", FONT_LARGE, RED, WIDTH // 2, HEIGHT * 0.2, align="center")
-        self._draw_text(f"Your Score: {self.score}", FONT_NORMAL, WHITE, WIDTH // 2, HEIGHT * 0.35, align="center")
-        
+        """Displays the game over screen over the final game state; returns True if it drew a new frame."""
         buttons = ["Restart", "Main Menu"]
-        button_rects = []
-        for i, text in enumerate(buttons):
-            button_rects.append(self._draw_button(text, i, len(buttons), HEIGHT * 0.55))
+        button_rects = [self._button_rect(i, HEIGHT * 0.55) for i in range(len(buttons))]
+        # The score store ranks the run in the background; redraw when that lands
+        standing = self._score_store().standing
+        if standing is not None and standing["ticket"] != self._run_ticket:
+            standing = None
+        if self._menu_stale(self.score, standing is not None):
+            # Darken the last frame of the game with a semi-transparent overlay
+            self.screen.blit(self._backdrop, (0, 0))
+            self.screen.blit(self._dim_overlay(180), (0, 0))
+            self._draw_text("Game Over", FONT_LARGE, RED, WIDTH // 2, HEIGHT * 0.2, align="center")
+            self._draw_text(f"Your Score: {self.score}", FONT_NORMAL, WHITE, WIDTH // 2, HEIGHT * 0.35, align="center")
+            if standing is not None:
+                if standing["new_best"]:
+                    line = "New high score!"
+                else:
+                    line = f"#{standing['rank']} all time, #{standing['day_rank']} today"
+                self._draw_text(line, FONT_SMALL, UI_TEXT_HOVER, WIDTH // 2, HEIGHT * 0.45, align="center")
+            for i, text in enumerate(buttons):
+                self._draw_button(text, i, len(buttons), HEIGHT * 0.55)
+            return True
 
-        for event in pygame.event.get():
+        for event in self._menu_events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -608,6 +956,7 @@ class Game:
                     elif self.selected_button_index == 1: # Main Menu
                         self.game_state = "SPLASH"
                         self.selected_button_index = 0
+        return False
 
 if __name__ == '__main__':
     game_instance = Game()
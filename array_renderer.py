@@ -0,0 +1,318 @@
+"""Board renderer that rasterizes a cell array with NumPy.
+
+The board is kept as a 2D array of cell codes (empty, body gradient level,
+food type). Each cell is drawn from one pre-rendered tile of
+``block_size`` pixels with the background, grid lines and cubes baked in,
+so a frame is one gather of tiles for the cells in view and one
+``pygame.surfarray.blit_array``. The cost depends on the size of the view,
+not on the length of the snake.
+
+The cubes are the same sprites the other renderers blit: a full-cell top
+face with the depth faces reaching into the cells to the right and below.
+So a cell's tile depends on its own code and those of its left, upper and
+upper-left neighbours, and on which of them is drawn last (tail to head,
+then the food). Tiles are rendered for each such combination the first
+time it shows up. Only the sliding tail and head, and the food over
+them, are blitted as sprites on top.
+"""
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # Only ArrayRenderer needs numpy
+    np = None
+
+from simulation import FOOD_NAMES
+from sprites import GRADIENT_LEVELS, gradient_boundaries, gradient_palette, render_sprite
+
+# --- Cell Codes ---
+EMPTY = 0
+BODY = 1 # Body gradient levels take codes BODY to BODY + GRADIENT_LEVELS - 1
+FOOD = BODY + GRADIENT_LEVELS # Food types take codes FOOD + their index in FOOD_NAMES
+CODES = FOOD + len(FOOD_NAMES)
+
+# --- Tile Keys ---
+# A tile shows the cubes of a cell and of its left, upper and upper-left
+# neighbours, at these cell offsets
+NEIGHBOURS = ((0, 0), (-1, 0), (0, -1), (-1, -1))
+FOOD_ORDER = 2 ** 62 # Draw order of the food, after every body segment
+
+
+def _split_key(key):
+    """The cell codes and draw ranks of a tile key, in NEIGHBOURS order (see ``_key_cells``)."""
+    ranks = []
+    for _ in NEIGHBOURS:
+        key, rank = divmod(key, 4)
+        ranks.append(rank)
+    codes = []
+    for _ in NEIGHBOURS:
+        key, code = divmod(key, CODES)
+        codes.append(code)
+    return codes[::-1], ranks[::-1]
+
+
+class _TileSet:
+    """Tiles for one grid flag and look, rendered the first time a tile key shows in view.
+
+    ``keys`` is the renderer's list of tile keys by id, shared by all tile sets.
+    """
+    def __init__(self, render_tile, block_size, keys):
+        self._render_tile = render_tile
+        self._keys = keys
+        self._row_of_id = np.full(64, -1, dtype=np.int32)
+        self.tiles = np.empty((64, block_size, block_size), dtype=np.uint32)
+        self.count = 0
+
+    def rows(self, ids):
+        """Rows of ``tiles`` for an array of tile key ids, rendering any tiles not seen before."""
+        if len(self._row_of_id) < len(self._keys):
+            grown = np.full(2 * len(self._keys), -1, dtype=np.int32)
+            grown[:len(self._row_of_id)] = self._row_of_id
+            self._row_of_id = grown
+        rows = self._row_of_id[ids]
+        missing = rows < 0
+        if missing.any():
+            for key_id in np.unique(ids[missing]).tolist():
+                if self.count == len(self.tiles):
+                    self.tiles = np.concatenate([self.tiles, np.empty_like(self.tiles)])
+                self.tiles[self.count] = self._render_tile(self._keys[key_id])
+                self._row_of_id[key_id] = self.count
+                self.count += 1
+            rows = self._row_of_id[ids]
+        return rows
+
+
+class ArrayRenderer:
+    """Draws the board from a cell-code array in a few vectorized operations.
+
+    ``food_colors`` maps each food type to its colour. ``render`` redraws
+    the whole view every frame, so there is nothing to invalidate.
+    """
+    def __init__(self, block_size, depth, bg_color, grid_color, head_color, food_colors):
+        if np is None:
+            raise ImportError("ArrayRenderer requires numpy")
+        self.block_size = block_size
+        self.depth = depth
+        self.bg_color = bg_color
+        self.grid_color = grid_color
+        self.head_color = head_color
+        self.food_colors = food_colors
+        self._tile_sets = {} # _TileSet by grid flag and look
+        self._cubes = {} # Cube sprite of each cell code by look
+        self._heads = {} # Head sprite by look
+        self._keys = [0] # Tile keys by id; id 0 is an empty cell
+        self._key_ids = {0: 0}
+        self._frame = None
+        # Board arrays have a border of empty cells all round, so edge cells have neighbours
+        self._codes = None
+        self._order = None # Draw order of each cell, -1 when empty; only the order between cells counts
+        self._ids = None # Tile key id of each cell
+        self._snake = None
+        self._cells = None # Body cells in the arrays, tail first (the head isn't one)
+        self._count = 0 # Snake length they were coloured for
+        self._food = None # Flat index and code of the food in the arrays, if any
+        self._next_order = 0
+        self._key = None
+
+    def _surface(self, size):
+        """An opaque surface in the display's pixel format, so tiles and frames map colours alike."""
+        surface = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+    def _cube(self, style, color, look):
+        """The sprite the other renderers blit for a cube."""
+        return render_sprite(style, color, self.block_size, self.depth, look)
+
+    def _cubes_for(self, look):
+        """Cube sprites for every cell code (None for EMPTY)."""
+        cubes = self._cubes.get(look)
+        if cubes is None:
+            cubes = [None]
+            cubes += [self._cube("body", color, look) for color in gradient_palette()]
+            cubes += [self._cube("food", self.food_colors[name], look) for name in FOOD_NAMES]
+            self._cubes[look] = cubes
+        return cubes
+
+    def _tile_set(self, grid, look):
+        """The tiles for a grid flag and look."""
+        tile_set = self._tile_sets.get((grid, look))
+        if tile_set is None:
+            cubes = self._cubes_for(look)
+            tile = self._surface((self.block_size, self.block_size))
+
+            def render_tile(key):
+                block = self.block_size
+                tile.fill(self.bg_color)
+                if grid:
+                    pygame.draw.line(tile, self.grid_color, (0, 0), (0, block))
+                    pygame.draw.line(tile, self.grid_color, (0, 0), (block, 0))
+                codes, ranks = _split_key(key)
+                for rank, code, (dx, dy) in sorted(zip(ranks, codes, NEIGHBOURS)):
+                    if code != EMPTY:
+                        tile.blit(cubes[code], (dx * block, dy * block))
+                return pygame.surfarray.array2d(tile)
+
+            tile_set = self._tile_sets[grid, look] = _TileSet(render_tile, self.block_size, self._keys)
+        return tile_set
+
+    def _update_codes(self, snake, food):
+        """Brings the cell codes and tile keys up to date if the snake or the food changed since the last frame.
+
+        When the snake only moved on or grew, just the cells it entered or
+        left, the segments whose gradient level changed and the cells their
+        cubes reach get new tile keys. Anything else, like a new game,
+        rebuilds every array.
+        """
+        count = len(snake.body)
+        key = (snake, count, snake.head, snake.body[0], food.position, food.type)
+        if key == self._key:
+            return
+        self._key = key
+        width = snake.width + 2
+        shape = (snake.height + 2, width)
+
+        def padded(cells):
+            """Flat indices in the arrays of packed board cells."""
+            cells = np.asarray(cells, dtype=np.int64)
+            return (cells // snake.width + 1) * width + cells % snake.width + 1
+
+        def levels(index):
+            """Cell codes of the body segments at ``index``."""
+            span = count - 1
+            return (BODY + (2 * index * (GRADIENT_LEVELS - 1) + span) // (2 * span)).astype(np.uint8)
+
+        # The head slides on top as a sprite; the rest keep their cells and are drawn tail first
+        cells = np.frombuffer(snake.packed(), dtype=np.int32)[:-1]
+        food_cell = None
+        if food.position is not None:
+            x, y = food.position
+            food_cell = ((y + 1) * width + x + 1, FOOD + FOOD_NAMES.index(food.type))
+
+        # How many cells the tail left since the last update, if the body only moved on
+        previous = self._cells
+        left = None
+        if self._codes is not None and self._codes.shape == shape and snake is self._snake:
+            if not len(cells):
+                left = len(previous)
+            elif not len(previous):
+                left = 0
+            else:
+                found = np.flatnonzero(previous == cells[0])
+                if len(found):
+                    left = int(found[0])
+            if left is not None and (len(previous) - left > len(cells)
+                                     or not np.array_equal(cells[:len(previous) - left], previous[left:])):
+                left = None
+
+        if left is None:
+            if self._codes is None or self._codes.shape != shape:
+                self._codes = np.zeros(shape, dtype=np.uint8)
+                self._order = np.full(shape, -1, dtype=np.int64)
+                self._ids = np.zeros(shape, dtype=np.int32)
+            else:
+                self._codes.fill(EMPTY)
+                self._order.fill(-1)
+                self._ids.fill(0)
+            codes, order = self._codes.reshape(-1), self._order.reshape(-1)
+            changed = [padded(cells)]
+            if len(cells):
+                codes[changed[0]] = levels(np.arange(len(cells), dtype=np.int64))
+                order[changed[0]] = np.arange(len(cells))
+            self._next_order = len(cells)
+            self._food = None
+        else:
+            codes, order = self._codes.reshape(-1), self._order.reshape(-1)
+            vacated = padded(previous[:left])
+            codes[vacated] = EMPTY
+            order[vacated] = -1
+            changed = [vacated]
+            first = len(previous) - left # Index of the first cell entered
+            entered = padded(cells[first:])
+            order[entered] = self._next_order + np.arange(len(entered))
+            self._next_order += len(entered)
+            if self._food is not None and self._food != food_cell:
+                codes[self._food[0]] = EMPTY
+                order[self._food[0]] = -1
+                changed.append([self._food[0]])
+            # The entered segments, and those whose gradient level changed because the body shifted or grew
+            index = set(range(first, len(cells)))
+            for old, new in zip(gradient_boundaries(self._count), gradient_boundaries(count)):
+                old -= left
+                index.update(range(max(min(old, new), 0), min(max(old, new), len(cells))))
+            index = np.fromiter(index, dtype=np.int64, count=len(index))
+            if len(index):
+                segments = padded(cells[index])
+                level = levels(index)
+                changed.append(segments[codes[segments] != level])
+                codes[segments] = level
+        if food_cell is not None and food_cell != self._food:
+            codes[food_cell[0]] = food_cell[1]
+            order[food_cell[0]] = FOOD_ORDER
+            changed.append([food_cell[0]])
+        self._snake, self._cells, self._count, self._food = snake, cells, count, food_cell
+        changed = np.concatenate(changed).astype(np.int64)
+        # Each changed cell's cube reaches the cells right of it, below it and diagonally below
+        self._key_cells((changed + np.array([[0], [1], [width], [width + 1]])).reshape(-1))
+
+    def _key_cells(self, cells):
+        """Sets the tile key id of the flat ``cells`` from their NEIGHBOURS' codes and draw ranks."""
+        width = self._codes.shape[1]
+        sources = cells + np.array([[dx + dy * width] for dx, dy in NEIGHBOURS]) # (neighbour, cell)
+        codes = self._codes.reshape(-1)[sources].astype(np.int64)
+        # Empty cells draw nothing, so ranking them first among themselves is as good as any order
+        ranks = np.argsort(np.argsort(self._order.reshape(-1)[sources], axis=0, kind="stable"), axis=0)
+        keys = (((codes[0] * CODES + codes[1]) * CODES + codes[2]) * CODES + codes[3]) * 256 \
+            + ranks[0] * 64 + ranks[1] * 16 + ranks[2] * 4 + ranks[3]
+        ids = []
+        for key in keys.tolist():
+            key_id = self._key_ids.get(key)
+            if key_id is None:
+                key_id = self._key_ids[key] = len(self._keys)
+                self._keys.append(key)
+            ids.append(key_id)
+        self._ids.reshape(-1)[cells] = ids
+
+    def _to_pixels(self, cell):
+        """Top-left pixel of a (possibly fractional) cell without a camera."""
+        return (round(cell[0] * self.block_size), round(cell[1] * self.block_size))
+
+    def render(self, screen, snake, food, grid, alpha=1.0, camera=None, look="cube"):
+        """Draws the board (the part in ``camera``'s view, if given) onto ``screen``.
+
+        Matches blitting the sprites tail first and the food last, except
+        that a tail still sliding off its cell ends up on top of its
+        neighbours.
+        """
+        tile_set = self._tile_set(grid, look)
+        self._update_codes(snake, food)
+
+        if camera is None:
+            x0, y0, x1, y1 = 0, 0, snake.width - 1, snake.height - 1
+            place = self._to_pixels
+        else:
+            x0, y0, x1, y1 = camera.visible_cells()
+            place = camera.to_screen
+        view = tile_set.rows(self._ids[y0 + 1:y1 + 2, x0 + 1:x1 + 2].T) # (x, y) like surfarray
+        columns, rows = view.shape
+        block = self.block_size
+        size = (columns * block, rows * block)
+        if self._frame is None or self._frame.get_size() != size:
+            self._frame = self._surface(size)
+        if size[0] < screen.get_width() or size[1] < screen.get_height():
+            screen.fill(self.bg_color) # The board doesn't fill the window
+        # (columns, rows, block, block) -> (columns, block, rows, block) -> pixels
+        pixels = tile_set.tiles[view].transpose(0, 2, 1, 3).reshape(size)
+        pygame.surfarray.blit_array(self._frame, pixels)
+        screen.blit(self._frame, place((x0, y0)))
+
+        tail, head = snake.interpolated_ends(alpha)
+        if tail is not None and tail != snake.body[0]: # Once it has arrived it is on its tile
+            screen.blit(self._cubes_for(look)[BODY], place(tail))
+        head_sprite = self._heads.get(look)
+        if head_sprite is None:
+            head_sprite = self._heads[look] = self._cube("head", self.head_color, look)
+        screen.blit(head_sprite, place(head))
+        if food.position is not None: # Drawn last, over the head, as Food.draw does
+            screen.blit(self._cubes_for(look)[FOOD + FOOD_NAMES.index(food.type)], place(food.position))
@@ -0,0 +1,193 @@
+"""Background loading and playback of sound effects.
+
+Decoding the MP3 effects takes long enough to delay the first frame, so
+``SoundLoader`` decodes them on a worker thread. Until a sound is ready the
+game gets ``NULL_SOUND``, which accepts the same calls and does nothing.
+
+With a cache directory the decoded PCM of each effect is kept on disk,
+named after a hash of the source file and the mixer format, so later
+launches skip the decoder. ``ChannelPool`` plays effects on a few reserved
+mixer channels per effect and drops plays that come too fast, so a burst
+of input can't pile up playbacks.
+"""
+import hashlib
+import os
+import threading
+import time
+
+import pygame
+
+from persistence import atomic_write
+
+
+class NullSound:
+    """Stand-in for a pygame Sound that isn't loaded (yet)."""
+    def play(self, *args, **kwargs):
+        return None
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+    def get_volume(self):
+        return 0.0
+
+
+NULL_SOUND = NullSound()
+
+
+class ChannelPool:
+    """Plays each effect on its own reserved mixer channels.
+
+    ``channels`` maps an effect name to how many channels it gets; they are
+    reserved, so sounds played without the pool never take them. When all
+    of an effect's channels are busy, the one started longest ago is cut
+    off and reused. ``min_intervals`` maps an effect name to the seconds
+    that must pass between two of its plays; plays sooner than that are
+    dropped and counted in ``dropped``.
+    """
+    def __init__(self, channels, min_intervals=None, clock=time.perf_counter):
+        self.min_intervals = min_intervals or {}
+        self.clock = clock
+        self.dropped = 0
+        total = sum(channels.values())
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), total))
+        pygame.mixer.set_reserved(total)
+        self._channels = {}
+        first = 0
+        for name, count in channels.items():
+            self._channels[name] = [pygame.mixer.Channel(i) for i in range(first, first + count)]
+            first += count
+        self._next = dict.fromkeys(channels, 0) # Oldest channel of each effect
+        self._last = {}
+
+    def play(self, name, sound):
+        """Plays ``sound`` as effect ``name``; returns the Channel, or None if rate-limited."""
+        now = self.clock()
+        interval = self.min_intervals.get(name)
+        if interval is not None and now - self._last.get(name, float("-inf")) < interval:
+            self.dropped += 1
+            return None
+        self._last[name] = now
+        channels = self._channels.get(name)
+        if not channels:
+            return sound.play()
+        for channel in channels:
+            if not channel.get_busy():
+                break
+        else:
+            channel = channels[self._next[name]]
+            self._next[name] = (self._next[name] + 1) % len(channels)
+        channel.play(sound)
+        return channel
+
+    def stop(self):
+        """Stops every effect."""
+        for channels in self._channels.values():
+            for channel in channels:
+                channel.stop()
+
+
+class SoundLoader:
+    """Loads named sound files, in the background unless told otherwise.
+
+    ``get`` returns the loaded Sound or ``NULL_SOUND``. The volume set with
+    ``set_volume`` is applied to sounds as they finish loading. Sounds that
+    fail to load stay silent. With ``cache_dir`` decoded sounds are cached
+    on disk; ``cache_hits`` counts the sounds loaded from there.
+    ``play`` goes through a ChannelPool built from ``channels`` and
+    ``min_intervals`` once loading starts.
+    """
+    def __init__(self, paths, cache_dir=None, channels=None, min_intervals=None):
+        self.paths = paths
+        self.cache_dir = cache_dir
+        self.channels = channels or {}
+        self.min_intervals = min_intervals
+        self.volume = 1.0
+        self.load_time = None # Seconds the worker took, once done
+        self.cache_hits = 0
+        self.pool = None
+        self._sounds = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        """True once every sound has been loaded or has failed."""
+        return self._done.is_set()
+
+    def start(self, background=True):
+        """Begins loading; with ``background=False`` loads before returning."""
+        if pygame.mixer.get_init():
+            self.pool = ChannelPool(self.channels, self.min_intervals)
+        if background:
+            self._thread = threading.Thread(target=self._load_all, name="sound-loader", daemon=True)
+            self._thread.start()
+        else:
+            self._load_all()
+
+    def wait(self, timeout=None):
+        """Blocks until loading finished; returns ``ready``."""
+        return self._done.wait(timeout)
+
+    def _cache_path(self, path):
+        """Cache file for the decoded ``path`` in the current mixer format, or None."""
+        mixer_format = pygame.mixer.get_init()
+        if self.cache_dir is None or mixer_format is None:
+            return None
+        digest = hashlib.blake2b(repr(mixer_format).encode(), digest_size=16)
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        return os.path.join(self.cache_dir, digest.hexdigest() + ".pcm")
+
+    def _load(self, path):
+        """Decodes ``path``, or reads its PCM from the cache; fills the cache on a miss."""
+        cache_path = self._cache_path(path)
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                sound = pygame.mixer.Sound(buffer=f.read())
+            self.cache_hits += 1
+            return sound
+        sound = pygame.mixer.Sound(path)
+        if cache_path is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                atomic_write(cache_path, sound.get_raw())
+            except OSError as e:
+                print(f"Can't cache sound: {e}")
+        return sound
+
+    def _load_all(self):
+        start = time.perf_counter()
+        for name, path in self.paths.items():
+            try:
+                sound = self._load(path)
+            except (pygame.error, OSError) as e:
+                print(f"Can't load sound: {e}")
+                continue
+            with self._lock:
+                sound.set_volume(self.volume)
+                self._sounds[name] = sound
+        self.load_time = time.perf_counter() - start
+        self._done.set()
+
+    def get(self, name):
+        """The sound called ``name``, or a silent placeholder."""
+        return self._sounds.get(name, NULL_SOUND)
+
+    def play(self, name):
+        """Plays the sound called ``name`` through the channel pool, if it is loaded."""
+        sound = self._sounds.get(name)
+        if sound is None or self.pool is None:
+            return None
+        return self.pool.play(name, sound)
+
+    def set_volume(self, volume):
+        """Sets the volume of every sound, including ones still loading."""
+        with self._lock:
+            self.volume = volume
+            for sound in self._sounds.values():
+                sound.set_volume(volume)
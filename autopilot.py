@@ -0,0 +1,360 @@
+"""Autopilot: steers a game's snake to the food without pygame.
+
+Used for attract-mode demos in the game (F2) and for soak tests that run
+the snake up to the size of the board::
+
+    python autopilot.py --width 30 --height 20 --seed 1
+    python autopilot.py --width 200 --height 200 --max-ticks 10000000 --replay soak.snkr
+
+The snake follows a Hamiltonian cycle over the board and takes A*
+shortcuts to the food that keep its body in cycle order, so it can always
+fall back to chasing its tail along the cycle until the board is full.
+"""
+import argparse
+import heapq
+import sys
+import time
+from array import array
+from collections import deque
+
+from simulation import DIED, DIRECTIONS, GameState
+
+PLAN_HISTORY = 1024 # Ticks kept for the planning-time percentiles
+RETRY_TICKS = 8 # Ticks spent following the cycle before trying for the food again
+ROOM_MARGIN = 24 # Free cells a shortcut must leave ahead of the head after eating
+
+
+def hamiltonian_cycle(width, height):
+    """Packed cells of a cycle through every cell of the board, in order.
+
+    Row 0 runs right, the remaining rows snake back and forth over columns
+    1.., and column 0 leads back up to the start. A board with two odd
+    sides has no such cycle; there the bottom-right cell is left out.
+    """
+    if width < 2 or height < 2:
+        raise ValueError("the autopilot needs a board at least 2 cells wide and high")
+    if height % 2 and not width % 2:
+        return [x * width + y for x, y in _cycle_cells(height, width)]
+    return [y * width + x for x, y in _cycle_cells(width, height)]
+
+
+def _cycle_cells(width, height):
+    """(x, y) cells of the cycle for an even ``height``, or odd sides without a corner."""
+    cells = [(x, 0) for x in range(width)]
+    rows = height - 1 if height % 2 == 0 else height - 3
+    for y in range(1, rows + 1):
+        columns = range(width - 1, 0, -1) if y % 2 else range(1, width)
+        cells.extend((x, y) for x in columns)
+    if height % 2:
+        # Cover the last two rows column by column, skipping the corner
+        cells.append((width - 1, height - 2))
+        for i, x in enumerate(range(width - 2, 0, -1)):
+            pair = [(x, height - 2), (x, height - 1)]
+            cells.extend(pair if i % 2 == 0 else reversed(pair))
+    cells.extend((0, y) for y in range(height - 1, 0, -1))
+    return cells
+
+
+def astar(start, goal, passable):
+    """Shortest path of cells from ``start`` (not included) to ``goal``, or None.
+
+    ``passable(cell, step, steps)`` says whether ``step`` can be entered
+    from ``cell`` as the ``steps``-th move.
+    """
+    gx, gy = goal
+    frontier = [(abs(start[0] - gx) + abs(start[1] - gy), 0, start)]
+    came_from = {start: None}
+    while frontier:
+        _, steps, cell = heapq.heappop(frontier)
+        if cell == goal:
+            path = []
+            while cell != start:
+                path.append(cell)
+                cell = came_from[cell]
+            path.reverse()
+            return path
+        x, y = cell
+        for dx, dy in DIRECTIONS:
+            step = (x + dx, y + dy)
+            if step in came_from or not passable(cell, step, steps + 1):
+                continue
+            came_from[step] = cell
+            heapq.heappush(frontier, (steps + 1 + abs(step[0] - gx) + abs(step[1] - gy), steps + 1, step))
+    return None
+
+
+class Autopilot:
+    """Chooses the snake's turn for every tick of a GameState.
+
+    The body always lies along the cycle in order from tail to head, with
+    gaps where a shortcut skipped cells. A shortcut to the food only moves
+    forward along the cycle and never as far as the tail, so every cell on
+    it is free, and it is only taken if the gaps it leaves still give the
+    head room to grow before it catches up with the tail. Once the snake
+    covers half the board it stops taking shortcuts, so the gaps are gone
+    by the time it fills up. Without a safe shortcut the snake follows the
+    cycle, which is always safe. On a board with two odd sides the corner
+    the cycle leaves out takes the place of its inner neighbour whenever
+    the food is there, so the snake gets to all but one cell.
+
+    A shortcut is planned once per food and kept from tick to tick. If its
+    next step is blocked anyway (e.g. a player nudged the snake), only the
+    stretch up to the next usable cell of the path is re-routed.
+    """
+    def __init__(self, state, history=PLAN_HISTORY):
+        self.state = state
+        self.history = history
+        self.plans = 0
+        self.repairs = 0
+        self.reuses = 0
+        self.fallbacks = 0
+        width, height = state.width, state.height
+        self._cycle = array("i", hamiltonian_cycle(width, height))
+        self.capacity = len(self._cycle) # Longest snake it can fit on the board
+        self._order = array("i", [-1]) * (width * height) # Position of each cell on the cycle
+        for position, cell in enumerate(self._cycle):
+            self._order[cell] = position
+        self._twins = {}
+        if width % 2 and height % 2:
+            # The left-out corner can stand in for the cell diagonally inside it
+            corner, inner = width * height - 1, (height - 2) * width + width - 2
+            self._order[corner] = self._order[inner]
+            self._twins[inner] = corner
+        self._path = deque() # Shortcut cells still to visit, next one first
+        self._goal = None # Food cell the path was planned for
+        self._retry_tick = 0
+        self._times = array("d", bytes(8 * history))
+        self._ticks = 0
+
+    def steer(self):
+        """Turns the snake for the coming tick."""
+        direction = self.next_direction()
+        if direction is not None:
+            self.state.turn(direction)
+
+    def next_direction(self):
+        """The direction to move in on the coming tick, or None if every move is fatal."""
+        start = time.perf_counter()
+        direction = self._choose()
+        self._times[self._ticks % self.history] = time.perf_counter() - start
+        self._ticks += 1
+        return direction
+
+    def _position(self, cell):
+        """Position of an (x, y) cell on the cycle."""
+        return self._order[cell[1] * self.state.width + cell[0]]
+
+    def _ahead(self, cell):
+        """How many steps along the cycle ``cell`` lies ahead of the head."""
+        return (self._position(cell) - self._position(self.state.snake.head)) % len(self._cycle)
+
+    def _gap(self):
+        """Steps along the cycle from the head to the tail."""
+        snake = self.state.snake
+        if len(snake.body) < 2:
+            return len(self._cycle)
+        return self._ahead(snake.body[0])
+
+    def _pending(self):
+        """Ticks of growth left, during which the tail stays put."""
+        snake = self.state.snake
+        return max(snake.length - len(snake.body), 0)
+
+    def _reverse(self, cell):
+        """True if moving to ``cell`` would be a refused 180-degree turn."""
+        snake = self.state.snake
+        head = snake.head
+        return cell[0] == head[0] - snake.direction[0] and cell[1] == head[1] - snake.direction[1]
+
+    def _passable(self, cell):
+        """True if the head can enter ``cell`` on the coming tick and survive it."""
+        snake = self.state.snake
+        x, y = cell
+        if not (0 <= x < snake.width and 0 <= y < snake.height) or self._reverse(cell):
+            return False
+        return not snake.occupies(x, y) or (cell == snake.body[0] and self._pending() == 0)
+
+    def _choose(self):
+        snake = self.state.snake
+        head = snake.head
+        if self._path and self._path[0] == head:
+            self._path.popleft()
+        food = self.state.food.position
+        if food != self._goal or (not self._path and self.state.ticks >= self._retry_tick):
+            self._plan(food)
+        elif self._path and not self._step_ok(self._path[0], self._gap()):
+            self._repair()
+        else:
+            self.reuses += 1
+
+        if self._path:
+            step = self._path[0]
+        else:
+            cell = self._cycle[(self._position(head) + 1) % len(self._cycle)]
+            if cell in self._twins and food is not None and \
+                    self._twins[cell] == food[1] * snake.width + food[0]:
+                cell = self._twins[cell]
+            step = (cell % snake.width, cell // snake.width)
+        if not self._passable(step):
+            self.fallbacks += 1
+            self._path.clear()
+            return self._open_direction()
+        return (step[0] - head[0], step[1] - head[1])
+
+    def _step_ok(self, step, gap):
+        """True if ``step`` is a free neighbour of the head ahead on the cycle, short of the tail."""
+        head = self.state.snake.head
+        if abs(step[0] - head[0]) + abs(step[1] - head[1]) != 1 or not self._passable(step):
+            return False
+        return 0 < self._ahead(step) < gap
+
+    def _shortcut(self, goal, limit):
+        """Shortest path to ``goal`` moving forward along the cycle by at most ``limit``, or None."""
+        snake = self.state.snake
+        n = len(self._cycle)
+        base = self._position(snake.head)
+
+        def passable(cell, step, steps):
+            x, y = step
+            if not (0 <= x < snake.width and 0 <= y < snake.height) or snake.occupies(x, y):
+                return False
+            if steps == 1 and self._reverse(step):
+                return False
+            ahead = (self._order[y * snake.width + x] - base) % n
+            return (self._order[cell[1] * snake.width + cell[0]] - base) % n < ahead <= limit
+
+        return astar(snake.head, goal, passable)
+
+    def _plan(self, food):
+        """Plans a shortcut to the food if a safe one exists; otherwise the cycle is followed."""
+        self.plans += 1
+        self._path.clear()
+        self._goal = food
+        self._retry_tick = self.state.ticks + RETRY_TICKS
+        snake = self.state.snake
+        if food is None:
+            return
+        gap = self._gap()
+        distance = self._ahead(food)
+        if distance >= gap:
+            return # Behind the tail: follow the cycle until the tail has passed it
+        power = self.state.food.properties["power"]
+        if 2 * (snake.length + power) > self.capacity:
+            return # Past half the board, skipped cells could still be empty when it fills up
+        # Cells skipped now stay empty until the tail passes them, so leave
+        # the head room ahead to grow into in the meantime
+        margin = min((self.capacity - snake.length - power) // 2, ROOM_MARGIN)
+        room = gap - 1 - self._pending() - power
+        if room < margin:
+            return
+        path = self._shortcut(food, distance)
+        if path is not None and room - (distance - len(path)) >= margin:
+            self._path.extend(path)
+
+    def _repair(self):
+        """Re-routes from the head to the first usable cell on the path, or drops the path."""
+        gap = self._gap()
+        last = 0
+        for i, cell in enumerate(self._path):
+            ahead = self._ahead(cell)
+            if ahead <= last or ahead >= gap:
+                break
+            if i > 0 and not self.state.snake.occupies(*cell):
+                detour = self._shortcut(cell, ahead)
+                if detour is None:
+                    break
+                self.repairs += 1
+                for _ in range(i + 1):
+                    self._path.popleft()
+                self._path.extendleft(reversed(detour))
+                return
+            last = ahead
+        self._path.clear()
+
+    def _open_direction(self):
+        """The safe direction with the most room, counted up to the body length; or None."""
+        snake = self.state.snake
+        head = snake.head
+        limit = len(snake.body) + 1
+        best, best_area = None, 0
+        for direction in DIRECTIONS:
+            cell = (head[0] + direction[0], head[1] + direction[1])
+            if not self._passable(cell):
+                continue
+            area = self._flood(cell, limit)
+            if area > best_area:
+                best, best_area = direction, area
+        return best
+
+    def _flood(self, start, limit):
+        """Number of free cells reachable from ``start``, stopping at ``limit``."""
+        snake = self.state.snake
+        seen = {start}
+        queue = deque([start])
+        while queue and len(seen) < limit:
+            x, y = queue.popleft()
+            for dx, dy in DIRECTIONS:
+                cell = (x + dx, y + dy)
+                if (cell not in seen and 0 <= cell[0] < snake.width and 0 <= cell[1] < snake.height and
+                        not snake.occupies(*cell)):
+                    seen.add(cell)
+                    queue.append(cell)
+        return len(seen)
+
+    def stats(self):
+        """Planning time per tick (p50, p99 and max in ms) and planner counters."""
+        count = min(self._ticks, self.history)
+        times = sorted(self._times[:count])
+        if times:
+            last = count - 1
+            p50, p99, worst = (1000.0 * times[round(last * 0.5)], 1000.0 * times[round(last * 0.99)],
+                               1000.0 * times[-1])
+        else:
+            p50 = p99 = worst = 0.0
+        return {"p50_ms": p50, "p99_ms": p99, "max_ms": worst, "plans": self.plans,
+                "repairs": self.repairs, "reuses": self.reuses, "fallbacks": self.fallbacks}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the autopilot headlessly until the board is full")
+    parser.add_argument("--width", type=int, default=30)
+    parser.add_argument("--height", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-ticks", type=int, default=None, help="stop after this many ticks")
+    parser.add_argument("--report-every", type=int, default=100000, help="ticks between progress lines")
+    parser.add_argument("--replay", help="record the run to this replay file")
+    args = parser.parse_args(argv)
+
+    state = GameState(args.width, args.height, seed=args.seed)
+    if args.replay:
+        from replay import ReplayWriter
+        state.recorder = ReplayWriter(args.replay, state)
+    pilot = Autopilot(state)
+    cells = args.width * args.height
+    start = time.perf_counter()
+    outcome = "tick limit"
+    while args.max_ticks is None or state.ticks < args.max_ticks:
+        if len(state.snake.body) >= pilot.capacity:
+            outcome = "board full"
+            break
+        pilot.steer()
+        if state.step() == DIED:
+            outcome = "died"
+            break
+        if state.ticks % args.report_every == 0:
+            print(f"tick {state.ticks}: length {len(state.snake.body)}/{cells}")
+    elapsed = time.perf_counter() - start
+    if state.recorder is not None:
+        state.recorder.finish(state)
+
+    stats = pilot.stats()
+    print(f"{outcome} after {state.ticks} ticks ({state.ticks / max(elapsed, 1e-9):,.0f} ticks/s), "
+          f"seed {state.seed}, length {len(state.snake.body)}/{cells}, score {state.score}")
+    print(f"planning per tick: p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms, "
+          f"max {stats['max_ms']:.3f} ms; plans {stats['plans']}, repairs {stats['repairs']}, "
+          f"reuses {stats['reuses']}, fallbacks {stats['fallbacks']}")
+    return 1 if outcome == "died" else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""Performance benchmarks for the snake game.
+
+Runs headless under SDL's dummy video and audio drivers and measures:
+
+* ``Snake.move`` + ``check_collision`` throughput at several snake lengths,
+* ``Snake.draw`` and ``Game._draw_elements`` frame time at those lengths,
+  with the dirty-rect renderer and with the NumPy array renderer, and
+  ``Snake.draw`` with each cheaper sprite look the quality governor uses,
+* ``Food.respawn`` cost on a nearly full board,
+* top-10 queries on the score history (all time, per player, per day)
+  over ``SCORE_ROWS`` runs,
+* vectorized environment steps per second, in-process and over 1, 2, 4
+  and 8 shared-memory workers (as many as there are cores),
+* cold start of ``Game()`` up to the first displayed frame.
+
+Usage::
+
+    python benchmarks/bench.py --output results.json
+    python benchmarks/bench.py --output new.json --compare baseline.json --threshold 0.15
+
+With ``--compare`` the exit status is 1 if any metric regressed by more than
+the threshold against the baseline file.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+LENGTHS = (10, 1000, 100000)
+MIN_TIME = 0.5 # Seconds each measurement runs for
+ENV_GAMES = 1024 # Games in the vectorized environment, split over the workers
+ENV_WORKERS = (1, 2, 4, 8)
+SCORE_ROWS = 2000000 # Runs in the score history the queries are timed over
+DATA_PATHS = ("SCORE_DB", "HIGH_SCORE_FILE", "SETTINGS_FILE", "SAVE_FILE", "SOUND_CACHE_DIR") # What app writes
+
+
+def _use_data_dir(app, directory):
+    """Points every file the game reads or writes (scores, settings, saves, sound cache) into ``directory``."""
+    for name in DATA_PATHS:
+        setattr(app, name, os.path.join(directory, os.path.basename(getattr(app, name))))
+
+
+def _close_game(game):
+    """Finishes the game's background work so its data directory can be removed."""
+    game.sounds.wait()
+    game.store.close()
+    if game.scores is not None:
+        game.scores.close()
+
+
+def _cycle_board(length):
+    """Board size (even height) with room for a snake of ``length`` plus slack."""
+    side = 2 * (int((length * 1.25) ** 0.5) // 2 + 2)
+    return side, side
+
+
+def _cycle_next(width, height):
+    """Next-direction table of a Hamiltonian cycle over the board, indexed by packed cell.
+
+    Row 0 runs right, the remaining rows snake back and forth over columns
+    1.., and column 0 leads back up to the start. ``height`` must be even.
+    """
+    from simulation import DOWN, LEFT, RIGHT, UP
+
+    table = [None] * (width * height)
+    for y in range(height):
+        for x in range(width):
+            if x == 0 and y > 0:
+                d = UP
+            elif y == 0:
+                d = RIGHT if x < width - 1 else DOWN
+            elif y % 2 == 1:
+                if x > 1:
+                    d = LEFT
+                else:
+                    d = DOWN if y < height - 1 else LEFT
+            else:
+                d = RIGHT if x < width - 1 else DOWN
+            table[y * width + x] = d
+    return table
+
+
+def _grown_snake(snake_class, length):
+    """A snake of exactly ``length`` segments following a Hamiltonian cycle, and the cycle."""
+    width, height = _cycle_board(length)
+    snake = snake_class(width, height)
+    cycle = _cycle_next(width, height)
+    snake.length = length
+    while len(snake.body) < length:
+        x, y = snake.head
+        snake.direction = cycle[y * width + x]
+        snake.move()
+    return snake, cycle
+
+
+def _advance(snake, cycle):
+    """Moves the snake one step along its cycle."""
+    x, y = snake.head
+    snake.direction = cycle[y * snake.width + x]
+    snake.move()
+    return snake.check_collision()
+
+
+def _measure(fn, min_time=MIN_TIME):
+    """Calls ``fn`` repeatedly for at least ``min_time`` seconds; returns (calls, seconds)."""
+    calls = 0
+    batch = 1
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            fn()
+        calls += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls, elapsed
+        batch *= 2
+
+
+def bench_move(results):
+    """Snake.move + check_collision throughput."""
+    import app
+
+    for length in LENGTHS:
+        snake, cycle = _grown_snake(app.Snake, length)
+        calls, elapsed = _measure(lambda: _advance(snake, cycle))
+        results[f"snake_move_collision_{length}"] = {
+            "value": calls / elapsed, "unit": "ops/s", "higher_is_better": True}
+
+
+def bench_draw(results):
+    """Snake.draw and Game._draw_elements frame time on the game's window."""
+    import app
+    import pygame
+    from simulation import GameState
+    from sprites import LOOKS
+
+    with tempfile.TemporaryDirectory() as directory:
+        _use_data_dir(app, directory)
+        game = app.Game()
+        try:
+            for length in LENGTHS:
+                snake, cycle = _grown_snake(app.Snake, length)
+                calls, elapsed = _measure(lambda: snake.draw(game.screen))
+                results[f"snake_draw_{length}"] = {
+                    "value": 1000.0 * elapsed / calls, "unit": "ms", "higher_is_better": False}
+                for look in LOOKS[1:]:
+                    calls, elapsed = _measure(lambda: snake.draw(game.screen, look=look))
+                    results[f"snake_draw_{look}_{length}"] = {
+                        "value": 1000.0 * elapsed / calls, "unit": "ms", "higher_is_better": False}
+
+                # One tick per frame, as in steady play
+                game.state = GameState(snake.width, snake.height, snake_factory=lambda w, h: snake,
+                                       food_factory=app.Food)
+                game.game_state = "PLAYING"
+                game.renderer.invalidate()
+
+                def frame():
+                    _advance(snake, cycle)
+                    rects = game._draw_elements()
+                    if rects is None:
+                        pygame.display.update()
+                    else:
+                        pygame.display.update(rects)
+
+                calls, elapsed = _measure(frame)
+                results[f"draw_elements_{length}"] = {
+                    "value": 1000.0 * elapsed / calls, "unit": "ms", "higher_is_better": False}
+
+                game._set_render_mode("array")
+                if game.render_mode == "array":
+                    calls, elapsed = _measure(frame)
+                    results[f"draw_elements_array_{length}"] = {
+                        "value": 1000.0 * elapsed / calls, "unit": "ms", "higher_is_better": False}
+                game._set_render_mode(app.RENDER_MODE)
+        finally:
+            _close_game(game)
+
+
+def bench_respawn(results, fill=0.99):
+    """Food.respawn on a board that is ``fill`` covered by the snake."""
+    import app
+    from simulation import FreeCells
+
+    width, height = 1000, 1000
+    free_cells = FreeCells(width * height)
+    for cell in random.Random(0).sample(range(width * height), int(width * height * fill)):
+        free_cells.take(cell)
+    food = app.Food(width, height, rng=random.Random(1), free_cells=free_cells)
+    calls, elapsed = _measure(food.respawn)
+    results[f"food_respawn_fill_{int(fill * 100)}"] = {
+        "value": 1e6 * elapsed / calls, "unit": "us", "higher_is_better": False}
+
+
+def bench_scores(results, players=1000, days=365):
+    """ScoreStore top-10 queries over a history of SCORE_ROWS runs."""
+    from scores import EATEN_COLUMNS, INDEXES, INSERT, ScoreStore, connect, day_of
+
+    rng = random.Random(0)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "scores.db")
+        conn = connect(path)
+        for name in INDEXES:
+            conn.execute(f"DROP INDEX {name}") # Building them after the rows are in is much faster
+        conn.execute("BEGIN")
+        for _ in range(SCORE_ROWS // 10000):
+            rows = []
+            for _ in range(10000):
+                played_at = now - rng.random() * 86400 * days
+                rows.append((played_at, day_of(played_at), f"player{rng.randrange(players)}", "bench",
+                             int(rng.expovariate(1 / 30)), 10, 1000, None, *[1] * len(EATEN_COLUMNS)))
+            conn.executemany(INSERT, rows)
+        conn.execute("COMMIT")
+        conn.close()
+
+        store = ScoreStore(path)
+        queries = {
+            "all": lambda: store.top(10),
+            "player": lambda: store.top(10, player="player7"),
+            "day": lambda: store.top(10, day=day_of(now)),
+        }
+        for name, query in queries.items():
+            calls, elapsed = _measure(query)
+            results[f"scores_top10_{name}"] = {
+                "value": 1e6 * elapsed / calls, "unit": "us", "higher_is_better": False}
+        store.close()
+
+
+def bench_env(results):
+    """Vectorized environment steps (games x ticks) per second, by number of workers."""
+    import numpy as np
+    from vector_env import SharedMemoryVecEnv, SnakeVecEnv
+
+    actions = np.random.default_rng(0).integers(-1, 4, (64, ENV_GAMES))
+
+    def run(env):
+        env.reset()
+        step = itertools.count()
+        calls, elapsed = _measure(lambda: env.step(actions[next(step) % len(actions)]))
+        return ENV_GAMES * calls / elapsed
+
+    results["env_steps_in_process"] = {
+        "value": run(SnakeVecEnv(ENV_GAMES, seed=0)), "unit": "steps/s", "higher_is_better": True}
+    for workers in ENV_WORKERS:
+        if workers > 1 and workers > (os.cpu_count() or 1):
+            break
+        with SharedMemoryVecEnv(ENV_GAMES, workers, seed=0) as env:
+            results[f"env_steps_workers_{workers}"] = {
+                "value": run(env), "unit": "steps/s", "higher_is_better": True}
+
+
+COLD_START = """
+import os, sys, time
+start = time.perf_counter()
+import pygame, app
+for name in {paths!r}:
+    setattr(app, name, os.path.join(sys.argv[1], os.path.basename(getattr(app, name))))
+game = app.Game()
+game._splash_screen()
+pygame.display.update()
+print(time.perf_counter() - start)
+"""
+
+
+def bench_cold_start(results, runs=5):
+    """Import of app plus Game() up to the first splash frame, in a fresh interpreter."""
+    times = []
+    # Runs from the checkout for its assets, but keeps the game's files out of it;
+    # later runs find the sound cache the first one wrote
+    script = COLD_START.format(paths=DATA_PATHS)
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", script, directory], cwd=REPO_ROOT,
+                                 capture_output=True, text=True, check=True)
+            times.append(float(out.stdout.strip().splitlines()[-1]))
+    results["cold_start"] = {
+        "value": 1000.0 * min(times), "unit": "ms", "higher_is_better": False}
+
+
+BENCHMARKS = {
+    "move": bench_move,
+    "draw": bench_draw,
+    "respawn": bench_respawn,
+    "scores": bench_scores,
+    "env": bench_env,
+    "cold_start": bench_cold_start,
+}
+
+
+def compare(results, baseline, threshold):
+    """Returns human-readable lines for metrics that regressed past ``threshold``."""
+    regressions = []
+    for name, metric in results.items():
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            continue
+        if metric["higher_is_better"]:
+            change = (base["value"] - metric["value"]) / base["value"]
+        else:
+            change = (metric["value"] - base["value"]) / base["value"]
+        if change > threshold:
+            regressions.append(f"{name}: {base['value']:.4g} -> {metric['value']:.4g} "
+                               f"{metric['unit']} ({change:+.1%} worse)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snake game performance benchmarks")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON to check against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed relative regression per metric (default: 0.10)")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS),
+                        help="run only these benchmark groups")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        BENCHMARKS[name](results)
+
+    for name, metric in results.items():
+        print(f"{name:32s} {metric['value']:14.4f} {metric['unit']}")
+
+    report = {
+        "metadata": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "metrics": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Scrolling viewport onto a board larger than the window.
+
+The camera keeps the snake's head centred, stopping at the board's edges,
+and converts between board cells and screen pixels. Drawing code asks it
+for the range of cells in view so it only touches what is on screen.
+"""
+import math
+
+
+class Camera:
+    """A ``view_width`` x ``view_height`` pixel window onto a board of cells.
+
+    ``x`` and ``y`` are the board cell (fractional while scrolling) shown
+    at the window's top-left corner. When the board fits in the window the
+    camera never moves and ``fixed`` is True.
+    """
+    def __init__(self, view_width, view_height, block_size, board_width, board_height):
+        self.view_width = view_width
+        self.view_height = view_height
+        self.block_size = block_size
+        self.board_width = board_width
+        self.board_height = board_height
+        self.x = 0.0
+        self.y = 0.0
+
+    @property
+    def fixed(self):
+        """True if the whole board is always in view."""
+        return (self.board_width * self.block_size <= self.view_width and
+                self.board_height * self.block_size <= self.view_height)
+
+    def follow(self, cell):
+        """Centres the view on a (possibly fractional) cell, clamped to the board."""
+        cols = self.view_width / self.block_size
+        rows = self.view_height / self.block_size
+        self.x = min(max(cell[0] + 0.5 - cols / 2, 0.0), max(self.board_width - cols, 0.0))
+        self.y = min(max(cell[1] + 0.5 - rows / 2, 0.0), max(self.board_height - rows, 0.0))
+
+    def to_screen(self, cell):
+        """Top-left pixel of a (possibly fractional) board cell."""
+        return (round((cell[0] - self.x) * self.block_size), round((cell[1] - self.y) * self.block_size))
+
+    def visible_cells(self, overhang=0):
+        """Inclusive cell range ``(x0, y0, x1, y1)`` that can show on screen.
+
+        Sprites reach ``overhang`` pixels right of and below their cell, so
+        cells that far beyond the top-left edge are included too.
+        """
+        block = self.block_size
+        x0 = math.floor(self.x - overhang / block)
+        y0 = math.floor(self.y - overhang / block)
+        x1 = math.floor(self.x + (self.view_width - 1) / block)
+        y1 = math.floor(self.y + (self.view_height - 1) / block)
+        return (max(x0, 0), max(y0, 0), min(x1, self.board_width - 1), min(y1, self.board_height - 1))
+
+    def grid_lines(self):
+        """Pixel positions of the vertical and horizontal grid lines in view."""
+        block = self.block_size
+        first_x = round(-(self.x % 1.0) * block)
+        first_y = round(-(self.y % 1.0) * block)
+        return (range(first_x, self.view_width, block), range(first_y, self.view_height, block))
@@ -0,0 +1,118 @@
+"""Font registry and rendered-text cache.
+
+``pygame.font.SysFont`` does a system font lookup and builds a new Font on
+every call, and ``Font.render`` allocates a new surface each time. The game
+draws the same few strings every frame, so both are cached here.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import pygame
+
+
+def _default_font(size, bold=False):
+    """pygame's bundled font; needs no system font scan."""
+    font = pygame.font.Font(None, size)
+    font.set_bold(bold)
+    return font
+
+
+class FontRegistry:
+    """Creates each (name, size, bold) font once and hands out the same object.
+
+    The first lookup of a named system font scans every installed font,
+    which is slow. ``start_discovery`` runs that scan on a worker thread;
+    until it finishes, named fonts are stood in for by the default font
+    (not cached), and ``generation`` goes up once the real fonts are
+    available so caches of rendered text know to refresh.
+    """
+    def __init__(self):
+        self.generation = 0
+        self.discovery_time = None # Seconds the font scan took, once done
+        self._fonts = {}
+        self._discovered = threading.Event()
+        self._discovering = False
+
+    def __len__(self):
+        return len(self._fonts)
+
+    @property
+    def ready(self):
+        """True once system fonts can be looked up without blocking."""
+        return self._discovered.is_set()
+
+    def start_discovery(self):
+        """Scans the system fonts in the background."""
+        self._discovering = True
+        threading.Thread(target=self._discover, name="font-discovery", daemon=True).start()
+
+    def _discover(self):
+        start = time.perf_counter()
+        pygame.font.get_fonts() # Fills pygame's system font table
+        self.discovery_time = time.perf_counter() - start
+        self.generation += 1
+        self._discovered.set()
+
+    def get(self, name, size, bold=False):
+        """Returns the font, falling back to pygame's default font if ``name`` fails."""
+        key = (name, size, bold)
+        font = self._fonts.get(key)
+        if font is not None:
+            return font
+        if name is None:
+            font = _default_font(size, bold)
+        elif self._discovering and not self.ready:
+            return _default_font(size, bold) # Placeholder while the scan runs
+        else:
+            try:
+                font = pygame.font.SysFont(name, size, bold=bold)
+            except pygame.error:
+                font = _default_font(size, bold)
+        self._fonts[key] = font
+        return font
+
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces.
+
+    Keyed by (text, size, colour, font name, bold). ``hits`` and ``misses``
+    count lookups so it is easy to check that steady-state frames stop
+    allocating surfaces.
+    """
+    def __init__(self, fonts, max_entries=256):
+        self.fonts = fonts
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generation = fonts.generation
+        self._surfaces = OrderedDict()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def render(self, text, size, color, font=None, bold=False):
+        """Returns an antialiased surface for ``text``, rendering it on a miss."""
+        if self.fonts.generation != self._generation:
+            self._surfaces.clear() # Rendered with placeholder fonts
+            self._generation = self.fonts.generation
+        key = (text, size, color, font, bold)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.fonts.get(font, size, bold).render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self._surfaces)}
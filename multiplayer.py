@@ -0,0 +1,779 @@
+"""Authoritative multiplayer: several snakes on one board over asyncio.
+
+The server owns an ``Arena`` (the rules for many snakes on a shared board)
+and steps it at a fixed tick rate. Clients only send turns, one byte per
+turn, and mirror the board in a ``ClientBoard`` from what the server sends:
+
+* a welcome with the client's player id, the board size and the tick rate;
+* every tick, a delta: per snake the head cell added and the tail cell
+  removed, spawns, removals and score changes, plus the food that moved.
+  A delta is encoded once and the same bytes go to every client, so its
+  cost follows the number of snakes, not their length;
+* every KEYFRAME_TICKS ticks, and whenever a client joins or falls behind,
+  a keyframe with every body in full.
+
+Every message is a u32 length followed by the payload, all little-endian.
+Cells are packed as ``y * width + x``. Speed effects don't apply: the tick
+rate is shared by every player.
+
+Run a server and a swarm of scripted bots on localhost::
+
+    python multiplayer.py serve --port 7777
+    python multiplayer.py bots --port 7777 --clients 64 --seconds 30
+    python multiplayer.py loadtest --clients 64 --seconds 10
+
+Set ``MULTIPLAYER_SERVER`` in app.py and press F4 on the main menu to join.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import struct
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+
+from simulation import (
+    DIRECTION_INDEX, DIRECTIONS, DOWN, FOOD_NAMES, FPS_BASE, LEFT, RIGHT, UP,
+    FoodState, FreeCells, InputQueue, SnakeState,
+)
+
+# --- Arena ---
+ARENA_WIDTH = 80
+ARENA_HEIGHT = 60
+FOODS = 16 # Food items on the board at once
+MAX_FOODS = 255 # Food counts are one byte in keyframes and deltas
+MAX_PLAYERS = 0x10000 # Player ids are two bytes
+RESPAWN_TICKS = 20 # Ticks a player waits after dying
+SPAWN_CLEARANCE = 3 # Free cells a new snake needs ahead of it
+SPAWN_TRIES = 32 # Random cells tried per tick for a spawn
+
+# --- Server ---
+PORT = 7777
+TICK_RATE = FPS_BASE
+KEYFRAME_TICKS = 100 # Ticks between keyframes to every client
+MAX_BACKLOG = 256 * 1024 # Unsent bytes after which a client gets no deltas until it catches up
+
+# --- Messages ---
+WELCOME = b"W"
+KEYFRAME = b"K"
+DELTA = b"D"
+FRAME = struct.Struct("<I")
+WELCOME_BODY = struct.Struct("<cHHHH") # kind, your id, width, height, tick rate
+KEYFRAME_HEADER = struct.Struct("<cIHB") # kind, tick, snakes, foods
+KEYFRAME_SNAKE = struct.Struct("<HIBI") # id, score, direction, body cells (then i32 cells, tail first)
+DELTA_HEADER = struct.Struct("<cIHB") # kind, tick, changes, food changes
+CHANGE = struct.Struct("<HBii") # id, flags, head added, tail removed (-1 for none)
+SCORE = struct.Struct("<I") # Follows a change with SCORED
+FOOD_CHANGE = struct.Struct("<BiB") # slot, cell (-1 for none), type index
+
+# --- Change Flags ---
+SPAWNED = 1 # A new one-cell snake on the added cell
+REMOVED = 2 # The snake died or its player left
+SCORED = 4 # The score follows
+
+
+class ProtocolError(Exception):
+    """Raised for a message the client can't make sense of."""
+
+
+class Player:
+    """A connected player: their snake (None while waiting to spawn) and score."""
+    def __init__(self, player_id, respawn_at):
+        self.id = player_id
+        self.snake = None
+        self.inputs = InputQueue()
+        self.score = 0
+        self.deaths = 0
+        self.respawn_at = respawn_at
+
+
+class Arena:
+    """The rules for many snakes on one board, stepped one tick at a time.
+
+    Snakes move at the same time. A tail leaves before any head arrives, a
+    head on a wall or any body dies, and two heads on one cell both die.
+    Dead snakes leave the board and their players respawn RESPAWN_TICKS
+    later on a free cell. ``step`` returns what changed, for the deltas.
+    """
+    def __init__(self, width=ARENA_WIDTH, height=ARENA_HEIGHT, foods=FOODS, seed=None):
+        if not 1 <= foods <= MAX_FOODS:
+            raise ValueError(f"foods must be 1 to {MAX_FOODS}, not {foods}")
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        self.free_cells = FreeCells(width * height)
+        self.owner = array("i", [-1]) * (width * height) # Player id on each cell
+        self.players = {}
+        self.foods = []
+        for _ in range(foods):
+            self.foods.append(FoodState(width, height, rng=self.rng, free_cells=self.free_cells))
+            self._place_food(len(self.foods) - 1)
+        self.ticks = 0
+        self._next_id = 0
+        self._left = []
+
+    def add_player(self):
+        """Adds a player who spawns on the next tick; returns their id.
+
+        Ids wrap around after MAX_PLAYERS, skipping any still in use.
+        Raises ValueError when every id is taken.
+        """
+        if len(self.players) >= MAX_PLAYERS:
+            raise ValueError("arena is full")
+        while self._next_id in self.players:
+            self._next_id = (self._next_id + 1) % MAX_PLAYERS
+        player = Player(self._next_id, self.ticks)
+        self._next_id = (self._next_id + 1) % MAX_PLAYERS
+        self.players[player.id] = player
+        return player.id
+
+    def remove_player(self, player_id):
+        """Takes a player and their snake off the board."""
+        player = self.players.pop(player_id, None)
+        if player is not None and player.snake is not None:
+            self._release(player)
+            self._left.append(player_id)
+
+    def queue_turn(self, player_id, direction):
+        """Buffers a turn for a player's snake; returns True if accepted."""
+        player = self.players.get(player_id)
+        if player is None or player.snake is None:
+            return False
+        return player.inputs.push(direction, player.snake.direction)
+
+    def _release(self, player):
+        """Frees the cells of a player's snake."""
+        for cell in player.snake.packed():
+            if self.owner[cell] == player.id: # A head that ran into someone else isn't its cell
+                self.owner[cell] = -1
+                self.free_cells.release(cell)
+        player.snake = None
+        player.inputs.clear()
+
+    def _place_food(self, slot):
+        """Respawns a food item on a free cell no other food is on."""
+        food = self.foods[slot]
+        taken = {other.position for other in self.foods if other is not food}
+        for _ in range(SPAWN_TRIES):
+            food.respawn()
+            if food.position not in taken:
+                return
+        food.position = None # Too crowded; tried again when another food is eaten
+
+    def _spawn(self, player):
+        """Puts a new snake on a free cell with room ahead of it; returns False if none was found."""
+        width, height = self.width, self.height
+        foods = {food.position for food in self.foods}
+        for _ in range(SPAWN_TRIES):
+            cell = self.free_cells.choice(self.rng)
+            if cell is None:
+                return False
+            x, y = cell % width, cell // width
+            if (x, y) in foods:
+                continue
+            dx, dy = width // 2 - x, height // 2 - y # Head for the middle of the board
+            if abs(dx) >= abs(dy):
+                direction = RIGHT if dx >= 0 else LEFT
+            else:
+                direction = DOWN if dy >= 0 else UP
+            ahead = [(x + direction[0] * i, y + direction[1] * i) for i in range(1, SPAWN_CLEARANCE + 1)]
+            if all(0 <= ax < width and 0 <= ay < height and ay * width + ax in self.free_cells for ax, ay in ahead):
+                player.snake = SnakeState(width, height, free_cells=self.free_cells, start=cell)
+                player.snake.direction = direction
+                player.snake.change_log = []
+                player.score = 0
+                self.owner[cell] = player.id
+                return True
+        return False
+
+    def step(self):
+        """Advances every snake one tick.
+
+        Returns ``(changes, food_changes)``: ``(id, flags, added, removed,
+        score)`` per snake that changed and ``(slot, cell, type index)`` per
+        food that moved.
+        """
+        self.ticks += 1
+        changes = [(player_id, REMOVED, -1, -1, 0) for player_id in self._left]
+        self._left.clear()
+        alive = [player for player in self.players.values() if player.snake is not None]
+        for player in alive:
+            turn = player.inputs.pop()
+            if turn is not None:
+                player.snake.change_direction(turn)
+            player.snake.move()
+
+        # Tails leave before heads arrive, as for a single snake
+        owner = self.owner
+        for player in alive:
+            for entry in player.snake.change_log:
+                if entry < 0:
+                    owner[~entry] = -1
+        dead = set()
+        heads = {}
+        for player in alive:
+            if player.snake.check_collision():
+                dead.add(player)
+                continue
+            head = player.snake.change_log[-1]
+            if owner[head] != -1:
+                dead.add(player)
+                if head in heads:
+                    dead.add(heads[head]) # Head-on: both die
+            else:
+                owner[head] = player.id
+                heads[head] = player
+        for player in dead:
+            self._release(player)
+            player.deaths += 1
+            player.respawn_at = self.ticks + RESPAWN_TICKS
+            changes.append((player.id, REMOVED, -1, -1, 0))
+        # A tail released after another head took its cell must stay taken
+        for head, player in heads.items():
+            if player not in dead:
+                self.free_cells.take(head)
+
+        food_changes = []
+        foods_at = {food.position: slot for slot, food in enumerate(self.foods)}
+        for player in alive:
+            if player in dead:
+                continue
+            snake = player.snake
+            flags = 0
+            slot = foods_at.get(snake.head)
+            if slot is not None:
+                power = self.foods[slot].properties["power"]
+                snake.grow(power)
+                player.score += power
+                flags = SCORED
+                self._place_food(slot)
+            added, removed = -1, -1
+            for entry in snake.change_log:
+                if entry < 0:
+                    removed = ~entry
+                else:
+                    added = entry
+            snake.change_log.clear()
+            changes.append((player.id, flags, added, removed, player.score))
+        for slot, food in enumerate(self.foods):
+            if food.position is None:
+                self._place_food(slot)
+            if food.position is None or foods_at.get(food.position) != slot:
+                food_changes.append((slot, self._food_cell(food), FOOD_NAMES.index(food.type)))
+
+        for player in self.players.values():
+            if player.snake is None and player.respawn_at <= self.ticks and self._spawn(player):
+                changes.append((player.id, SPAWNED | SCORED, player.snake.head[1] * self.width + player.snake.head[0],
+                                -1, player.score))
+        return changes, food_changes
+
+    def _food_cell(self, food):
+        """Packed cell of a food item, or -1 when it has none."""
+        return -1 if food.position is None else food.position[1] * self.width + food.position[0]
+
+
+def encode_welcome(player_id, width, height, tick_rate):
+    """The first message a client gets."""
+    return WELCOME_BODY.pack(WELCOME, player_id, width, height, tick_rate)
+
+
+def encode_delta(tick, changes, food_changes):
+    """One tick's changes as a delta message."""
+    parts = [DELTA_HEADER.pack(DELTA, tick, len(changes), len(food_changes))]
+    for player_id, flags, added, removed, score in changes:
+        parts.append(CHANGE.pack(player_id, flags, added, removed))
+        if flags & SCORED:
+            parts.append(SCORE.pack(score))
+    parts.extend(FOOD_CHANGE.pack(*change) for change in food_changes)
+    return b"".join(parts)
+
+
+def encode_keyframe(arena):
+    """The whole board as a keyframe message."""
+    players = [player for player in arena.players.values() if player.snake is not None]
+    parts = [KEYFRAME_HEADER.pack(KEYFRAME, arena.ticks, len(players), len(arena.foods))]
+    for slot, food in enumerate(arena.foods):
+        parts.append(FOOD_CHANGE.pack(slot, arena._food_cell(food), FOOD_NAMES.index(food.type)))
+    for player in players:
+        cells = player.snake.packed()
+        parts.append(KEYFRAME_SNAKE.pack(player.id, player.score, DIRECTION_INDEX[player.snake.direction], len(cells)))
+        if sys.byteorder != "little":
+            cells.byteswap()
+        parts.append(cells.tobytes())
+    return b"".join(parts)
+
+
+def frame(payload):
+    """Prefixes a message with its length."""
+    return FRAME.pack(len(payload)) + payload
+
+
+async def read_frame(reader):
+    """The next message from ``reader``, or None at the end of the stream."""
+    try:
+        header = await reader.readexactly(FRAME.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    return await reader.readexactly(FRAME.unpack(header)[0])
+
+
+class ClientBoard:
+    """A client's mirror of the server's board, built from its messages.
+
+    ``snakes`` maps player ids to snakes made by ``snake_factory``;
+    ``foods`` is a list of ``(cell, food type)``. A delta that doesn't fit
+    the mirror (or follows a gap) leaves it out of sync until the next
+    keyframe; ``desyncs`` counts those. Keyframes that arrive in sync are
+    compared with the mirror, and ``mismatches`` counts the differences.
+    """
+    def __init__(self, snake_factory=SnakeState):
+        self.snake_factory = snake_factory
+        self.you = None
+        self.width = self.height = self.tick_rate = None
+        self.tick = 0
+        self.snakes = {}
+        self.scores = {}
+        self.foods = []
+        self.free_cells = None
+        self.synced = False
+        self.desyncs = 0
+        self.keyframes_checked = 0
+        self.mismatches = 0
+        self.messages = 0
+        self.bytes_received = 0
+
+    def apply(self, payload):
+        """Applies one message; returns its kind. Raises ProtocolError for a malformed one."""
+        self.messages += 1
+        self.bytes_received += FRAME.size + len(payload)
+        kind = payload[:1]
+        try:
+            if kind == WELCOME:
+                _, self.you, self.width, self.height, self.tick_rate = WELCOME_BODY.unpack(payload)
+            elif kind == KEYFRAME:
+                self._keyframe(payload)
+            elif kind == DELTA:
+                self._delta(payload)
+            else:
+                raise ProtocolError(f"unknown message kind {kind!r}")
+        except (struct.error, IndexError, ValueError, TypeError) as e:
+            # Out-of-range directions, food types or cells, or a keyframe before the welcome
+            self.synced = False
+            raise ProtocolError(f"malformed {kind!r} message: {e}") from None
+        return kind
+
+    def _new_snake(self, cell):
+        return self.snake_factory(self.width, self.height, free_cells=self.free_cells, start=cell)
+
+    def _keyframe(self, payload):
+        _, tick, snakes, foods = KEYFRAME_HEADER.unpack_from(payload)
+        offset = KEYFRAME_HEADER.size
+        self.foods = []
+        for _ in range(foods):
+            _, cell, food_type = FOOD_CHANGE.unpack_from(payload, offset)
+            self.foods.append((cell, FOOD_NAMES[food_type]))
+            offset += FOOD_CHANGE.size
+        bodies = {}
+        for _ in range(snakes):
+            player_id, score, direction, count = KEYFRAME_SNAKE.unpack_from(payload, offset)
+            offset += KEYFRAME_SNAKE.size
+            cells = array("i")
+            cells.frombytes(payload[offset:offset + 4 * count])
+            if len(cells) != count:
+                raise ProtocolError("keyframe is truncated")
+            if sys.byteorder != "little":
+                cells.byteswap()
+            offset += 4 * count
+            bodies[player_id] = (score, DIRECTIONS[direction], cells)
+
+        if self.synced and tick == self.tick:
+            self.keyframes_checked += 1
+            if {player_id: snake.packed() for player_id, snake in self.snakes.items()} != \
+                    {player_id: cells for player_id, (_, _, cells) in bodies.items()}:
+                self.mismatches += 1
+        self.free_cells = FreeCells(self.width * self.height)
+        self.snakes = {}
+        self.scores = {}
+        for player_id, (score, direction, cells) in bodies.items():
+            snake = self._new_snake(cells[0])
+            snake.restore(cells, direction, len(cells))
+            self.snakes[player_id] = snake
+            self.scores[player_id] = score
+        self.tick = tick
+        self.synced = True
+
+    def _delta(self, payload):
+        _, tick, count, foods = DELTA_HEADER.unpack_from(payload)
+        if not self.synced or tick != self.tick + 1:
+            if self.synced:
+                self.desyncs += 1
+            self.synced = False
+            return
+        self.tick = tick
+        offset = DELTA_HEADER.size
+        changes = []
+        for _ in range(count):
+            player_id, flags, added, removed = CHANGE.unpack_from(payload, offset)
+            offset += CHANGE.size
+            if flags & SCORED:
+                self.scores[player_id] = SCORE.unpack_from(payload, offset)[0]
+                offset += SCORE.size
+            changes.append((player_id, flags, added, removed))
+        for _ in range(foods):
+            slot, cell, food_type = FOOD_CHANGE.unpack_from(payload, offset)
+            offset += FOOD_CHANGE.size
+            if slot < len(self.foods):
+                self.foods[slot] = (cell, FOOD_NAMES[food_type])
+
+        try:
+            # Removals and tails first, so a head may take a cell freed this tick
+            for player_id, flags, added, removed in changes:
+                if flags & REMOVED:
+                    snake = self.snakes.pop(player_id, None)
+                    self.scores.pop(player_id, None)
+                    if snake is not None:
+                        for cell in snake.packed():
+                            self.free_cells.release(cell)
+                elif removed >= 0:
+                    self.snakes[player_id].apply(removed=removed)
+            for player_id, flags, added, removed in changes:
+                if flags & SPAWNED:
+                    self.snakes[player_id] = self._new_snake(added)
+                elif not flags & REMOVED and added >= 0:
+                    self.snakes[player_id].apply(added=added)
+        except (KeyError, ValueError):
+            self.desyncs += 1
+            self.synced = False
+
+
+class _Connection:
+    """The server's side of one client."""
+    def __init__(self, writer):
+        self.writer = writer
+        self.needs_keyframe = True
+
+
+class Server:
+    """Steps an Arena at ``tick_rate`` and streams it to every connected client."""
+    def __init__(self, arena=None, tick_rate=TICK_RATE, keyframe_ticks=KEYFRAME_TICKS, max_backlog=MAX_BACKLOG):
+        self.arena = arena if arena is not None else Arena()
+        self.tick_rate = tick_rate
+        self.keyframe_ticks = keyframe_ticks
+        self.max_backlog = max_backlog
+        self.clients = {}
+        self.tick_times = deque(maxlen=4096) # Seconds each tick took to step, encode and send
+        self.delta_sizes = deque(maxlen=4096)
+        self.late_ticks = 0 # Ticks that started more than one tick period late
+        self.skipped = 0 # Deltas not sent to a client that had fallen behind
+        self.bytes_sent = 0
+
+    async def _handle(self, reader, writer):
+        try:
+            player_id = self.arena.add_player()
+        except ValueError:
+            writer.close()
+            return
+        connection = self.clients[player_id] = _Connection(writer)
+        writer.write(frame(encode_welcome(player_id, self.arena.width, self.arena.height, self.tick_rate)))
+        try:
+            while True:
+                data = await reader.read(64)
+                if not data:
+                    break
+                for index in data:
+                    if index < len(DIRECTIONS):
+                        self.arena.queue_turn(player_id, DIRECTIONS[index])
+        except ConnectionError:
+            pass
+        finally:
+            if self.clients.get(player_id) is connection:
+                del self.clients[player_id]
+            self.arena.remove_player(player_id)
+            writer.close()
+
+    def tick(self):
+        """Steps the arena and sends the delta (and keyframes) to the clients."""
+        start = time.perf_counter()
+        changes, food_changes = self.arena.step()
+        delta = frame(encode_delta(self.arena.ticks, changes, food_changes))
+        self.delta_sizes.append(len(delta))
+        periodic = self.arena.ticks % self.keyframe_ticks == 0
+        keyframe = None
+        for connection in list(self.clients.values()):
+            writer = connection.writer
+            if writer.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > self.max_backlog:
+                connection.needs_keyframe = True # Catches up with a keyframe once drained
+                self.skipped += 1
+                continue
+            if not connection.needs_keyframe:
+                writer.write(delta)
+                self.bytes_sent += len(delta)
+            if connection.needs_keyframe or periodic:
+                if keyframe is None:
+                    keyframe = frame(encode_keyframe(self.arena))
+                writer.write(keyframe)
+                self.bytes_sent += len(keyframe)
+                connection.needs_keyframe = False
+        self.tick_times.append(time.perf_counter() - start)
+
+    async def serve(self, host="localhost", port=PORT, duration=None, ready=None):
+        """Accepts clients and ticks until cancelled, or for ``duration`` seconds."""
+        server = await asyncio.start_server(self._handle, host, port)
+        if ready is not None:
+            ready()
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_rate
+        start = next_tick = loop.time()
+        async with server:
+            while duration is None or loop.time() - start < duration:
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+                now = loop.time()
+                if now - next_tick > period:
+                    self.late_ticks += 1
+                    next_tick = now # Don't burst to catch up
+                self.tick()
+                next_tick += period
+            for connection in self.clients.values():
+                connection.writer.close()
+
+    def stats(self):
+        """Tick cost percentiles in milliseconds and traffic figures."""
+        times = sorted(self.tick_times)
+        if not times:
+            return {"clients": len(self.clients), "ticks": self.arena.ticks}
+        return {
+            "clients": len(self.clients),
+            "ticks": self.arena.ticks,
+            "tick_p50_ms": 1000.0 * times[len(times) // 2],
+            "tick_p99_ms": 1000.0 * times[min(len(times) - 1, int(0.99 * len(times)))],
+            "tick_max_ms": 1000.0 * times[-1],
+            "late_ticks": self.late_ticks,
+            "skipped": self.skipped,
+            "delta_bytes": statistics.fmean(self.delta_sizes),
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+def bot_direction(board, rng):
+    """A scripted bot's turn: the safe direction closest to a food, or None."""
+    snake = board.snakes.get(board.you)
+    if snake is None:
+        return None
+    x, y = snake.head
+    targets = [(cell % board.width, cell // board.width) for cell, _ in board.foods if cell >= 0]
+    best, best_distance = None, None
+    for direction in rng.sample(DIRECTIONS, len(DIRECTIONS)):
+        if direction[0] == -snake.direction[0] and direction[1] == -snake.direction[1]:
+            continue
+        nx, ny = x + direction[0], y + direction[1]
+        if not (0 <= nx < board.width and 0 <= ny < board.height) or ny * board.width + nx not in board.free_cells:
+            continue
+        distance = min((abs(nx - fx) + abs(ny - fy) for fx, fy in targets), default=0)
+        if best is None or distance < best_distance:
+            best, best_distance = direction, distance
+    return best
+
+
+async def run_bot(host, port, seconds, seed=None):
+    """Plays as a scripted bot for ``seconds``; returns its ClientBoard."""
+    rng = random.Random(seed)
+    board = ClientBoard()
+    reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+    end = loop.time() + seconds
+    try:
+        while loop.time() < end:
+            try:
+                payload = await asyncio.wait_for(read_frame(reader), max(0.0, end - loop.time()))
+            except asyncio.TimeoutError:
+                break
+            if payload is None:
+                break
+            if board.apply(payload) == DELTA and board.synced:
+                snake = board.snakes.get(board.you)
+                direction = bot_direction(board, rng)
+                if snake is not None and direction is not None and direction != snake.direction:
+                    snake.direction = direction # What the server will have after this turn
+                    writer.write(bytes([DIRECTION_INDEX[direction]]))
+            elif board.synced and board.you in board.snakes:
+                snake = board.snakes[board.you]
+                body = snake.packed()
+                if len(body) > 1:
+                    # The keyframe's direction may be about to change; follow the body
+                    dx = body[-1] % board.width - body[-2] % board.width
+                    dy = body[-1] // board.width - body[-2] // board.width
+                    snake.direction = (dx, dy)
+    finally:
+        writer.close()
+    return board
+
+
+class BackgroundClient:
+    """A connection on its own thread, for a game loop that isn't asyncio.
+
+    ``board`` is updated from the network thread; read it only while
+    holding ``lock``. ``error`` is set if the connection failed and
+    ``closed`` once it ended.
+    """
+    def __init__(self, host, port=PORT, snake_factory=SnakeState):
+        self.host = host
+        self.port = port
+        self.board = ClientBoard(snake_factory)
+        self.lock = threading.Lock()
+        self.error = None
+        self.closed = False
+        self._loop = None
+        self._task = None
+        self._writer = None
+        self._thread = None
+        self._closing = False
+
+    def start(self):
+        self._thread = threading.Thread(target=asyncio.run, args=(self._run(),), name="multiplayer", daemon=True)
+        self._thread.start()
+
+    async def _run(self):
+        self._task = asyncio.current_task()
+        self._loop = asyncio.get_running_loop() # Set last: close() cancels _task once it sees the loop
+        try:
+            if self._closing: # close() came before the loop was there to cancel
+                return
+            reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            while True:
+                payload = await read_frame(reader)
+                if payload is None:
+                    break
+                with self.lock:
+                    self.board.apply(payload)
+        except asyncio.CancelledError:
+            pass # Closed by close()
+        except (OSError, asyncio.IncompleteReadError, ProtocolError) as e:
+            self.error = e
+        finally:
+            self.closed = True
+            if self._writer is not None:
+                self._writer.close()
+
+    def _call(self, callback, *args):
+        """Runs ``callback`` on the network thread, unless the connection already ended."""
+        if self._loop is not None and not self.closed:
+            try:
+                self._loop.call_soon_threadsafe(callback, *args)
+            except RuntimeError: # The loop shut down in the meantime
+                pass
+
+    def send_turn(self, direction):
+        """Sends a turn for the player's snake."""
+        if self._writer is not None:
+            self._call(self._writer.write, bytes([DIRECTION_INDEX[direction]]))
+
+    def close(self):
+        """Disconnects, also while still connecting; the thread ends shortly after."""
+        self._closing = True
+        if self._task is not None:
+            self._call(self._task.cancel)
+
+
+def _print_server_stats(stats):
+    print(f"server: {stats['clients']} clients, {stats['ticks']} ticks, tick p50 {stats.get('tick_p50_ms', 0):.2f} "
+          f"p99 {stats.get('tick_p99_ms', 0):.2f} max {stats.get('tick_max_ms', 0):.2f} ms, "
+          f"{stats.get('late_ticks', 0)} late, delta {stats.get('delta_bytes', 0):.0f} B, "
+          f"{stats.get('skipped', 0)} deltas skipped", flush=True)
+
+
+async def _serve(args):
+    server = Server(Arena(args.width, args.height, args.foods, args.seed), args.tick_rate)
+
+    async def report():
+        while True:
+            await asyncio.sleep(args.stats_every)
+            _print_server_stats(server.stats())
+
+    reporter = asyncio.create_task(report()) if args.stats_every else None
+    try:
+        await server.serve(args.host, args.port, args.duration)
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        _print_server_stats(server.stats())
+
+
+async def _bots(args):
+    start = time.perf_counter()
+    boards = await asyncio.gather(*(run_bot(args.host, args.port, args.seconds, seed=i) for i in range(args.clients)),
+                                  return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failed = [board for board in boards if isinstance(board, BaseException)]
+    boards = [board for board in boards if not isinstance(board, BaseException)]
+    if failed:
+        print(f"bots: {len(failed)} failed, e.g. {failed[0]!r}")
+    if boards:
+        received = sum(board.bytes_received for board in boards)
+        print(f"bots: {len(boards)} clients, {sum(board.messages for board in boards) / len(boards):.0f} messages "
+              f"and {received / len(boards) / elapsed / 1024:.1f} KiB/s each, "
+              f"{sum(board.keyframes_checked for board in boards)} keyframes checked, "
+              f"{sum(board.mismatches for board in boards)} mismatches, {sum(board.desyncs for board in boards)} desyncs")
+    return 1 if failed or any(board.mismatches for board in boards) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multiplayer snake server and scripted bot clients")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run an authoritative server")
+    bots = commands.add_parser("bots", help="connect scripted bots to a server")
+    loadtest = commands.add_parser("loadtest", help="run a server here and bots in a second process")
+    for command in (serve, bots, loadtest):
+        command.add_argument("--host", default="localhost")
+        command.add_argument("--port", type=int, default=PORT)
+    for command in (serve, loadtest):
+        command.add_argument("--width", type=int, default=ARENA_WIDTH)
+        command.add_argument("--height", type=int, default=ARENA_HEIGHT)
+        command.add_argument("--foods", type=int, default=FOODS)
+        command.add_argument("--tick-rate", type=int, default=TICK_RATE)
+        command.add_argument("--seed", type=int, default=None)
+        command.add_argument("--stats-every", type=float, default=10.0, help="seconds between stats lines; 0 for none")
+    serve.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    for command in (bots, loadtest):
+        command.add_argument("--clients", type=int, default=64)
+        command.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    if args.command != "bots" and not 1 <= args.foods <= MAX_FOODS:
+        parser.error(f"--foods must be 1 to {MAX_FOODS}")
+
+    if args.command == "serve":
+        try:
+            asyncio.run(_serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.command == "bots":
+        return asyncio.run(_bots(args))
+
+    # Loadtest: the bots get their own process so they don't share the server's loop
+    args.duration = args.seconds + 2.0
+    bots_process = None
+
+    def start_bots():
+        nonlocal bots_process
+        bots_process = subprocess.Popen([sys.executable, __file__, "bots", "--host", args.host, "--port",
+                                         str(args.port), "--clients", str(args.clients), "--seconds", str(args.seconds)])
+
+    async def serve_with_bots():
+        server = Server(Arena(args.width, args.height, args.foods, args.seed), args.tick_rate)
+        await server.serve(args.host, args.port, args.duration, ready=start_bots)
+        _print_server_stats(server.stats())
+
+    asyncio.run(serve_with_bots())
+    return bots_process.wait() if bots_process is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
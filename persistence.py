@@ -0,0 +1,103 @@
+"""Write-behind, atomic saving of small text files (high score, settings).
+
+Saving only updates an in-memory copy and marks it dirty. A background
+thread writes dirty files at most once per ``interval``, so a burst of
+changes (a volume slider held down, a new record on every food eaten)
+becomes one write. Each write goes to a temporary file in the same
+directory which then replaces the target, so a crash mid-write leaves the
+previous contents intact.
+"""
+import os
+import tempfile
+import threading
+
+
+def atomic_write(path, text):
+    """Replaces ``path`` with ``text`` (str or bytes) so readers see the old or the new file, never half of one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb" if isinstance(text, bytes) else "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PersistentStore:
+    """Holds pending file contents and writes them from a background thread.
+
+    ``save`` never touches the disk. ``flush`` writes everything pending
+    right away; call it at natural pauses (pause menu, game over) and via
+    ``close`` on exit.
+    """
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self.writes = 0
+        self._pending = {}
+        self._lock = threading.Lock() # Guards _pending
+        self._write_lock = threading.Lock() # Keeps writes of the same file in order
+        self._dirty = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the background writer."""
+        self._thread = threading.Thread(target=self._run, name="store-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, path, text):
+        """Marks ``path`` to be written with ``text``; later saves of the same path win."""
+        with self._lock:
+            self._pending[path] = text
+        self._dirty.set()
+
+    def remove(self, path):
+        """Marks ``path`` to be deleted, replacing any pending save of it."""
+        with self._lock:
+            self._pending[path] = None
+        self._dirty.set()
+
+    @property
+    def dirty(self):
+        """True while some saved contents haven't reached the disk."""
+        return self._dirty.is_set()
+
+    def flush(self):
+        """Writes all pending files now, on the calling thread."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._dirty.clear()
+            for path, text in pending.items():
+                try:
+                    if text is None:
+                        if os.path.exists(path):
+                            os.remove(path)
+                        continue
+                    atomic_write(path, text)
+                    self.writes += 1
+                except OSError as e:
+                    print(f"Can't save {path}: {e}")
+
+    def close(self):
+        """Stops the writer and writes whatever is still pending."""
+        self._stopping.set()
+        self._dirty.set() # Wake the writer so it can exit
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._dirty.wait()
+            if self._stopping.wait(self.interval): # Let more changes pile up
+                return
+            self.flush()
@@ -0,0 +1,168 @@
+"""Per-phase frame profiler and start-up timer.
+
+``Game.run`` marks the end of each phase of a frame (events, update, draw,
+display). The profiler keeps the last few hundred frames per phase in
+fixed-size ring buffers for rolling percentiles and can record every phase
+as a Chrome trace event (open the dump in chrome://tracing or Perfetto).
+
+While disabled, ``begin_frame``, ``mark`` and ``end_frame`` are bound to a
+no-op, so the instrumentation costs one empty call per phase.
+"""
+import json
+import time
+from array import array
+
+PHASES = ("events", "update", "draw", "display")
+MAX_TRACE_EVENTS = 1_000_000 # Roughly a few hours of frames
+
+
+def _noop(*args):
+    pass
+
+
+class FrameProfiler:
+    """Times each phase of every frame while enabled."""
+    def __init__(self, history=240, trace_path=None, clock=time.perf_counter):
+        self.history = history
+        self.trace_path = trace_path
+        self.clock = clock
+        self.enabled = False
+        self.frames = 0
+        self._samples = {name: array("d", bytes(8 * history)) for name in PHASES + ("frame",)}
+        self._intervals = array("d", bytes(8 * history)) # Start-to-start, including sleep
+        self._interval_count = 0
+        self._current = dict.fromkeys(PHASES, 0.0)
+        self._frame_start = None
+        self._last = None
+        self._epoch = clock()
+        self._trace = []
+        self.disable()
+
+    def enable(self):
+        """Starts timing frames."""
+        self.enabled = True
+        self._frame_start = self._last = self.clock()
+        self.begin_frame = self._begin_frame
+        self.mark = self._mark
+        self.end_frame = self._end_frame
+
+    def disable(self):
+        """Stops timing; the hooks become no-ops."""
+        self.enabled = False
+        self.begin_frame = self.mark = self.end_frame = _noop
+
+    def toggle(self):
+        """Flips between enabled and disabled."""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def _begin_frame(self):
+        now = self.clock()
+        if self._frame_start is not None:
+            self._intervals[self._interval_count % self.history] = now - self._frame_start
+            self._interval_count += 1
+        self._frame_start = self._last = now
+        for name in self._current:
+            self._current[name] = 0.0
+
+    def _mark(self, phase):
+        """Ends ``phase``: the time since the previous mark is charged to it."""
+        now = self.clock()
+        self._current[phase] += now - self._last
+        if self.trace_path is not None and len(self._trace) < MAX_TRACE_EVENTS:
+            self._trace.append((phase, self._last, now - self._last))
+        self._last = now
+
+    def _end_frame(self):
+        now = self.clock()
+        slot = self.frames % self.history
+        for name, value in self._current.items():
+            self._samples[name][slot] = value
+        self._samples["frame"][slot] = now - self._frame_start
+        if self.trace_path is not None and len(self._trace) < MAX_TRACE_EVENTS:
+            self._trace.append(("frame", self._frame_start, now - self._frame_start))
+        self.frames += 1
+
+    def _recent(self, name):
+        """Samples of ``name`` currently in the ring buffer."""
+        samples = self._samples[name]
+        return samples[:self.frames] if self.frames < self.history else samples
+
+    def percentiles(self, name, points=(50, 99)):
+        """Percentiles in milliseconds of a phase (or "frame") over recent frames."""
+        samples = sorted(self._recent(name))
+        if not samples:
+            return tuple(0.0 for _ in points)
+        last = len(samples) - 1
+        return tuple(1000.0 * samples[min(last, round(last * p / 100))] for p in points)
+
+    def fps(self):
+        """Frames per second actually delivered over recent frames."""
+        count = min(self._interval_count, self.history)
+        total = sum(self._intervals[:count])
+        return count / total if total else 0.0
+
+    def overlay_lines(self, target_fps):
+        """Text lines for the on-screen overlay."""
+        lines = [f"FPS {self.fps():5.1f} / {target_fps}"]
+        for name in PHASES + ("frame",):
+            p50, p99 = self.percentiles(name)
+            lines.append(f"{name:8s} p50 {p50:6.2f}  p99 {p99:6.2f} ms")
+        return lines
+
+    def dump_trace(self, path=None):
+        """Writes the recorded phases as Chrome trace-event JSON."""
+        path = path or self.trace_path
+        if path is None:
+            return
+        events = [{
+            "name": name,
+            "cat": "frame" if name == "frame" else "phase",
+            "ph": "X",
+            "ts": (start - self._epoch) * 1e6,
+            "dur": duration * 1e6,
+            "pid": 1,
+            "tid": 1,
+        } for name, start, duration in self._trace]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class StartupTimer:
+    """Breaks the time to first frame down into named stages.
+
+    ``mark`` closes a stage on the main thread; ``note`` records work done
+    in the background, which overlaps the stages (None if still running).
+    """
+    def __init__(self, start=None, clock=time.perf_counter):
+        self.clock = clock
+        self.start = clock() if start is None else start
+        self.stages = []
+        self.background = {}
+        self._last = self.start
+
+    def mark(self, stage):
+        """Ends ``stage``: the time since the previous mark is charged to it."""
+        now = self.clock()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def note(self, name, seconds):
+        """Records a background task's duration."""
+        self.background[name] = seconds
+
+    def total(self):
+        """Seconds from start to the last mark."""
+        return self._last - self.start
+
+    def report_lines(self):
+        """Text lines of the report, in milliseconds."""
+        lines = [f"startup {1000.0 * self.total():8.1f} ms to first frame"]
+        for stage, seconds in self.stages:
+            lines.append(f"  {stage:20s} {1000.0 * seconds:8.1f} ms")
+        for name, seconds in self.background.items():
+            value = "still running" if seconds is None else f"{1000.0 * seconds:8.1f} ms"
+            lines.append(f"  {name + ' (bg)':20s} {value}")
+        return lines
@@ -0,0 +1,89 @@
+"""Adaptive render quality: trades looks for frame time when drawing falls behind.
+
+``QualityGovernor`` is fed how long each frame took to draw and the
+render frame period (``1 / render_fps``), the time a whole frame may
+take. When the smoothed draw time takes up most of the frame period it
+steps down one tier, from "full" to "no_grid". When the draw time stays
+well under the period for a while it steps back up one tier. The down and
+up thresholds are far apart, and a tier that was left again right after a
+step up must show headroom for twice as long next time. Together these
+keep it from flapping between two tiers.
+
+What each tier means for drawing is up to the caller (see QUALITY_TIERS
+in app.py); the governor only picks the tier and keeps time per tier.
+"""
+
+TIERS = ("full", "flat", "no_grid") # Best looking first
+
+
+class QualityGovernor:
+    """Picks a render quality tier from recent frame times."""
+    DOWN_RATIO = 0.8 # Step down when smoothed draw time is over this share of the frame period,
+                     # which leaves the rest for input and simulation ticks
+    UP_RATIO = 0.4 # Step up when it has stayed under this share
+    UP_SECONDS = 3.0 # for this long (doubled each time a step up didn't hold)
+    MAX_UP_SECONDS = 60.0
+    SMOOTHING = 0.1 # Weight of the newest frame in the moving average
+    SETTLE_FRAMES = 10 # Frames ignored after a change, while the new tier warms up
+
+    def __init__(self, tiers=TIERS):
+        self.tiers = tiers
+        self.tier = 0
+        self.changes = 0
+        self.time_in_tier = dict.fromkeys(tiers, 0.0) # Seconds spent drawing at each tier
+        self._average = None
+        self._headroom = 0.0 # Seconds in a row under the step-up threshold
+        self._up_seconds = self.UP_SECONDS
+        self._since_up = None # Seconds since the last step up, until it holds
+        self._settle = 0
+
+    @property
+    def name(self):
+        """The current tier's name."""
+        return self.tiers[self.tier]
+
+    def update(self, draw_time, budget, elapsed):
+        """Feeds one frame: seconds spent drawing, the frame period and the time since the last frame.
+
+        Returns True if the tier changed.
+        """
+        self.time_in_tier[self.name] += elapsed
+        if self._since_up is not None:
+            self._since_up += elapsed
+            if self._since_up > self._up_seconds:
+                self._since_up = None # The step up held
+                self._up_seconds = self.UP_SECONDS
+        if self._settle > 0:
+            self._settle -= 1
+            return False
+        if self._average is None:
+            self._average = draw_time
+        else:
+            self._average += self.SMOOTHING * (draw_time - self._average)
+
+        if self._average > budget * self.DOWN_RATIO and self.tier < len(self.tiers) - 1:
+            if self._since_up is not None:
+                self._up_seconds = min(2 * self._up_seconds, self.MAX_UP_SECONDS)
+                self._since_up = None
+            self._change(self.tier + 1)
+            return True
+        if self._average < budget * self.UP_RATIO and self.tier > 0:
+            self._headroom += elapsed
+            if self._headroom >= self._up_seconds:
+                self._change(self.tier - 1)
+                self._since_up = 0.0
+                return True
+        else:
+            self._headroom = 0.0
+        return False
+
+    def _change(self, tier):
+        self.tier = tier
+        self.changes += 1
+        self._average = None
+        self._headroom = 0.0
+        self._settle = self.SETTLE_FRAMES
+
+    def stats(self):
+        """Current tier, number of changes and seconds per tier, for telemetry."""
+        return {"tier": self.name, "changes": self.changes, "seconds": dict(self.time_in_tier)}
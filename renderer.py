@@ -0,0 +1,196 @@
+"""Dirty-rectangle renderer for the PLAYING screen.
+
+Between two ticks only a handful of cells change: the new head, the old head
+(which turns into a body segment), the vacated tail, the few segments that
+cross a body gradient boundary, the sliding tail and head sprites, the food
+and the HUD text. This renderer
+keeps the background and grid on a pre-built surface, repaints just those
+areas and hands their rects to ``pygame.display.update``.
+"""
+import pygame
+
+from sprites import gradient_boundaries, gradient_level, sprite_cache
+
+
+class DirtyRectRenderer:
+    """Redraws only what changed since the previous frame.
+
+    ``render`` returns the list of rects to pass to
+    ``pygame.display.update``, or None after a full redraw (the first frame,
+    a new snake, or after ``invalidate``) when the whole display must update.
+    """
+    MAX_DIRTY_CELLS = 256 # Past this a full redraw is cheaper
+
+    def __init__(self, size, block_size, depth, bg_color, grid_color, head_color):
+        self.size = size
+        self.block_size = block_size
+        self.depth = depth
+        self.bg_color = bg_color
+        self.grid_color = grid_color
+        self.head_color = head_color
+        self._background = None
+        self._background_grid = None
+        self._needs_full = True
+        self._snake = None
+        self._count = 0
+        self._head_cell = None
+        self._food = None
+        self._hud = []
+        self._floating = []
+        self._look = None
+
+    def invalidate(self):
+        """Forces a full redraw on the next frame, e.g. after a menu or window event."""
+        self._needs_full = True
+
+    def _build_background(self, grid):
+        """Pre-renders the background fill and grid lines."""
+        width, height = self.size
+        background = pygame.Surface(self.size)
+        background.fill(self.bg_color)
+        if grid:
+            for i in range(0, width, self.block_size):
+                pygame.draw.line(background, self.grid_color, (i, 0), (i, height))
+            for j in range(0, height, self.block_size):
+                pygame.draw.line(background, self.grid_color, (0, j), (width, j))
+        if pygame.display.get_surface() is not None:
+            background = background.convert()
+        self._background = background
+        self._background_grid = grid
+
+    def render(self, screen, snake, food, hud, grid, alpha=1.0, look="cube"):
+        """Draws one frame of the game.
+
+        ``hud`` is a list of ``(key, text_surface, rect)`` drawn on top of the
+        board; an item is repainted when its key or rect changes. Items keep
+        their position in the list from frame to frame; optional ones go last.
+        ``alpha`` is the interpolation factor between the last two ticks.
+        ``look`` is the sprite look (see ``sprites.LOOKS``).
+        """
+        if self._background is None or grid != self._background_grid:
+            self._build_background(grid)
+            self._needs_full = True
+        if look != self._look:
+            self._look = look
+            self._needs_full = True
+        if snake is not self._snake:
+            self._snake = snake
+            snake.change_log = []
+            self._needs_full = True
+
+        floating = self._floating_sprites(snake, alpha)
+        if not self._needs_full:
+            rects = self._render_dirty(screen, snake, food, hud, floating)
+            if rects is not None:
+                return rects
+
+        screen.blit(self._background, (0, 0))
+        snake.draw(screen, alpha, look=look)
+        food.draw(screen, look=look)
+        for _, surface, rect in hud:
+            screen.blit(surface, rect)
+        self._remember(snake, food, hud, floating)
+        self._needs_full = False
+        return None
+
+    def _floating_sprites(self, snake, alpha):
+        """The sliding tail and head as ``(sprite, rect)``; the tail may be None."""
+        block, depth = self.block_size, self.depth
+        tail, head = snake.interpolated_ends(alpha)
+        size = block + depth + 1
+        if tail is not None:
+            sprite = sprite_cache.body_sprites(block, depth, look=self._look)[0]
+            tail = (sprite, pygame.Rect(round(tail[0] * block), round(tail[1] * block), size, size))
+        sprite = sprite_cache.get("head", self.head_color, block, depth, self._look)
+        head = (sprite, pygame.Rect(round(head[0] * block), round(head[1] * block), size, size))
+        return [tail, head]
+
+    def _remember(self, snake, food, hud, floating):
+        """Records what is on screen so the next frame can diff against it."""
+        self._floating = [item[1] for item in floating if item is not None]
+        snake.change_log.clear()
+        self._count = len(snake.body)
+        self._head_cell = snake.head if self._count else None
+        self._food = (food.position, food.type)
+        self._hud = [(key, rect) for key, _, rect in hud]
+
+    def _render_dirty(self, screen, snake, food, hud, floating):
+        """Repaints the changed areas, or returns None if too much changed."""
+        width = snake.width
+        count = len(snake.body)
+        dirty = set()
+
+        removed = 0
+        for entry in snake.change_log:
+            if entry < 0:
+                entry = ~entry
+                removed += 1
+            dirty.add((entry % width, entry // width))
+        if snake.change_log and self._head_cell is not None:
+            dirty.add(self._head_cell) # The old head is now a body segment
+
+        # Segments whose gradient level changed because the body shifted or grew
+        for old, new in zip(gradient_boundaries(self._count), gradient_boundaries(count)):
+            old -= removed
+            for index in range(max(min(old, new), 0), min(max(old, new), count)):
+                dirty.add(snake.body[index])
+            if len(dirty) > self.MAX_DIRTY_CELLS:
+                return None
+
+        if (food.position, food.type) != self._food:
+            if self._food[0] is not None:
+                dirty.add(self._food[0])
+            if food.position is not None:
+                dirty.add(food.position)
+
+        size = self.block_size + self.depth + 1
+        regions = [pygame.Rect(x * self.block_size, y * self.block_size, size, size) for x, y in dirty]
+        # Wherever the sliding ends were last frame and are now
+        regions.extend(self._floating)
+        regions.extend(item[1] for item in floating if item is not None)
+        for i, (key, _, rect) in enumerate(hud):
+            previous = self._hud[i] if i < len(self._hud) else None
+            if previous != (key, rect):
+                regions.append(rect.union(previous[1]) if previous else rect)
+        regions.extend(rect for _, rect in self._hud[len(hud):]) # Items no longer shown
+
+        for region in regions:
+            self._repaint(screen, region, snake, food, hud, floating)
+        self._remember(snake, food, hud, floating)
+        return regions
+
+    def _repaint(self, screen, region, snake, food, hud, floating):
+        """Redraws everything that overlaps ``region``, clipped to it."""
+        block, depth = self.block_size, self.depth
+        screen.set_clip(region)
+        screen.blit(self._background, region, region)
+
+        # Cubes overhang their cell by ``depth`` to the right and bottom
+        x0 = max((region.left - block - depth) // block, 0)
+        y0 = max((region.top - block - depth) // block, 0)
+        x1 = min((region.right - 1) // block, snake.width - 1)
+        y1 = min((region.bottom - 1) // block, snake.height - 1)
+
+        # The head is always drawn as a floating sprite
+        count = len(snake.body)
+        segments = [segment for segment in snake.segments_in(x0, y0, x1, y1) if segment[0] < count - 1]
+
+        tail, head = floating
+        blits = []
+        if tail is not None and tail[1].colliderect(region):
+            blits.append(tail)
+        if segments:
+            body_sprites = sprite_cache.body_sprites(block, depth, look=self._look)
+            for index, x, y in segments:
+                blits.append((body_sprites[gradient_level(index, count)], (x * block, y * block)))
+        if head[1].colliderect(region):
+            blits.append(head)
+        if blits:
+            screen.blits(blits, doreturn=False)
+
+        if food.position is not None and x0 <= food.position[0] <= x1 and y0 <= food.position[1] <= y1:
+            food.draw(screen, look=self._look)
+        for _, surface, rect in hud:
+            if rect.colliderect(region):
+                screen.blit(surface, rect)
+        screen.set_clip(None)
@@ -0,0 +1,199 @@
+"""Deterministic replay recording and headless playback.
+
+A replay is the game's seed plus every turn the snake took. The format is
+binary and streams in both directions:
+
+* header: ``b"SNKR"``, format version (u8), board width and height (u16),
+  seed (u64), all little-endian;
+* one unsigned LEB128 varint per turn: ``(tick delta << 3) | direction``,
+  where ``direction`` indexes ``simulation.DIRECTIONS``;
+* an end record, the varint ``END``, followed by varints for the final
+  tick count and score and the 8-byte ``GameState.state_hash`` digest.
+
+Playback re-simulates the game without pygame as fast as it can and checks
+the final score and state hash. Version 1 replays came from a build that
+spawned food in a different order, so they no longer play back. Usage::
+
+    python replay.py path/to/game.snkr [more.snkr ...]
+"""
+import struct
+import sys
+import time
+
+from simulation import DIRECTION_INDEX, DIRECTIONS, GameState
+
+MAGIC = b"SNKR"
+VERSION = 2
+HEADER = struct.Struct("<4sBHHQ")
+END = 4 # Record code after the last turn; 0-3 are directions
+READ_CHUNK = 64 * 1024
+
+
+class ReplayError(Exception):
+    """Raised for unreadable or inconsistent replay files."""
+
+
+def _varint(value):
+    """Encodes a non-negative int as LEB128."""
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+class ReplayWriter:
+    """Appends a game's turns to a replay file as they happen.
+
+    Attach it as ``GameState.recorder``; call ``finish`` with the state when
+    the game ends (or is abandoned) to write the end record.
+    """
+    def __init__(self, path, state):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, state.width, state.height, state.seed))
+        self._last_tick = 0
+
+    def record_turn(self, tick, direction):
+        """Writes one turn applied before tick ``tick``."""
+        delta = tick - self._last_tick
+        self._last_tick = tick
+        self._file.write(_varint((delta << 3) | DIRECTION_INDEX[direction]))
+
+    def finish(self, state):
+        """Writes the end record and closes the file."""
+        if self._file.closed:
+            return
+        self._file.write(_varint(END) + _varint(state.ticks) + _varint(state.score))
+        self._file.write(bytes.fromhex(state.state_hash()))
+        self._file.close()
+
+
+class ReplayReader:
+    """Streams a replay file without loading it into memory.
+
+    Iterating yields ``(tick, direction)`` turns; once iteration ends,
+    ``final_ticks``, ``final_score`` and ``final_hash`` hold the end record
+    (None if the file was cut short).
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        header = self._file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ReplayError(f"{path}: truncated header")
+        magic, version, self.width, self.height, self.seed = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ReplayError(f"{path}: not a replay file")
+        if version != VERSION:
+            raise ReplayError(f"{path}: unsupported replay version {version}")
+        self.final_ticks = self.final_score = self.final_hash = None
+        self._buffer = b""
+        self._pos = 0
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _byte(self):
+        """Next byte of the file, or None at end of file."""
+        if self._pos >= len(self._buffer):
+            self._buffer = self._file.read(READ_CHUNK)
+            self._pos = 0
+            if not self._buffer:
+                return None
+        byte = self._buffer[self._pos]
+        self._pos += 1
+        return byte
+
+    def _read_varint(self):
+        value = shift = 0
+        while True:
+            byte = self._byte()
+            if byte is None:
+                if shift:
+                    raise ReplayError(f"{self.path}: truncated record")
+                return None
+            value |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def _read_end(self):
+        """Next varint of the end record, which can't be cut short."""
+        value = self._read_varint()
+        if value is None:
+            raise ReplayError(f"{self.path}: truncated end record")
+        return value
+
+    def __iter__(self):
+        tick = 0
+        while True:
+            value = self._read_varint()
+            if value is None:
+                return # Cut short, e.g. the game crashed
+            code = value & 0x7
+            if code == END:
+                final_ticks = self._read_end()
+                final_score = self._read_end()
+                digest = [self._byte() for _ in range(8)]
+                if None in digest:
+                    raise ReplayError(f"{self.path}: truncated end record")
+                self.final_ticks, self.final_score, self.final_hash = final_ticks, final_score, bytes(digest).hex()
+                return
+            if code > END:
+                raise ReplayError(f"{self.path}: unknown record code {code}")
+            tick += value >> 3
+            yield tick, DIRECTIONS[code]
+
+
+def play(path):
+    """Re-simulates a replay headlessly and checks it against its end record.
+
+    Returns a dict with the final ticks, score, state hash and whether they
+    match what was recorded.
+    """
+    with ReplayReader(path) as reader:
+        state = GameState(reader.width, reader.height, seed=reader.seed)
+        for tick, direction in reader:
+            while state.ticks < tick and not state.game_over:
+                state.step()
+            state.turn(direction)
+        if reader.final_ticks is not None:
+            while state.ticks < reader.final_ticks and not state.game_over:
+                state.step()
+        result = {
+            "ticks": state.ticks,
+            "score": state.score,
+            "hash": state.state_hash(),
+            "complete": reader.final_ticks is not None,
+        }
+        result["match"] = (result["complete"] and state.ticks == reader.final_ticks and
+                           state.score == reader.final_score and result["hash"] == reader.final_hash)
+    return result
+
+
+def main(argv=None):
+    failed = 0
+    for path in (argv if argv is not None else sys.argv[1:]):
+        start = time.perf_counter()
+        result = play(path)
+        elapsed = time.perf_counter() - start
+        status = "OK" if result["match"] else ("INCOMPLETE" if not result["complete"] else "MISMATCH")
+        print(f"{path}: {status} score={result['score']} ticks={result['ticks']} "
+              f"hash={result['hash']} ({result['ticks'] / max(elapsed, 1e-9):,.0f} ticks/s)")
+        failed += not result["match"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Score history in SQLite: every finished game, on every cabinet.
+
+Each game is one row of ``runs``. The row records who played it, on which
+cabinet and when. It also holds the score, the length reached, the ticks
+survived and how many of each food type were eaten. Indexes on
+``(score)``, ``(player, score)`` and ``(day, score)`` serve the top-N,
+per-player and per-day queries. Those queries read only the first ``n``
+entries of an index, so they stay well under a millisecond with millions
+of rows.
+
+The database runs in WAL mode, so readers never wait for the writer.
+``ScoreStore.record`` only queues a run. A background thread inserts the
+queued runs in one transaction at most once per ``interval``. When a run
+goes in, the thread also works out where it placed (see ``standing``),
+so the game-over screen can show the result without querying anything
+on the game thread.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from simulation import FOOD_NAMES
+
+EATEN_COLUMNS = tuple(f"eaten_{name}" for name in FOOD_NAMES)
+COLUMNS = ("played_at", "day", "player", "cabinet", "score", "length", "ticks", "seed") + EATEN_COLUMNS
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    player TEXT NOT NULL,
+    cabinet TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    seed INTEGER,
+    {", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in EATEN_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score DESC);
+CREATE INDEX IF NOT EXISTS runs_by_player ON runs (player, score DESC);
+CREATE INDEX IF NOT EXISTS runs_by_day ON runs (day, score DESC);
+"""
+INDEXES = ("runs_by_score", "runs_by_player", "runs_by_day")
+INSERT = f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+TOP_COLUMNS = "player, cabinet, score, length, ticks, played_at"
+
+
+def day_of(timestamp):
+    """Local calendar day of a Unix time, as stored in ``runs.day``."""
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+def connect(path):
+    """Opens ``path`` in WAL mode and makes sure the schema exists."""
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL") # Durable at checkpoints, which is enough for scores
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class ScoreStore:
+    """Queues finished runs and inserts them from a background thread.
+
+    ``record`` never touches the database. The query methods run on the
+    calling thread over a connection of their own. ``flush`` inserts
+    everything queued right away, and ``close`` does the same on exit.
+    """
+    def __init__(self, path="scores.db", interval=2.0, cabinet=""):
+        self.path = path
+        self.interval = interval
+        self.cabinet = cabinet
+        self.inserts = 0
+        self.standing = None # Where the last run recorded with ``rank`` placed
+        self._queue = queue.SimpleQueue()
+        self._tickets = 0
+        self._writer = connect(path)
+        self._write_lock = threading.Lock() # One transaction at a time on the writer connection
+        self._readers = threading.local()
+        self._dirty = threading.Event()
+        self._hurry = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the background writer."""
+        self._thread = threading.Thread(target=self._run, name="score-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, score, length, ticks, eaten, player="player", seed=None, played_at=None, rank=False):
+        """Queues a finished run; ``eaten`` maps food types to how many were eaten.
+
+        With ``rank`` the writer inserts it without waiting for more runs
+        and then sets ``standing`` for it. Returns a ticket that matches
+        ``standing["ticket"]`` once that happens.
+        """
+        played_at = time.time() if played_at is None else played_at
+        row = (played_at, day_of(played_at), player, self.cabinet, score, length, ticks, seed,
+               *(eaten.get(name, 0) for name in FOOD_NAMES))
+        self._tickets += 1
+        self._queue.put((self._tickets, row, rank))
+        self._dirty.set()
+        if rank:
+            self._hurry.set()
+        return self._tickets
+
+    @property
+    def dirty(self):
+        """True while some recorded runs haven't been inserted."""
+        return self._dirty.is_set()
+
+    def flush(self):
+        """Inserts all queued runs now, on the calling thread."""
+        with self._write_lock:
+            self._dirty.clear()
+            batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            conn = self._writer
+            try:
+                conn.execute("BEGIN")
+                ranked = None
+                for ticket, row, rank in batch:
+                    run_id = conn.execute(INSERT, row).lastrowid
+                    if rank:
+                        ranked = (ticket, run_id, row)
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                print(f"Can't record scores in {self.path}: {e}")
+                return
+            self.inserts += len(batch)
+            if ranked is not None:
+                self.standing = self._standing(conn, *ranked)
+
+    def _standing(self, conn, ticket, run_id, row):
+        """Rank of a just-inserted run among all runs and the day's runs, plus the current bests.
+
+        Ties share a rank, so ``rank`` 1 alone doesn't make a new high
+        score; ``new_best`` is set only when the run beat every other run.
+        """
+        score, day, player = row[COLUMNS.index("score")], row[COLUMNS.index("day")], row[COLUMNS.index("player")]
+        rank = conn.execute("SELECT COUNT(*) FROM runs WHERE score > ?", (score,)).fetchone()[0] + 1
+        previous = conn.execute("SELECT score FROM runs WHERE id != ? ORDER BY score DESC LIMIT 1",
+                                (run_id,)).fetchone()
+        day_rank = conn.execute("SELECT COUNT(*) FROM runs WHERE day = ? AND score > ?", (day, score)).fetchone()[0] + 1
+        return {
+            "ticket": ticket,
+            "id": run_id,
+            "score": score,
+            "rank": rank,
+            "day_rank": day_rank,
+            "new_best": score > (previous[0] if previous else 0),
+            "best": self.best(conn=conn),
+            "best_today": self.best(day=day, conn=conn),
+            "player_best": self.best(player=player, conn=conn),
+        }
+
+    def _reader(self):
+        """This thread's read connection."""
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = sqlite3.connect(self.path, isolation_level=None)
+        return conn
+
+    def top(self, n=10, player=None, day=None):
+        """The ``n`` best runs, all time or for one player or day, as dicts from best down."""
+        if player is not None:
+            where, args = "WHERE player = ?", (player,)
+        elif day is not None:
+            where, args = "WHERE day = ?", (day,)
+        else:
+            where, args = "", ()
+        rows = self._reader().execute(
+            f"SELECT {TOP_COLUMNS} FROM runs {where} ORDER BY score DESC LIMIT ?", (*args, n)).fetchall()
+        keys = TOP_COLUMNS.split(", ")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def best(self, player=None, day=None, conn=None):
+        """Highest score, all time or for one player or day; 0 with no runs."""
+        conn = conn or self._reader()
+        if player is not None:
+            row = conn.execute("SELECT MAX(score) FROM runs WHERE player = ?", (player,)).fetchone()
+        elif day is not None:
+            row = conn.execute("SELECT MAX(score) FROM runs WHERE day = ?", (day,)).fetchone()
+        else:
+            row = conn.execute("SELECT MAX(score) FROM runs").fetchone()
+        return row[0] or 0
+
+    def distribution(self, player=None, day=None):
+        """How many runs ended on each score, as ``(score, runs)`` pairs in score order."""
+        if player is not None:
+            where, args = "WHERE player = ?", (player,)
+        elif day is not None:
+            where, args = "WHERE day = ?", (day,)
+        else:
+            where, args = "", ()
+        return self._reader().execute(
+            f"SELECT score, COUNT(*) FROM runs {where} GROUP BY score ORDER BY score", args).fetchall()
+
+    def close(self):
+        """Stops the writer, inserts whatever is still queued and closes this thread's connections."""
+        self._stopping.set()
+        self._dirty.set() # Wake the writer so it can exit
+        self._hurry.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._write_lock:
+            self._writer.close()
+        conn = getattr(self._readers, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._readers.conn = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._dirty.wait()
+            self._hurry.wait(self.interval) # Let more runs pile up unless one is waiting to be ranked
+            self._hurry.clear()
+            if self._stopping.is_set():
+                return
+            self.flush()
+
+
+def migrate_high_score(store, path, player="player"):
+    """Records the score in an old single-integer high score file as a run, unless the store already beats it."""
+    try:
+        with open(path) as f:
+            score = int(f.read().strip())
+    except (OSError, ValueError):
+        return
+    if score > store.best():
+        store.record(score, 0, 0, {}, player=player, played_at=os.path.getmtime(path))
+        store.flush()
@@ -0,0 +1,749 @@
+"""Headless simulation core for the snake game.
+
+Everything in this module works in board cells rather than pixels and never
+touches pygame, so the rules can be stepped without a window. ``GameState``
+runs a single game (this is what ``app.Game`` renders), ``BatchSimulation``
+steps many independent games at once on NumPy arrays.
+"""
+import hashlib
+import random
+import struct
+import time
+from array import array
+from bisect import bisect_right
+from collections import deque
+from collections.abc import Sequence
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:  # Only BatchSimulation needs numpy
+    np = None
+
+# --- Board and Speed ---
+GRID_WIDTH = 30
+GRID_HEIGHT = 20
+FPS_BASE = 10
+
+# --- Directions (x_change, y_change) in cells ---
+UP = (0, -1)
+RIGHT = (1, 0)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+# Index order matters: the opposite of DIRECTIONS[i] is DIRECTIONS[(i + 2) % 4]
+DIRECTIONS = (UP, RIGHT, DOWN, LEFT)
+DIRECTION_INDEX = {d: i for i, d in enumerate(DIRECTIONS)}
+
+# --- Food Rules ---
+FOOD_TYPES = {
+    "normal": {"power": 1},
+    "speed": {"power": 1, "effect": "speed_up", "duration": 200, "boost": 7},
+    "growth": {"power": 3},
+    "slow": {"power": 1, "effect": "slow_down", "duration": 300, "boost": -5},
+}
+FOOD_NAMES = list(FOOD_TYPES.keys())
+
+# --- Tick Events ---
+ATE = "ate"
+DIED = "died"
+
+
+class FreeCells:
+    """Index of the empty cells on a board, for random picks that depend only on which cells are free.
+
+    A flag per cell marks it free, and free cells are counted per block of
+    2**BLOCK_BITS cells and per group of 2**GROUP_BITS blocks, so a cell is
+    taken or released in O(1). A random pick draws a rank with
+    ``rng.randrange(len(self))`` and returns the free cell of that rank in
+    board order: running sums over the group and then the block counts find
+    its block, and a binary search with ``bytearray.count`` finds it inside.
+    The pick never depends on the order cells were taken in, so a saved game
+    needs only its body to spawn food like the original.
+    """
+    BLOCK_BITS = 10
+    GROUP_BITS = 5
+
+    def __init__(self, cells):
+        self._free = bytearray(b"\x01") * cells
+        self._block_free = self._counts(cells, 1 << self.BLOCK_BITS)
+        self._group_free = self._counts(cells, 1 << self.BLOCK_BITS + self.GROUP_BITS)
+        self._count = cells
+
+    @staticmethod
+    def _counts(cells, size):
+        """Free-cell counts of an empty board split into spans of ``size`` cells."""
+        return array("i", (min(size, cells - start) for start in range(0, cells, size)))
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, cell):
+        return bool(self._free[cell])
+
+    def take(self, cell):
+        """Marks a cell as occupied."""
+        if self._free[cell]:
+            self._free[cell] = 0
+            self._block_free[cell >> self.BLOCK_BITS] -= 1
+            self._group_free[cell >> self.BLOCK_BITS + self.GROUP_BITS] -= 1
+            self._count -= 1
+
+    def release(self, cell):
+        """Marks a cell as empty again."""
+        if not self._free[cell]:
+            self._free[cell] = 1
+            self._block_free[cell >> self.BLOCK_BITS] += 1
+            self._group_free[cell >> self.BLOCK_BITS + self.GROUP_BITS] += 1
+            self._count += 1
+
+    @staticmethod
+    def _locate(counts, rank):
+        """The index in ``counts`` the ``rank``-th item falls in, and its rank there."""
+        totals = list(accumulate(counts))
+        index = bisect_right(totals, rank)
+        return index, rank - totals[index - 1] if index else rank
+
+    def select(self, rank):
+        """The free cell with ``rank`` free cells before it in board order (0 <= rank < len(self))."""
+        group, rank = self._locate(self._group_free, rank)
+        first = group << self.GROUP_BITS
+        block, rank = self._locate(self._block_free[first:first + (1 << self.GROUP_BITS)], rank)
+        low = first + block << self.BLOCK_BITS
+        high = min(low + (1 << self.BLOCK_BITS), len(self._free))
+        free = self._free
+        while high - low > 1: # The cell is in [low, high), with ``rank`` free cells before it there
+            middle = (low + high) // 2
+            before = free.count(1, low, middle)
+            if rank < before:
+                high = middle
+            else:
+                rank -= before
+                low = middle
+        return low
+
+    def choice(self, rng):
+        """Returns a uniformly random free cell, or None if the board is full."""
+        if self._count == 0:
+            return None
+        return self.select(rng.randrange(self._count))
+
+    def sample(self, k, rng):
+        """Returns up to ``k`` distinct random free cells, leaving them free."""
+        picks = []
+        for _ in range(min(k, self._count)):
+            cell = self.select(rng.randrange(self._count))
+            self.take(cell)
+            picks.append(cell)
+        for cell in picks:
+            self.release(cell)
+        return picks
+
+
+class BodyView(Sequence):
+    """Read-only sequence of a snake's (x, y) cells, ordered from tail to head."""
+    __slots__ = ("_snake",)
+
+    def __init__(self, snake):
+        self._snake = snake
+
+    def __len__(self):
+        return self._snake._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        snake = self._snake
+        if index < 0:
+            index += snake._size
+        if not 0 <= index < snake._size:
+            raise IndexError("body index out of range")
+        cell = snake._cells[(snake._head - snake._size + 1 + index) % len(snake._cells)]
+        return (cell % snake.width, cell // snake.width)
+
+    def __iter__(self):
+        snake = self._snake
+        cells, capacity, width = snake._cells, len(snake._cells), snake.width
+        start = snake._head - snake._size + 1
+        for i in range(start, start + snake._size):
+            cell = cells[i % capacity]
+            yield (cell % width, cell // width)
+
+    def __contains__(self, position):
+        return self._snake.occupies(position[0], position[1])
+
+
+class SnakeState:
+    """The snake's body, direction and target length on a board of cells.
+
+    The body lives in a ring buffer of packed cell indices (``y * width + x``)
+    with a byte-per-cell occupancy grid beside it, so moving, growing and
+    collision checks are O(1) whatever the snake's length. Every cell the
+    body takes or leaves is mirrored into ``free_cells`` for food spawning;
+    pass a shared FreeCells to put several snakes on one board.
+
+    Set ``change_log`` to a list to have every head added (``cell``) and
+    tail removed (``~cell``) appended to it; whoever set it drains it.
+    The snake starts on the packed cell ``start``, by default the centre.
+    """
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, free_cells=None, start=None):
+        self.width = width
+        self.height = height
+        self.direction = UP
+        self.length = 1
+        self._cells = array("i", bytes(4 * min(self.INITIAL_CAPACITY, width * height)))
+        self._head = -1
+        self._size = 0
+        self._occupied = bytearray(width * height)
+        self._serial = array("I", bytes(4 * width * height)) # Push count when each cell was taken
+        self._pushed = 0
+        self.free_cells = free_cells if free_cells is not None else FreeCells(width * height)
+        self.change_log = None
+        self.vacated = None # Cell the tail left on the last move, if any
+        self._collided = False
+        self.body = BodyView(self)
+        self._push((height // 2) * width + width // 2 if start is None else start)
+
+    @property
+    def head(self):
+        """The cell currently occupied by the head."""
+        cell = self._cells[self._head]
+        return (cell % self.width, cell // self.width)
+
+    def occupies(self, x, y):
+        """True if the body covers cell (x, y)."""
+        return 0 <= x < self.width and 0 <= y < self.height and \
+            self._occupied[y * self.width + x] == 1
+
+    def index_at(self, x, y):
+        """Body index (0 is the tail) of the segment on cell (x, y), or -1."""
+        if not self.occupies(x, y):
+            return -1
+        first = self._pushed - self._size
+        return (self._serial[y * self.width + x] - first) & 0xFFFFFFFF
+
+    def segments_in(self, x0, y0, x1, y1):
+        """Body segments on cells x0..x1, y0..y1 (inclusive) as ``(index, x, y)``, tail first.
+
+        Scans the rectangle's rows of the occupancy grid or the body,
+        whichever is shorter, so a viewport costs the same however long the
+        snake is.
+        """
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width - 1), min(y1, self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return []
+        segments = []
+        if (x1 - x0 + 1) * (y1 - y0 + 1) < self._size:
+            occupied, serial = self._occupied, self._serial
+            first = self._pushed - self._size
+            for y in range(y0, y1 + 1):
+                row = y * self.width
+                end = row + x1 + 1
+                cell = occupied.find(1, row + x0, end)
+                while cell != -1:
+                    segments.append(((serial[cell] - first) & 0xFFFFFFFF, cell - row, y))
+                    cell = occupied.find(1, cell + 1, end)
+            segments.sort()
+        else:
+            for index, (x, y) in enumerate(self.body):
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    segments.append((index, x, y))
+        return segments
+
+    def _push(self, cell):
+        """Adds a new head cell, doubling the ring buffer when it is full."""
+        capacity = len(self._cells)
+        if self._size == capacity:
+            tail = (self._head - self._size + 1) % capacity
+            # Unroll the ring so the tail sits at index 0
+            self._cells = self._cells[tail:] + self._cells[:tail] + array("i", bytes(4 * capacity))
+            self._head = self._size - 1
+            capacity *= 2
+        self._head = (self._head + 1) % capacity
+        self._cells[self._head] = cell
+        self._size += 1
+        self._occupied[cell] = 1
+        self._serial[cell] = self._pushed & 0xFFFFFFFF
+        self._pushed += 1
+        self.free_cells.take(cell)
+        if self.change_log is not None:
+            self.change_log.append(cell)
+
+    def _pop_tail(self):
+        """Removes the tail cell and returns it."""
+        cell = self._cells[(self._head - self._size + 1) % len(self._cells)]
+        self._size -= 1
+        self._occupied[cell] = 0
+        self.free_cells.release(cell)
+        if self.change_log is not None:
+            self.change_log.append(~cell)
+        return cell
+
+    def move(self):
+        """Moves the snake one cell in its current direction.
+
+        A move into a wall or into the body is not applied; it only marks the
+        snake as collided for ``check_collision``.
+        """
+        cell = self._cells[self._head]
+        x = cell % self.width + self.direction[0]
+        y = cell // self.width + self.direction[1]
+        self._collided = False
+        self.vacated = None
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            self._collided = True # Wall collision
+            return
+        # The tail leaves before the head arrives, so chasing it is allowed
+        if self._size >= self.length:
+            tail = self._pop_tail()
+            self.vacated = (tail % self.width, tail // self.width)
+        cell = y * self.width + x
+        if self._occupied[cell]:
+            self._collided = True # Self collision
+            return
+        self._push(cell)
+
+    def apply(self, added=None, removed=None):
+        """Applies a move decided elsewhere (e.g. by a server), as packed cells.
+
+        ``removed`` must be the tail; it leaves before ``added`` becomes the
+        new head. Either may be None. Raises ValueError if ``removed`` is
+        not the tail or ``added`` is already covered.
+        """
+        if removed is not None:
+            if self._size == 0 or self._cells[(self._head - self._size + 1) % len(self._cells)] != removed:
+                raise ValueError(f"cell {removed} is not the tail")
+            self._pop_tail()
+            self.vacated = (removed % self.width, removed // self.width)
+        if added is not None:
+            if self._occupied[added]:
+                raise ValueError(f"cell {added} is already covered")
+            self._push(added)
+
+    def packed(self):
+        """Copy of the body as packed cell indices, from tail to head."""
+        capacity = len(self._cells)
+        tail = (self._head - self._size + 1) % capacity
+        if tail + self._size <= capacity:
+            return self._cells[tail:tail + self._size]
+        return self._cells[tail:] + self._cells[:self._head + 1]
+
+    def restore(self, cells, direction, length):
+        """Replaces the body with ``cells``, packed cell indices from tail to head.
+
+        Used to load save states; raises ValueError if a cell is off the
+        board or covered twice.
+        """
+        size = len(cells)
+        if size == 0:
+            raise ValueError("the body is empty")
+        for cell in self.packed():
+            self._occupied[cell] = 0
+            self.free_cells.release(cell)
+        occupied, serial, board = self._occupied, self._serial, self.width * self.height
+        for index, cell in enumerate(cells):
+            if not 0 <= cell < board or occupied[cell]:
+                raise ValueError(f"cell {cell} is off the board or covered twice")
+            occupied[cell] = 1
+            serial[cell] = index
+            self.free_cells.take(cell)
+        self._cells = array("i", cells)
+        capacity = min(self.INITIAL_CAPACITY, board)
+        if size < capacity:
+            self._cells.extend(array("i", bytes(4 * (capacity - size))))
+        self._head = size - 1
+        self._size = self._pushed = size
+        self.direction = direction
+        self.length = length
+        self.vacated = None
+        self._collided = False
+
+    def interpolated_ends(self, alpha):
+        """Fractional cells of the tail and head ``alpha`` of the way through the last move.
+
+        Between two ticks only the ends of the snake slide; the segments in
+        between stay on their cells. Returns ``(tail, head)`` where ``tail``
+        is None when the last move did not vacate a cell (the snake grew).
+        """
+        head = self.head
+        if self._size > 1:
+            previous = self.body[-2]
+        else:
+            previous = self.vacated
+        if previous is not None:
+            head = (previous[0] + (head[0] - previous[0]) * alpha,
+                    previous[1] + (head[1] - previous[1]) * alpha)
+        tail = None
+        if self.vacated is not None and self._size > 1:
+            first = self.body[0]
+            tail = (self.vacated[0] + (first[0] - self.vacated[0]) * alpha,
+                    self.vacated[1] + (first[1] - self.vacated[1]) * alpha)
+        return tail, head
+
+    def grow(self, amount=1):
+        """Increases the length of the snake."""
+        self.length += amount
+
+    def change_direction(self, new_direction):
+        """Changes the snake's direction, preventing 180-degree turns."""
+        if (new_direction[0] != -self.direction[0] or
+                new_direction[1] != -self.direction[1]):
+            self.direction = new_direction
+            return True
+        return False
+
+    def check_collision(self):
+        """Checks whether the last move hit a wall or the body."""
+        return self._collided
+
+
+class FoodState:
+    """A food item with a type from FOOD_TYPES and a cell position.
+
+    With a FreeCells index the food always lands on an empty cell without retries;
+    ``position`` is None when the board has no empty cell left.
+    """
+    TYPES = FOOD_TYPES
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, rng=None, free_cells=None):
+        self.width = width
+        self.height = height
+        self.rng = rng if rng is not None else random
+        self.free_cells = free_cells
+        self.respawn()
+
+    def respawn(self, cell=None):
+        """Respawns the food at a new random free cell (or ``cell``) and type."""
+        self.type = self.rng.choice(list(self.TYPES.keys()))
+        if cell is None:
+            if self.free_cells is not None:
+                cell = self.free_cells.choice(self.rng)
+            else:
+                cell = self.rng.randrange(self.width * self.height)
+        self.position = None if cell is None else (cell % self.width, cell // self.width)
+        self.properties = self.TYPES[self.type]
+
+    @staticmethod
+    def respawn_many(foods):
+        """Respawns several food items at once on distinct free cells.
+
+        All items must share a board; items left over when the board runs out
+        of free cells get no position.
+        """
+        if not foods:
+            return
+        first = foods[0]
+        if first.free_cells is not None:
+            cells = first.free_cells.sample(len(foods), first.rng)
+        else:
+            cells = first.rng.sample(range(first.width * first.height), len(foods))
+        for food, cell in zip(foods, cells):
+            food.respawn(cell)
+        for food in foods[len(cells):]:
+            food.respawn()
+            food.position = None
+
+
+class InputQueue:
+    """Bounded FIFO of direction changes, applied one per simulation tick.
+
+    Each turn is checked against the direction that will be in effect when
+    it is applied (the last queued turn, or the snake's current direction),
+    so two quick presses such as up-then-left both survive instead of the
+    second overwriting the first. Every entry carries a timestamp, and the
+    delay between queuing and applying it is kept in ``latencies``.
+    """
+    def __init__(self, maxlen=3, clock=time.perf_counter):
+        self.maxlen = maxlen
+        self.clock = clock
+        self.dropped = 0
+        self.latencies = deque(maxlen=256)
+        self._queue = deque()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def push(self, direction, current, timestamp=None):
+        """Queues a turn; returns False if it is a no-op, a 180-degree turn or the queue is full."""
+        effective = self._queue[-1][0] if self._queue else current
+        if direction == effective or (direction[0] == -effective[0] and direction[1] == -effective[1]):
+            return False
+        if len(self._queue) >= self.maxlen:
+            self.dropped += 1
+            return False
+        self._queue.append((direction, self.clock() if timestamp is None else timestamp))
+        return True
+
+    def pop(self):
+        """Takes the next turn for this tick, or None if nothing is queued."""
+        if not self._queue:
+            return None
+        direction, timestamp = self._queue.popleft()
+        self.latencies.append(self.clock() - timestamp)
+        return direction
+
+    def clear(self):
+        """Drops every queued turn."""
+        self._queue.clear()
+
+    def latency_stats(self):
+        """Last, mean and max queue-to-tick latency in seconds over recent inputs."""
+        if not self.latencies:
+            return {"last": 0.0, "mean": 0.0, "max": 0.0, "dropped": self.dropped}
+        return {"last": self.latencies[-1], "mean": sum(self.latencies) / len(self.latencies),
+                "max": max(self.latencies), "dropped": self.dropped}
+
+
+class GameState:
+    """One game's rules: moves the snake, resolves food and speed effects.
+
+    Every game owns a ``random.Random`` seeded with ``seed`` (random if not
+    given), so the seed plus the turns passed to ``turn`` reproduce a game
+    exactly. A ``recorder`` with a ``record_turn(tick, direction)`` method
+    sees every applied turn.
+    """
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, rng=None, seed=None,
+                 snake_factory=SnakeState, food_factory=FoodState):
+        self.width = width
+        self.height = height
+        if rng is None:
+            self.seed = seed if seed is not None else random.randrange(2 ** 63)
+            rng = random.Random(self.seed)
+        else:
+            self.seed = seed
+        self.rng = rng
+        self.recorder = None
+        self.snake = snake_factory(width, height)
+        self.food = food_factory(width, height, rng=self.rng, free_cells=self.snake.free_cells)
+        self.inputs = InputQueue()
+        self.score = 0
+        self.eaten = dict.fromkeys(FOOD_NAMES, 0) # Food eaten so far, by type
+        self.speed_boost_timer = 0
+        self.speed_boost_amount = 0
+        self.ticks = 0
+        self.game_over = False
+
+    def tick_rate(self, base=FPS_BASE):
+        """Logical ticks per second for the current length and speed effect."""
+        return base + (self.snake.length // 5) + self.speed_boost_amount
+
+    def queue_direction(self, direction, timestamp=None):
+        """Buffers a turn to be applied on an upcoming tick; returns True if accepted."""
+        return self.inputs.push(direction, self.snake.direction, timestamp)
+
+    def turn(self, direction):
+        """Applies a turn before the next tick; returns False for a 180-degree turn."""
+        if not self.snake.change_direction(direction):
+            return False
+        if self.recorder is not None:
+            self.recorder.record_turn(self.ticks, direction)
+        return True
+
+    def state_hash(self):
+        """Short digest of everything a replay must reproduce."""
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(self.snake.packed().tobytes())
+        food = self.food.position or (-1, -1)
+        digest.update(struct.pack("<7q", self.ticks, self.score, self.snake.length,
+                                  DIRECTION_INDEX[self.snake.direction], food[0], food[1],
+                                  self.speed_boost_timer))
+        digest.update(self.food.type.encode())
+        return digest.hexdigest()
+
+    def step(self):
+        """Advances the game by one tick and returns ATE, DIED or None."""
+        if self.game_over:
+            return DIED
+
+        queued = self.inputs.pop()
+        if queued is not None:
+            self.turn(queued)
+
+        # Update speed boost timer
+        if self.speed_boost_timer > 0:
+            self.speed_boost_timer -= 1
+        else:
+            self.speed_boost_amount = 0 # Reset boost when timer runs out
+
+        self.snake.move()
+        self.ticks += 1
+
+        if self.snake.check_collision():
+            self.game_over = True
+            return DIED
+
+        if self.snake.head != self.food.position:
+            return None
+
+        power = self.food.properties["power"]
+        self.snake.grow(power)
+        self.score += power
+        self.eaten[self.food.type] += 1
+
+        # Handle special food effects
+        if self.food.type in ["speed", "slow"]:
+            self.speed_boost_timer = self.food.properties.get("duration", 200)
+            self.speed_boost_amount = self.food.properties.get("boost", 0)
+        elif self.food.type == "normal":
+            # Reset any active speed effects
+            self.speed_boost_timer = 0
+            self.speed_boost_amount = 0
+
+        self.food.respawn()
+        return ATE
+
+
+class BatchSimulation:
+    """Steps ``n`` independent games at once with vectorized NumPy ticks.
+
+    Each game keeps its body in a ring buffer of packed cell indices
+    (``y * width + x``) next to a per-game occupancy grid, so a tick is a
+    fixed number of array operations no matter how long the snakes are.
+    Games that die stay frozen until ``reset`` is called for them.
+    """
+    RESPAWN_ROUNDS = 4
+
+    def __init__(self, n, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None):
+        if np is None:
+            raise ImportError("BatchSimulation requires numpy")
+        self.n = n
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.rng = np.random.default_rng(seed)
+
+        self._dx = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+        self._dy = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+        self._power = np.array([FOOD_TYPES[name]["power"] for name in FOOD_NAMES], dtype=np.int32)
+        self._duration = np.array([FOOD_TYPES[name].get("duration", 0) for name in FOOD_NAMES], dtype=np.int32)
+        self._boost = np.array([FOOD_TYPES[name].get("boost", 0) for name in FOOD_NAMES], dtype=np.int32)
+        self._has_effect = np.array(["effect" in FOOD_TYPES[name] for name in FOOD_NAMES])
+        self._resets_effect = np.array([name == "normal" for name in FOOD_NAMES])
+        self._rows = np.arange(n)
+
+        self.ring = np.zeros((n, self.cells), dtype=np.int32)
+        self.occupied = np.zeros((n, self.cells), dtype=bool)
+        self.head_ptr = np.zeros(n, dtype=np.int32)
+        self.body_len = np.zeros(n, dtype=np.int32)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.food_pos = np.zeros(n, dtype=np.int32)
+        self.food_type = np.zeros(n, dtype=np.int8)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.speed_boost_timer = np.zeros(n, dtype=np.int32)
+        self.speed_boost_amount = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.alive = np.zeros(n, dtype=bool)
+        self.reset()
+
+    def reset(self, games=None):
+        """Restarts the given games (a bool mask or index array), or all of them."""
+        games = self._rows if games is None else self._rows[games]
+        start = (self.height // 2) * self.width + self.width // 2
+        self.ring[games, 0] = start
+        self.occupied[games] = False
+        self.occupied[games, start] = True
+        self.head_ptr[games] = 0
+        self.body_len[games] = 1
+        self.length[games] = 1
+        self.direction[games] = DIRECTION_INDEX[UP]
+        self.score[games] = 0
+        self.speed_boost_timer[games] = 0
+        self.speed_boost_amount[games] = 0
+        self.ticks[games] = 0
+        self.alive[games] = True
+        self._respawn_food(games)
+
+    def _respawn_food(self, games):
+        """Picks a new random type and empty cell for the food of the given games.
+
+        A few vectorized rounds of rejection sampling place almost every
+        food; games whose board is too full for that fall back to an exact
+        pick among their free cells. A full board gets no food (-1).
+        """
+        if len(games) == 0:
+            return
+        self.food_type[games] = self.rng.integers(0, len(FOOD_NAMES), len(games))
+        pending = np.asarray(games)
+        for _ in range(self.RESPAWN_ROUNDS):
+            picks = self.rng.integers(0, self.cells, len(pending))
+            ok = ~self.occupied[pending, picks]
+            self.food_pos[pending[ok]] = picks[ok]
+            pending = pending[~ok]
+            if len(pending) == 0:
+                return
+        for game in pending:
+            free = np.flatnonzero(~self.occupied[game])
+            self.food_pos[game] = free[self.rng.integers(len(free))] if len(free) else -1
+
+    def tick_rate(self, base=FPS_BASE):
+        """Per-game logical ticks per second, as in GameState.tick_rate."""
+        return base + self.length // 5 + self.speed_boost_amount
+
+    def heads(self):
+        """Packed head cell index of every game."""
+        return self.ring[self._rows, self.head_ptr]
+
+    def step(self, actions=None):
+        """Advances every live game by one tick.
+
+        ``actions`` is an optional int array of indices into DIRECTIONS, with
+        -1 meaning "keep going"; 180-degree turns are ignored like in
+        SnakeState.change_direction. Returns ``(ate, died)`` bool masks.
+        """
+        rows = self._rows
+        live = self.alive.copy()
+
+        if actions is not None:
+            actions = np.asarray(actions)
+            turn = live & (actions >= 0) & (actions != (self.direction + 2) % 4)
+            self.direction[turn] = actions[turn]
+
+        # Update speed boost timers
+        boosting = live & (self.speed_boost_timer > 0)
+        self.speed_boost_timer[boosting] -= 1
+        self.speed_boost_amount[live & ~boosting] = 0
+
+        head = self.ring[rows, self.head_ptr]
+        new_x = head % self.width + self._dx[self.direction]
+        new_y = head // self.width + self._dy[self.direction]
+        wall = (new_x < 0) | (new_x >= self.width) | (new_y < 0) | (new_y >= self.height)
+        new_head = np.where(wall, 0, new_y * self.width + new_x)
+
+        # The tail leaves before the head arrives, so chasing it is allowed
+        pop = live & ~wall & (self.body_len >= self.length)
+        tail_ptr = (self.head_ptr - self.body_len + 1) % self.cells
+        tails = self.ring[rows, tail_ptr]
+        self.occupied[rows[pop], tails[pop]] = False
+        self.body_len[pop] -= 1
+
+        died = live & (wall | self.occupied[rows, new_head])
+        self.alive[died] = False
+        moved = live & ~died
+
+        self.head_ptr[moved] = (self.head_ptr[moved] + 1) % self.cells
+        self.ring[rows[moved], self.head_ptr[moved]] = new_head[moved]
+        self.occupied[rows[moved], new_head[moved]] = True
+        self.body_len[moved] += 1
+        self.ticks[live] += 1
+
+        ate = moved & (new_head == self.food_pos)
+        eaten = self.food_type[ate]
+        power = self._power[eaten]
+        self.length[ate] += power
+        self.score[ate] += power
+
+        # Special food effects: speed/slow set a boost, normal clears it
+        effect = np.zeros(self.n, dtype=bool)
+        effect[ate] = self._has_effect[eaten]
+        self.speed_boost_timer[effect] = self._duration[self.food_type[effect]]
+        self.speed_boost_amount[effect] = self._boost[self.food_type[effect]]
+        clear = np.zeros(self.n, dtype=bool)
+        clear[ate] = self._resets_effect[eaten]
+        self.speed_boost_timer[clear] = 0
+        self.speed_boost_amount[clear] = 0
+
+        self._respawn_food(rows[ate])
+        return ate, died
@@ -0,0 +1,197 @@
+"""Compact binary save states of a running game.
+
+A snapshot holds everything ``GameState`` needs to carry on exactly where
+it stopped, all little-endian:
+
+* header: ``b"SNKS"``, format version (u8), flags (u8, bit 0: the game has
+  a seed), board width and height (u16), seed (u64), ticks (u64), score,
+  target length (u32), direction index, food type index (u8), food cell
+  (i32, -1 for none), speed-boost timer and amount (i32), body length (u32);
+* the ``random.Random`` state: version (u8), whether a Gaussian is cached
+  (u8) and its value (f64), then the 625 words of the Mersenne Twister;
+* how many of each food type have been eaten (u32 each, in FOOD_NAMES
+  order; not in version 1 snapshots);
+* the body as packed cell indices (``y * width + x``, i32) from tail to head.
+
+Food spawns by rank among the free cells, so the body is all it takes to
+spawn the same food again. Version 3 snapshots also carry every free cell
+in an older spawn order; it is skipped on load.
+
+Writing one is a few buffer copies, so it takes microseconds even for very
+long snakes, and its size grows with the body, not the board.
+``Snapshot.open`` maps the file with ``mmap``; its ``body`` is a view
+straight into the mapping, read once while the game is rebuilt.
+"""
+import mmap
+import struct
+import sys
+from array import array
+
+from simulation import DIRECTION_INDEX, DIRECTIONS, FOOD_NAMES, FoodState, GameState, SnakeState
+
+MAGIC = b"SNKS"
+VERSION = 4
+HEADER = struct.Struct("<4sBBHHQQIIBBiiiI")
+RNG = struct.Struct("<BBd")
+RNG_WORDS = 625
+EATEN = struct.Struct("<" + "I" * len(FOOD_NAMES))
+HAS_SEED = 1
+
+
+class SnapshotError(Exception):
+    """Raised for unreadable or inconsistent snapshots."""
+
+
+def _little_endian(values):
+    """``values`` (an array) in little-endian byte order."""
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def dumps(state):
+    """Serializes a GameState into snapshot bytes."""
+    snake, food = state.snake, state.food
+    body = _little_endian(snake.packed())
+    rng_version, words, gauss = state.rng.getstate()
+    food_cell = -1 if food.position is None else food.position[1] * state.width + food.position[0]
+    header = HEADER.pack(
+        MAGIC, VERSION, HAS_SEED if state.seed is not None else 0, state.width, state.height,
+        state.seed or 0, state.ticks, state.score, snake.length, DIRECTION_INDEX[snake.direction],
+        FOOD_NAMES.index(food.type), food_cell, state.speed_boost_timer, state.speed_boost_amount, len(body))
+    rng = RNG.pack(rng_version, gauss is not None, gauss or 0.0)
+    eaten = EATEN.pack(*(state.eaten[name] for name in FOOD_NAMES))
+    return b"".join((header, rng, _little_endian(array("I", words)).tobytes(), eaten, body.tobytes()))
+
+
+def save(path, state):
+    """Writes a snapshot of ``state`` to ``path``."""
+    with open(path, "wb") as f:
+        f.write(dumps(state))
+
+
+class Snapshot:
+    """A parsed snapshot over a buffer (bytes, or a file mapped by ``open``).
+
+    The header fields are attributes; ``body`` is a read-only int view of
+    the packed cells in the buffer, not a copy. Close the snapshot (or use
+    it as a context manager) to release the mapping.
+    """
+    def __init__(self, buffer, mapping=None):
+        self._mapping = mapping
+        self._view = memoryview(buffer)
+        self.body = None
+        try:
+            self._parse()
+        except (struct.error, ValueError, TypeError) as e:
+            self._release()
+            raise SnapshotError(f"snapshot is corrupt: {e}") from None
+        except BaseException:
+            self._release() # Views into a mapping must go before it can be closed
+            raise
+
+    def _parse(self):
+        if len(self._view) < HEADER.size + RNG.size + 4 * RNG_WORDS:
+            raise SnapshotError("snapshot is truncated")
+        (magic, version, flags, self.width, self.height, seed, self.ticks, self.score, self.length,
+         direction, food_type, food_cell, self.speed_boost_timer, self.speed_boost_amount,
+         body_length) = HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            raise SnapshotError("not a snake snapshot")
+        if not 1 <= version <= VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version}")
+        if not self.width or not self.height:
+            raise SnapshotError("snapshot board is empty")
+        if direction >= len(DIRECTIONS) or food_type >= len(FOOD_NAMES):
+            raise SnapshotError("snapshot has an unknown direction or food type")
+        self.seed = seed if flags & HAS_SEED else None
+        self.direction = DIRECTIONS[direction]
+        self.food_type = FOOD_NAMES[food_type]
+        self.food_position = None if food_cell < 0 else (food_cell % self.width, food_cell // self.width)
+
+        offset = HEADER.size
+        rng_version, has_gauss, gauss = RNG.unpack_from(self._view, offset)
+        offset += RNG.size
+        words = array("I")
+        words.frombytes(self._view[offset:offset + 4 * RNG_WORDS])
+        offset += 4 * RNG_WORDS
+        self.rng_state = (rng_version, tuple(_little_endian(words)), gauss if has_gauss else None)
+
+        self.eaten = dict.fromkeys(FOOD_NAMES, 0)
+        if version >= 2:
+            if len(self._view) < offset + EATEN.size:
+                raise SnapshotError("snapshot is truncated")
+            self.eaten = dict(zip(FOOD_NAMES, EATEN.unpack_from(self._view, offset)))
+            offset += EATEN.size
+
+        free_length = self.width * self.height - body_length if version == 3 else 0
+        if free_length < 0 or len(self._view) != offset + 4 * (body_length + free_length):
+            raise SnapshotError("snapshot body has the wrong size")
+        self.body = self._view[offset:offset + 4 * body_length].cast("i")
+        if sys.byteorder != "little":
+            self.body = _little_endian(array("i", self.body))
+
+    @classmethod
+    def open(cls, path):
+        """Maps the snapshot file at ``path`` read-only."""
+        with open(path, "rb") as f:
+            try:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # mmap refuses empty files
+                raise SnapshotError("snapshot is empty") from None
+        try:
+            return cls(mapping, mapping)
+        except BaseException:
+            mapping.close() # The half-built snapshot released its views of it
+            raise
+
+    def restore(self, snake_factory=SnakeState, food_factory=FoodState):
+        """Builds a GameState that continues exactly where the snapshot was taken."""
+        if self.food_position is not None and not (0 <= self.food_position[1] < self.height):
+            raise SnapshotError("snapshot food is off the board")
+        state = GameState(self.width, self.height, seed=self.seed,
+                          snake_factory=snake_factory, food_factory=food_factory)
+        state.seed = self.seed
+        try:
+            state.snake.restore(self.body, self.direction, self.length)
+        except ValueError as e:
+            raise SnapshotError(f"snapshot body is invalid: {e}") from None
+        state.food.type = self.food_type
+        state.food.properties = state.food.TYPES[self.food_type]
+        state.food.position = self.food_position
+        try:
+            state.rng.setstate(self.rng_state)
+        except (ValueError, TypeError) as e:
+            raise SnapshotError(f"snapshot random state is invalid: {e}") from None
+        state.score = self.score
+        state.eaten = dict(self.eaten)
+        state.ticks = self.ticks
+        state.speed_boost_timer = self.speed_boost_timer
+        state.speed_boost_amount = self.speed_boost_amount
+        return state
+
+    def _release(self):
+        """Releases every view into the buffer."""
+        for view in (self.body, self._view):
+            if isinstance(view, memoryview):
+                view.release()
+
+    def close(self):
+        """Releases the buffer and closes the mapping, if any."""
+        self._release()
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load(path, snake_factory=SnakeState, food_factory=FoodState):
+    """Reads the snapshot at ``path`` and returns the restored GameState."""
+    with Snapshot.open(path) as snapshot:
+        return snapshot.restore(snake_factory, food_factory)
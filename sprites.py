@@ -0,0 +1,150 @@
+"""Pre-rendered 3D cube sprites for the snake and food.
+
+Every cube is drawn once with polygons onto a per-pixel-alpha surface and
+then reused, so drawing a snake is a single ``Surface.blits`` call instead
+of five draw calls per segment.
+
+Sprites come in two looks: "cube" (the 3D cube with a highlight on its
+top-left edge) and "flat", a square of the top colour with no depth that
+covers fewer pixels and so is cheaper to blit.
+"""
+from collections import OrderedDict
+
+import pygame
+
+# --- Cube Styles: per-channel deltas for (side face 1, side face 2, highlight) ---
+CUBE_STYLES = {
+    "head": ((0, -40, -20), (0, -80, -40), (50, 50, 50)),
+    "body": ((0, -30, -20), (0, -60, -40), (50, 50, 50)),
+    "food": ((-30, -30, -30), (-60, -60, -60), (60, 60, 60)),
+}
+
+LOOKS = ("cube", "flat") # Best looking first
+
+# --- Body Gradient ---
+GRADIENT_LEVELS = 16 # Distinct body colours, so at most this many body sprites
+
+
+def _shade(color, delta):
+    """Adds a per-channel delta to a colour, clamped to 0-255."""
+    return tuple(max(0, min(255, c + d)) for c, d in zip(color, delta))
+
+
+def gradient_palette(levels=GRADIENT_LEVELS):
+    """All body top colours, from tail to head."""
+    return [(20, 120 + (60 * level) // (levels - 1), 90) for level in range(levels)]
+
+
+def gradient_level(index, count, levels=GRADIENT_LEVELS):
+    """Palette index of body segment ``index`` out of ``count`` segments."""
+    if count <= 1:
+        return levels - 1
+    span = count - 1
+    return (2 * index * (levels - 1) + span) // (2 * span)
+
+
+def gradient_boundaries(count, levels=GRADIENT_LEVELS):
+    """First body index of each gradient level after the first, for ``count`` segments."""
+    if count <= 1:
+        return [0] * (levels - 1)
+    span = count - 1
+    # Smallest index whose gradient_level reaches each level
+    return [-(-(2 * level - 1) * span // (2 * (levels - 1))) for level in range(1, levels)]
+
+
+def render_cube(style, top_color, block_size, offset):
+    """Draws one 3D cube at the origin of a new per-pixel-alpha surface."""
+    side_delta_1, side_delta_2, highlight_delta = CUBE_STYLES[style]
+    side_color_1 = _shade(top_color, side_delta_1)
+    side_color_2 = _shade(top_color, side_delta_2)
+    highlight_color = _shade(top_color, highlight_delta)
+
+    sprite = pygame.Surface((block_size + offset + 1, block_size + offset + 1), pygame.SRCALPHA)
+    b = block_size
+
+    # Points for the cube faces
+    top_face_pts = [(0, 0), (b, 0), (b, b), (0, b)]
+    right_face_pts = [(b, 0), (b + offset, offset), (b + offset, b + offset), (b, b)]
+    bottom_face_pts = [(0, b), (b, b), (b + offset, b + offset), (offset, b + offset)]
+
+    # Draw the side faces first
+    pygame.draw.polygon(sprite, side_color_2, bottom_face_pts)
+    pygame.draw.polygon(sprite, side_color_1, right_face_pts)
+
+    # Draw the top face
+    pygame.draw.polygon(sprite, top_color, top_face_pts)
+
+    # Draw a subtle highlight on the top-left edge
+    pygame.draw.line(sprite, highlight_color, (2, 2), (b - 2, 2), 2)
+    pygame.draw.line(sprite, highlight_color, (2, 2), (2, b - 2), 2)
+
+    if pygame.display.get_surface() is not None:
+        sprite = sprite.convert_alpha()
+    return sprite
+
+
+def render_flat(top_color, block_size):
+    """A flat square of the top colour.
+
+    It has per-pixel alpha like the cubes, although it is opaque: pygame
+    blits those several times faster than surfaces without alpha.
+    """
+    sprite = pygame.Surface((block_size, block_size), pygame.SRCALPHA)
+    sprite.fill(top_color)
+    if pygame.display.get_surface() is not None:
+        sprite = sprite.convert_alpha()
+    return sprite
+
+
+def render_sprite(style, top_color, block_size, offset, look="cube"):
+    """Draws a cube in one of the LOOKS."""
+    if look == "flat":
+        return render_flat(top_color, block_size)
+    return render_cube(style, top_color, block_size, offset)
+
+
+class SpriteCache:
+    """Cube sprites keyed by (style, top colour, block size, depth offset, look).
+
+    Entries are evicted least-recently-used beyond ``max_entries``. A change
+    of block size or depth offset makes every older sprite unreachable, so it
+    clears the whole cache; call ``clear`` after a colour theme change.
+    """
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.block_size = None
+        self.offset = None
+        self._sprites = OrderedDict()
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def clear(self):
+        """Drops every cached sprite."""
+        self._sprites.clear()
+
+    def get(self, style, top_color, block_size, offset, look="cube"):
+        """Returns the sprite for a cube, rendering it on first use."""
+        key = (style, top_color, block_size, offset, look)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            return sprite
+
+        if block_size != self.block_size or offset != self.offset:
+            self.clear()
+            self.block_size, self.offset = block_size, offset
+
+        sprite = render_sprite(style, top_color, block_size, offset, look)
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_entries:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def body_sprites(self, block_size, offset, levels=GRADIENT_LEVELS, look="cube"):
+        """Sprites for every body gradient level, from tail to head."""
+        return [self.get("body", color, block_size, offset, look) for color in gradient_palette(levels)]
+
+
+# Shared by Snake.draw and Food.draw
+sprite_cache = SpriteCache()
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+pytest.importorskip("numpy")
+
+from array_renderer import ArrayRenderer
+from simulation import FOOD_NAMES, RIGHT, FoodState, SnakeState
+from sprites import gradient_level, gradient_palette, render_sprite
+
+BLOCK, DEPTH = 20, 5
+WIDTH, HEIGHT = 12, 10
+BG, GRID, HEAD = (30, 30, 30), (50, 50, 50), (0, 200, 100)
+FOOD_COLORS = {name: (200, 40 * i, 40) for i, name in enumerate(FOOD_NAMES)}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    pygame.display.set_mode((WIDTH * BLOCK, HEIGHT * BLOCK))
+    yield
+    pygame.display.quit()
+
+
+def _coiled_snake():
+    """A snake whose rows lie against each other, drawn in both directions."""
+    path = [(x, 4) for x in range(1, 8)] + [(7, 3)] + [(x, 3) for x in range(6, 0, -1)] + \
+           [(1, 2)] + [(x, 2) for x in range(2, 7)]
+    snake = SnakeState(WIDTH, HEIGHT)
+    snake.restore([y * WIDTH + x for x, y in path], RIGHT, len(path))
+    snake.move() # So the tail has just slid off a cell
+    return snake
+
+
+def _sprite_path(snake, food, grid, look):
+    """The board drawn the way Snake.draw and Food.draw blit it."""
+    screen = pygame.Surface((WIDTH * BLOCK, HEIGHT * BLOCK)).convert()
+    screen.fill(BG)
+    if grid:
+        for i in range(0, WIDTH * BLOCK, BLOCK):
+            pygame.draw.line(screen, GRID, (i, 0), (i, HEIGHT * BLOCK))
+        for j in range(0, HEIGHT * BLOCK, BLOCK):
+            pygame.draw.line(screen, GRID, (0, j), (WIDTH * BLOCK, j))
+    palette = gradient_palette()
+    count = len(snake.body)
+    tail, head = snake.interpolated_ends(1.0)
+    blits = [] if tail is None else [(render_sprite("body", palette[0], BLOCK, DEPTH, look), tail)]
+    for i, (x, y) in enumerate(snake.body):
+        if i < count - 1:
+            blits.append((render_sprite("body", palette[gradient_level(i, count)], BLOCK, DEPTH, look), (x, y)))
+    blits.append((render_sprite("head", HEAD, BLOCK, DEPTH, look), head))
+    blits.append((render_sprite("food", FOOD_COLORS[food.type], BLOCK, DEPTH, look), food.position))
+    for sprite, (x, y) in blits:
+        screen.blit(sprite, (round(x * BLOCK), round(y * BLOCK)))
+    return screen
+
+
+@pytest.mark.parametrize("look", ["cube", "flat"])
+@pytest.mark.parametrize("grid", [True, False])
+def test_matches_sprite_path(grid, look):
+    snake = _coiled_snake()
+    food = FoodState(WIDTH, HEIGHT, free_cells=snake.free_cells)
+    food.respawn(8 * WIDTH + 9)
+    renderer = ArrayRenderer(BLOCK, DEPTH, BG, GRID, HEAD, FOOD_COLORS)
+    screen = pygame.Surface((WIDTH * BLOCK, HEIGHT * BLOCK)).convert()
+    renderer.render(screen, snake, food, grid, 1.0, look=look)
+    expected = pygame.surfarray.array2d(_sprite_path(snake, food, grid, look))
+    assert (pygame.surfarray.array2d(screen) != expected).sum() == 0
+
+
+def test_matches_sprite_path_while_moving():
+    from simulation import DOWN, LEFT, UP
+
+    snake = _coiled_snake()
+    food = FoodState(WIDTH, HEIGHT, free_cells=snake.free_cells)
+    food.respawn(8 * WIDTH + 9)
+    renderer = ArrayRenderer(BLOCK, DEPTH, BG, GRID, HEAD, FOOD_COLORS)
+    screen = pygame.Surface((WIDTH * BLOCK, HEIGHT * BLOCK)).convert()
+    # Round the right end, back along the top row and down the left edge
+    turns = [RIGHT, DOWN, DOWN, RIGHT, UP, UP, UP, UP] + [LEFT] * 9 + [DOWN] * 4
+    for tick, direction in enumerate(turns):
+        snake.direction = direction
+        if tick % 4 == 0:
+            snake.grow()
+        if tick == 10:
+            food.respawn(HEIGHT * WIDTH - 1) # The far corner, where nothing reaches
+        snake.move()
+        assert not snake.check_collision()
+        if tick % 3 == 1:
+            continue # Two ticks in one frame
+        renderer.render(screen, snake, food, True, 1.0)
+        expected = pygame.surfarray.array2d(_sprite_path(snake, food, True, "cube"))
+        assert (pygame.surfarray.array2d(screen) != expected).sum() == 0, tick
@@ -0,0 +1,107 @@
+import socket
+import struct
+
+import pytest
+
+from multiplayer import (
+    DELTA_HEADER, FOOD_CHANGE, KEYFRAME, KEYFRAME_HEADER, KEYFRAME_SNAKE, MAX_FOODS, MAX_PLAYERS, Arena,
+    BackgroundClient, ClientBoard, ProtocolError, encode_keyframe, encode_welcome, frame, main,
+)
+
+
+def test_most_foods_fit_a_keyframe():
+    arena = Arena(40, 40, foods=MAX_FOODS, seed=1)
+    arena.add_player()
+    arena.step()
+    board = ClientBoard()
+    board.apply(encode_welcome(0, arena.width, arena.height, 10))
+    board.apply(encode_keyframe(arena))
+    assert len(board.foods) == MAX_FOODS
+
+
+@pytest.mark.parametrize("foods", [0, MAX_FOODS + 1])
+def test_food_count_out_of_range(foods, capsys):
+    with pytest.raises(ValueError):
+        Arena(40, 40, foods=foods)
+    with pytest.raises(SystemExit):
+        main(["serve", "--foods", str(foods)])
+    assert "--foods" in capsys.readouterr().err
+
+
+def test_player_ids_skip_those_in_use():
+    arena = Arena(40, 40, seed=1)
+    kept = arena.add_player()
+    for _ in range(MAX_PLAYERS - 1):
+        arena.remove_player(arena.add_player())
+    assert arena.add_player() != kept
+    assert kept in arena.players and len(arena.players) == 2
+
+
+def test_full_arena():
+    arena = Arena(40, 40, seed=1)
+    arena.players = dict.fromkeys(range(MAX_PLAYERS))
+    with pytest.raises(ValueError):
+        arena.add_player()
+
+
+def _welcomed_board():
+    board = ClientBoard()
+    board.apply(encode_welcome(0, 10, 10, 10))
+    return board
+
+
+@pytest.mark.parametrize("payload", [
+    KEYFRAME_HEADER.pack(KEYFRAME, 1, 0, 1) + FOOD_CHANGE.pack(0, 5, 99), # Unknown food type
+    KEYFRAME_HEADER.pack(KEYFRAME, 1, 1, 0) + KEYFRAME_SNAKE.pack(0, 0, 9, 1) + struct.pack("<i", 5), # Direction
+    KEYFRAME_HEADER.pack(KEYFRAME, 1, 1, 0) + KEYFRAME_SNAKE.pack(0, 0, 0, 1) + struct.pack("<i", 500), # Off board
+    KEYFRAME_HEADER.pack(KEYFRAME, 1, 1, 0) + KEYFRAME_SNAKE.pack(0, 0, 0, 0), # Empty body
+    KEYFRAME_HEADER.pack(KEYFRAME, 1, 1, 0) + KEYFRAME_SNAKE.pack(0, 0, 0, 3) + struct.pack("<i", 5), # Truncated
+    KEYFRAME_HEADER.pack(KEYFRAME, 1, 2, 0), # Snakes missing
+], ids=["food type", "direction", "off board", "empty body", "truncated body", "snakes missing"])
+def test_malformed_keyframe(payload):
+    with pytest.raises(ProtocolError):
+        _welcomed_board().apply(payload)
+
+
+def test_malformed_delta():
+    board = _welcomed_board()
+    board.apply(KEYFRAME_HEADER.pack(KEYFRAME, 1, 0, 1) + FOOD_CHANGE.pack(0, 5, 0))
+    with pytest.raises(ProtocolError):
+        board.apply(DELTA_HEADER.pack(b"D", 2, 0, 1) + FOOD_CHANGE.pack(0, 6, 99))
+
+
+def test_keyframe_before_welcome():
+    with pytest.raises(ProtocolError):
+        ClientBoard().apply(KEYFRAME_HEADER.pack(KEYFRAME, 1, 0, 0))
+
+
+def _client(port):
+    client = BackgroundClient("127.0.0.1", port)
+    client.start()
+    return client
+
+
+def test_background_client_reports_malformed_messages():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        client = _client(server.getsockname()[1])
+        conn, _ = server.accept()
+        with conn:
+            conn.sendall(frame(encode_welcome(0, 10, 10, 10)) +
+                         frame(KEYFRAME_HEADER.pack(KEYFRAME, 1, 0, 1) + FOOD_CHANGE.pack(0, 5, 99)))
+            client._thread.join(5)
+    assert client.closed and isinstance(client.error, ProtocolError)
+
+
+def test_background_client_closes_while_connecting():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        port = server.getsockname()[1]
+        client = BackgroundClient("127.0.0.1", port)
+        client.close() # Before the network thread even has a loop
+        client.start()
+        client._thread.join(5)
+        assert client.closed and client.error is None
+
+        client = _client(port)
+        client.close()
+        client._thread.join(5)
+        assert client.closed and client.error is None
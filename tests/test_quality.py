@@ -0,0 +1,21 @@
+from quality import QualityGovernor
+
+FRAME = 1 / 60 # Render frame period at 60 Hz
+
+
+def test_steps_down_when_drawing_fills_the_frame():
+    governor = QualityGovernor()
+    # 15 ms fits easily in a 100 ms tick but not in a 16.7 ms frame
+    assert governor.update(0.015, FRAME, FRAME)
+    assert governor.name == "flat"
+
+
+def test_steps_back_up_after_headroom():
+    governor = QualityGovernor()
+    governor.update(0.015, FRAME, FRAME)
+    frames = 0
+    while governor.name != "full":
+        governor.update(0.002, FRAME, FRAME)
+        frames += 1
+    assert frames * FRAME >= QualityGovernor.UP_SECONDS
+    assert governor.changes == 2
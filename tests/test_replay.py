@@ -0,0 +1,50 @@
+import pytest
+
+from replay import END, HEADER, ReplayError, ReplayWriter, _varint, play
+from simulation import DOWN, RIGHT, GameState
+
+
+def _record(path):
+    """Records a short game with two turns; returns the file's bytes."""
+    state = GameState(20, 20, seed=3)
+    state.recorder = ReplayWriter(path, state)
+    for direction in (DOWN, RIGHT):
+        for _ in range(3):
+            state.step()
+        state.turn(direction)
+    state.step()
+    state.recorder.finish(state)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "game.snkr"
+    _record(path)
+    assert play(path)["match"]
+
+
+def test_unknown_record_code(tmp_path):
+    path = tmp_path / "game.snkr"
+    data = _record(path)
+    path.write_bytes(data[:HEADER.size] + _varint((1 << 3) | 6) + data[HEADER.size:])
+    with pytest.raises(ReplayError):
+        play(path)
+
+
+def test_truncated_end_record(tmp_path):
+    path = tmp_path / "game.snkr"
+    data = _record(path)
+    for cut in (1, 4, 8):
+        path.write_bytes(data[:-cut])
+        with pytest.raises(ReplayError):
+            play(path)
+
+
+def test_cut_before_end_record_is_incomplete(tmp_path):
+    path = tmp_path / "game.snkr"
+    data = _record(path)
+    end = data.rindex(_varint(END) + _varint(7)) # END, then the final tick count
+    path.write_bytes(data[:end])
+    result = play(path)
+    assert not result["complete"] and not result["match"]
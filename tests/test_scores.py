@@ -0,0 +1,23 @@
+from scores import ScoreStore
+
+
+def _standing(store, score):
+    """Records and ranks a run with ``score``; returns where it placed."""
+    ticket = store.record(score, 1, 10, {}, rank=True)
+    store.flush()
+    assert store.standing["ticket"] == ticket
+    return store.standing
+
+
+def test_only_beating_the_best_is_a_new_high_score(tmp_path):
+    store = ScoreStore(str(tmp_path / "scores.db"))
+    try:
+        assert not _standing(store, 0)["new_best"] # Nothing to beat yet, but nothing scored
+        assert _standing(store, 5)["new_best"]
+        tie = _standing(store, 5)
+        assert tie["rank"] == 1 and not tie["new_best"]
+        lower = _standing(store, 3)
+        assert lower["rank"] == 3 and not lower["new_best"]
+        assert _standing(store, 6)["new_best"]
+    finally:
+        store.close()
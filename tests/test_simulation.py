@@ -0,0 +1,170 @@
+import random
+
+import pytest
+
+from simulation import (ATE, DIED, DIRECTION_INDEX, DIRECTIONS, DOWN, FOOD_NAMES, FOOD_TYPES, LEFT, RIGHT, UP,
+                        BatchSimulation, FreeCells, GameState, InputQueue, SnakeState)
+
+
+def _cycle(width, height):
+    """A Hamiltonian cycle of packed cells over a board with an even height."""
+    cells = [x for x in range(width)]
+    for y in range(1, height):
+        xs = range(width - 1, 0, -1) if y % 2 else range(1, width)
+        cells.extend(y * width + x for x in xs)
+    cells.extend(y * width for y in range(height - 1, 0, -1))
+    return cells
+
+
+def test_ring_buffer_grows_and_wraps_with_consistent_occupancy():
+    width, height = 20, 20
+    cycle = _cycle(width, height)
+    snake = SnakeState(width, height, start=cycle[0])
+    expected = [cycle[0]]
+    for step in range(1, 800):
+        cell = cycle[step % len(cycle)]
+        previous = expected[-1]
+        snake.direction = (cell % width - previous % width, cell // width - previous // width)
+        if snake.length < 150:
+            snake.grow()
+        snake.move()
+        assert not snake.check_collision()
+        expected.append(cell)
+        del expected[:-snake.length]
+
+        assert list(snake.packed()) == expected
+        assert list(snake.body) == [(cell % width, cell // width) for cell in expected]
+        body = set(expected)
+        for cell in range(width * height):
+            assert snake.occupies(cell % width, cell // width) == (cell in body)
+            assert (cell in snake.free_cells) == (cell not in body)
+        assert len(snake.free_cells) == width * height - len(expected)
+        assert snake.index_at(*snake.head) == len(expected) - 1
+        assert snake.index_at(*snake.body[0]) == 0
+    assert len(snake._cells) > SnakeState.INITIAL_CAPACITY
+
+
+def test_free_cells_take_release_and_select():
+    free_cells = FreeCells(3000)
+    rng = random.Random(0)
+    taken = set(rng.sample(range(3000), 2000))
+    for cell in taken:
+        free_cells.take(cell)
+    free_cells.take(next(iter(taken))) # Taking twice changes nothing
+    free = [cell for cell in range(3000) if cell not in taken]
+    assert len(free_cells) == len(free)
+    assert [free_cells.select(rank) for rank in range(len(free))] == free
+
+    free_cells.release(free[0]) # Releasing a free cell changes nothing
+    free_cells.release(min(taken))
+    assert len(free_cells) == len(free) + 1 and min(taken) in free_cells
+
+
+def test_free_cells_choice_and_sample():
+    free_cells = FreeCells(50)
+    for cell in range(45):
+        free_cells.take(cell)
+    rng = random.Random(1)
+    assert all(45 <= free_cells.choice(rng) < 50 for _ in range(100))
+    picks = free_cells.sample(3, rng)
+    assert len(set(picks)) == 3 and all(cell in free_cells for cell in picks)
+    assert len(free_cells) == 5 # Sampling leaves the cells free
+    assert sorted(free_cells.sample(10, rng)) == [45, 46, 47, 48, 49]
+    for cell in range(45, 50):
+        free_cells.take(cell)
+    assert free_cells.choice(rng) is None and free_cells.sample(2, rng) == []
+
+
+def test_free_cells_picks_depend_only_on_the_free_set():
+    first, second = FreeCells(5000), FreeCells(5000)
+    taken = random.Random(2).sample(range(5000), 4000)
+    for cell in taken:
+        first.take(cell)
+    for cell in range(5000): # Same set, different history
+        second.take(cell)
+    for cell in set(range(5000)) - set(taken):
+        second.release(cell)
+    a, b = random.Random(3), random.Random(3)
+    assert [first.choice(a) for _ in range(50)] == [second.choice(b) for _ in range(50)]
+    assert first.sample(20, a) == second.sample(20, b)
+
+
+def test_input_queue_checks_turns_against_the_queued_direction():
+    queue = InputQueue()
+    assert queue.push(LEFT, UP)
+    assert not queue.push(RIGHT, UP) # Reverses the queued left, though not the current up
+    assert not queue.push(LEFT, UP) # No-op after the queued left
+    assert queue.push(DOWN, UP) # Reverses the current up, but follows the queued left
+    assert [queue.pop(), queue.pop(), queue.pop()] == [LEFT, DOWN, None]
+
+
+def test_input_queue_capacity():
+    now = [0.0]
+    queue = InputQueue(maxlen=3, clock=lambda: now[0])
+    for direction in (LEFT, UP, RIGHT):
+        assert queue.push(direction, DOWN)
+    assert not queue.push(DOWN, DOWN)
+    assert len(queue) == 3 and queue.dropped == 1
+    now[0] = 0.5
+    assert queue.pop() == LEFT
+    assert queue.push(DOWN, DOWN) # There is room again
+    assert queue.latency_stats()["last"] == 0.5
+
+
+def _sync_food(batch, game, state):
+    """Puts the batch game's food into ``state``, whose food comes from another generator."""
+    cell = int(batch.food_pos[game])
+    state.food.position = None if cell < 0 else (cell % batch.width, cell // batch.width)
+    state.food.type = FOOD_NAMES[batch.food_type[game]]
+    state.food.properties = FOOD_TYPES[state.food.type]
+
+
+def _batch_body(batch, game):
+    """The batch game's body as packed cells from tail to head."""
+    start = batch.head_ptr[game] - batch.body_len[game] + 1
+    return [int(batch.ring[game, i % batch.cells]) for i in range(start, start + batch.body_len[game])]
+
+
+def _steer(state, rng):
+    """A turn index towards the food that doesn't hit a wall or the body, or -1 to go on."""
+    (x, y), (fx, fy) = state.snake.head, state.food.position or state.snake.head
+    safe = [i for i, (dx, dy) in enumerate(DIRECTIONS)
+            if 0 <= x + dx < state.width and 0 <= y + dy < state.height and
+            not state.snake.occupies(x + dx, y + dy)]
+    closer = [i for i in safe if abs(fx - x - DIRECTIONS[i][0]) + abs(fy - y - DIRECTIONS[i][1]) <
+              abs(fx - x) + abs(fy - y)]
+    return rng.choice(closer or safe or [-1])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batch_step_matches_game_state(seed):
+    pytest.importorskip("numpy")
+    batch = BatchSimulation(8, 12, 10, seed=seed)
+    states = [GameState(12, 10, seed=seed) for _ in range(batch.n)]
+    for game, state in enumerate(states):
+        _sync_food(batch, game, state)
+    rng = random.Random(seed)
+    for _ in range(400):
+        actions = [_steer(state, rng) if not state.game_over else -1 for state in states]
+        for action, state in zip(actions, states):
+            if action >= 0 and not state.game_over:
+                state.turn(DIRECTIONS[action])
+        ate, died = batch.step(actions)
+        for game, state in enumerate(states):
+            was_over = state.game_over
+            event = state.step()
+            assert bool(died[game]) == (event == DIED and not was_over)
+            assert bool(batch.alive[game]) == (not state.game_over)
+            if was_over:
+                continue
+            assert bool(ate[game]) == (event == ATE)
+            if ate[game]:
+                _sync_food(batch, game, state)
+            assert _batch_body(batch, game) == list(state.snake.packed())
+            assert batch.direction[game] == DIRECTION_INDEX[state.snake.direction]
+            assert (batch.length[game], batch.score[game]) == (state.snake.length, state.score)
+            assert (batch.speed_boost_timer[game], batch.speed_boost_amount[game]) == \
+                (state.speed_boost_timer, state.speed_boost_amount)
+        if not batch.alive.any():
+            break
+    assert batch.score.sum() > 50 # Food was eaten along the way
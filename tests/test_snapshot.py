@@ -0,0 +1,93 @@
+import pytest
+
+import snapshot
+from autopilot import Autopilot
+from simulation import ATE, DIED, GameState
+
+
+def _play(state, autopilot, ticks):
+    """Steps an autopilot-driven game; returns the events and state hashes per tick."""
+    trace = []
+    for _ in range(ticks):
+        autopilot.steer()
+        event = state.step()
+        trace.append((event, state.state_hash()))
+        if event == DIED:
+            break
+    return trace
+
+
+@pytest.mark.parametrize("seed, at", [(0, 1587), (1, 40), (2, 300), (3, 900)])
+def test_round_trip_spawns_food_like_the_original(seed, at):
+    original = GameState(seed=seed)
+    _play(original, Autopilot(original), at)
+    restored = snapshot.Snapshot(snapshot.dumps(original)).restore()
+    assert restored.state_hash() == original.state_hash()
+
+    # Fresh autopilots on both, as the autopilot's own plan history isn't saved
+    expected = _play(original, Autopilot(original), 300)
+    actual = _play(restored, Autopilot(restored), 300)
+    assert any(event == ATE for event, _ in expected) # Food respawned along the way
+    assert actual == expected
+
+
+def _saved_game(tmp_path):
+    state = GameState(seed=5)
+    _play(state, Autopilot(state), 200)
+    path = tmp_path / "save.snks"
+    snapshot.save(path, state)
+    return state, path
+
+
+def test_size_grows_with_the_body_not_the_board():
+    small, large = GameState(20, 20, seed=1), GameState(2000, 2000, seed=1)
+    assert len(snapshot.dumps(large)) == len(snapshot.dumps(small))
+
+
+def test_version_3_free_cells_are_skipped():
+    state = GameState(seed=5)
+    _play(state, Autopilot(state), 200)
+    data = bytearray(snapshot.dumps(state))
+    data[4] = 3
+    free = [cell for cell in range(state.width * state.height) if cell in state.snake.free_cells]
+    data += b"".join(cell.to_bytes(4, "little") for cell in reversed(free))
+    assert snapshot.Snapshot(bytes(data)).restore().state_hash() == state.state_hash()
+
+
+def test_load_from_file(tmp_path):
+    state, path = _saved_game(tmp_path)
+    assert snapshot.load(path).state_hash() == state.state_hash()
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "save.snks"
+    path.write_bytes(b"")
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.load(path)
+
+
+def test_truncated_file(tmp_path):
+    _, path = _saved_game(tmp_path)
+    data = path.read_bytes()
+    for size in (3, snapshot.HEADER.size, snapshot.HEADER.size + 100, len(data) - 4, len(data) - 1):
+        path.write_bytes(data[:size])
+        with pytest.raises(snapshot.SnapshotError):
+            snapshot.load(path)
+
+
+def test_bit_flips_load_or_raise_snapshot_error(tmp_path):
+    _, path = _saved_game(tmp_path)
+    data = path.read_bytes()
+    body = snapshot.HEADER.size + snapshot.RNG.size + 4 * snapshot.RNG_WORDS
+    # Every byte of the header, a sample of the random state, the food counts and the body
+    offsets = (list(range(snapshot.HEADER.size + snapshot.RNG.size)) + list(range(0, body, 61)) +
+               list(range(body, len(data), 7)))
+    for offset in offsets:
+        for bit in (0, 7):
+            corrupt = bytearray(data)
+            corrupt[offset] ^= 1 << bit
+            path.write_bytes(corrupt)
+            try:
+                snapshot.load(path)
+            except snapshot.SnapshotError:
+                pass
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from tournament import ResultsFileError, load_results, main, run
+
+
+def _config(games):
+    return {"policy": "greedy", "width": 10, "height": 10, "max_ticks": 200, "seed": 0, "games": games}
+
+
+@pytest.mark.parametrize("header", ["{not json", "[]", '{"games": 4}', '{"config": 4}'])
+def test_unreadable_header(tmp_path, capsys, header):
+    path = tmp_path / "results.jsonl"
+    path.write_text(header + "\n")
+    with pytest.raises(ResultsFileError):
+        load_results(str(path), _config(4))
+    with pytest.raises(SystemExit):
+        main(["--games", "4", "--results", str(path)])
+    assert "--results" in capsys.readouterr().err
+
+
+def test_resume_with_fewer_games(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    results, played = run(_config(4), path, workers=1, chunk_size=2)
+    assert played == 4
+    results, played = run(_config(2), path, workers=1, chunk_size=2)
+    assert played == 0 and sorted(result["seed"] for result in results) == [0, 1]
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 3 # The config and the two games in range
+    assert json.loads(lines[0])["config"]["games"] == 2
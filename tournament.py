@@ -0,0 +1,305 @@
+"""Self-play tournament: many seeded headless games over a process pool.
+
+Every game is a ``simulation.GameState`` driven by a policy that picks the
+snake's turn each tick. Games are handed to worker processes in chunks of
+seeds; each finished chunk comes back as one message, is appended to the
+results file (one JSON line per game) and folded into the summary. Run
+the same command again after an interruption and the games already in the
+results file are skipped::
+
+    python tournament.py --games 10000 --policy greedy --results greedy.jsonl
+    python tournament.py --games 1000 --policy pathfinding --workers 8 --max-ticks 50000
+
+``--policy`` is one of POLICIES or ``module:factory`` for a policy of your
+own: ``factory(state)`` returns a callable that gives the direction for the
+coming tick, or None to keep going straight.
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from simulation import ATE, DIED, DIRECTIONS, FOOD_NAMES, GameState
+
+CHUNK_SIZE = 50 # Games per task sent to a worker
+IN_FLIGHT = 2 # Chunks queued per worker, so none sits idle between chunks
+
+
+def _safe_directions(state):
+    """Directions the snake can take this tick without dying, in DIRECTIONS order."""
+    snake = state.snake
+    x, y = snake.head
+    tail = snake.body[0] if snake.length <= len(snake.body) else None # Moves away this tick
+    safe = []
+    for direction in DIRECTIONS:
+        if direction[0] == -snake.direction[0] and direction[1] == -snake.direction[1]:
+            continue
+        cell = (x + direction[0], y + direction[1])
+        if 0 <= cell[0] < snake.width and 0 <= cell[1] < snake.height and \
+                (not snake.occupies(*cell) or cell == tail):
+            safe.append(direction)
+    return safe
+
+
+def random_policy(state):
+    """Turns at random, but never straight into a wall or the body."""
+    rng = random.Random(state.seed)
+
+    def choose():
+        safe = _safe_directions(state)
+        return rng.choice(safe) if safe else None
+    return choose
+
+
+def greedy_policy(state):
+    """Takes the safe direction that gets closest to the food."""
+    def choose():
+        food = state.food.position
+        safe = _safe_directions(state)
+        if not safe or food is None:
+            return safe[0] if safe else None
+        x, y = state.snake.head
+        return min(safe, key=lambda d: abs(x + d[0] - food[0]) + abs(y + d[1] - food[1]))
+    return choose
+
+
+def pathfinding_policy(state):
+    """The autopilot: a Hamiltonian cycle with A* shortcuts to the food."""
+    from autopilot import Autopilot
+    return Autopilot(state).next_direction
+
+
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "pathfinding": pathfinding_policy,
+}
+
+
+class ConfigMismatch(ValueError):
+    """Raised when a results file was written by a run with a different config."""
+
+
+class ResultsFileError(ValueError):
+    """Raised when a results file doesn't start with a run's config."""
+
+
+def load_policy(name):
+    """The policy factory for a POLICIES name or a ``module:factory`` path."""
+    if name in POLICIES:
+        return POLICIES[name]
+    module, _, attr = name.partition(":")
+    if not attr:
+        raise ValueError(f"unknown policy {name!r}; use one of {', '.join(POLICIES)} or module:factory")
+    return getattr(importlib.import_module(module), attr)
+
+
+def play_game(policy, seed, width, height, max_ticks):
+    """Plays one game to the end and returns its result as a dict."""
+    state = GameState(width, height, seed=seed)
+    choose = load_policy(policy)(state)
+    eaten = dict.fromkeys(FOOD_NAMES, 0)
+    cells = width * height
+    cause = "tick limit"
+    while state.ticks < max_ticks:
+        if len(state.snake.body) == cells:
+            cause = "board full"
+            break
+        direction = choose()
+        if direction is not None:
+            state.turn(direction)
+        food_type = state.food.type
+        event = state.step()
+        if event == ATE:
+            eaten[food_type] += 1
+        elif event == DIED:
+            x, y = state.snake.head
+            dx, dy = state.snake.direction
+            cause = "wall" if not (0 <= x + dx < width and 0 <= y + dy < height) else "self"
+            break
+    return {"seed": seed, "score": state.score, "length": len(state.snake.body), "ticks": state.ticks,
+            "cause": cause, "eaten": eaten}
+
+
+def play_chunk(policy, seeds, width, height, max_ticks):
+    """Worker entry point: plays the games for ``seeds`` and returns their results."""
+    return [play_game(policy, seed, width, height, max_ticks) for seed in seeds]
+
+
+def load_results(path, config):
+    """Results already in ``path`` for a run with ``config``; [] if there is no file yet.
+
+    Games outside ``config``'s seed range (left by a run with more
+    ``games``) are left out.
+    """
+    if not os.path.exists(path):
+        return []
+    results = []
+    with open(path) as f:
+        lines = f.read().splitlines()
+    if not lines:
+        return []
+    # More games can be added to a run; anything else must match
+    try:
+        header = json.loads(lines[0])["config"]
+        keys = header.keys() | config.keys()
+    except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+        raise ResultsFileError(f"{path} is not a tournament results file") from None
+    differ = sorted(key for key in keys
+                    if key != "games" and header.get(key) != config.get(key))
+    if differ:
+        raise ConfigMismatch(f"{path} holds results for another run: " + ", ".join(
+            f"{key} {header.get(key)!r} there, {config.get(key)!r} now" for key in differ))
+    first = config["seed"]
+    for line in lines[1:]:
+        try:
+            result = json.loads(line)
+            wanted = first <= result["seed"] < first + config["games"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            break # A line cut short by the interruption; its chunk is played again
+        if wanted:
+            results.append(result)
+    return results
+
+
+def summarize(results):
+    """Summary statistics over a list of game results."""
+    summary = {"games": len(results)}
+    if not results:
+        return summary
+    for key in ("score", "length", "ticks"):
+        values = sorted(result[key] for result in results)
+        summary[key] = {
+            "mean": statistics.fmean(values),
+            "median": statistics.median(values),
+            "p90": values[min(len(values) - 1, round(0.9 * (len(values) - 1)))],
+            "max": values[-1],
+        }
+    causes = {}
+    for result in results:
+        causes[result["cause"]] = causes.get(result["cause"], 0) + 1
+    summary["causes"] = causes
+    summary["eaten"] = {name: sum(result["eaten"][name] for result in results) for name in FOOD_NAMES}
+    return summary
+
+
+def run(config, results_path=None, workers=None, chunk_size=CHUNK_SIZE, progress=None):
+    """Plays every game in ``config`` not yet in ``results_path``.
+
+    ``config`` has the policy name, board width and height, max ticks,
+    first seed and number of games. ``progress(done, total)`` is called
+    after every chunk. Returns all results, resumed ones included, and how
+    many games were played by this call.
+    """
+    results = load_results(results_path, config) if results_path else []
+    resumed = len(results)
+    done = {result["seed"] for result in results}
+    first = config["seed"]
+    seeds = [seed for seed in range(first, first + config["games"]) if seed not in done]
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    out = None
+    if results_path:
+        # Rewrite the file without a line cut short by an interruption, then append to it
+        temp_path = results_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(json.dumps({"config": config}) + "\n")
+            f.writelines(json.dumps(result) + "\n" for result in results)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, results_path)
+        out = open(results_path, "a")
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            queued = iter(chunks)
+            while True:
+                # Keep a bounded number of chunks queued instead of submitting them all up front
+                for chunk in queued:
+                    pending.add(pool.submit(play_chunk, config["policy"], chunk, config["width"],
+                                            config["height"], config["max_ticks"]))
+                    if len(pending) >= workers * IN_FLIGHT:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    chunk_results = future.result()
+                    results.extend(chunk_results)
+                    if out is not None:
+                        out.write("".join(json.dumps(result) + "\n" for result in chunk_results))
+                        out.flush()
+                    if progress is not None:
+                        progress(len(results), config["games"])
+    finally:
+        if out is not None:
+            out.close()
+    return results, len(results) - resumed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many seeded games in parallel and summarize them")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--policy", default="greedy", help=f"{', '.join(POLICIES)} or module:factory")
+    parser.add_argument("--width", type=int, default=30)
+    parser.add_argument("--height", type=int, default=20)
+    parser.add_argument("--max-ticks", type=int, default=100000, help="end a game after this many ticks")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i gets seed + i")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="games per task")
+    parser.add_argument("--results", help="JSON-lines file for per-game results; resumes from it")
+    parser.add_argument("--summary", help="write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        load_policy(args.policy) # Fail before starting workers
+    except (ValueError, ImportError, AttributeError) as e:
+        parser.error(str(e))
+    config = {"policy": args.policy, "width": args.width, "height": args.height,
+              "max_ticks": args.max_ticks, "seed": args.seed, "games": args.games}
+
+    def progress(done, total):
+        print(f"\r{done}/{total} games", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    try:
+        results, played = run(config, args.results, args.workers, args.chunk_size, progress)
+    except ConfigMismatch as e:
+        parser.error(f"{e}; use another --results file or the same options")
+    except ResultsFileError as e:
+        parser.error(f"{e}; use another --results file")
+    except KeyboardInterrupt:
+        print("\ninterrupted; run the same command again to resume" if args.results else "\ninterrupted",
+              file=sys.stderr)
+        return 130
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+
+    summary = summarize(results)
+    ticks = sum(result["ticks"] for result in results[len(results) - played:])
+    summary["elapsed_s"] = elapsed
+    print(f"{summary['games']} games of {args.policy} ({summary['games'] - played} resumed); "
+          f"played {played} in {elapsed:.1f} s ({played / max(elapsed, 1e-9):,.1f} games/s, "
+          f"{ticks / max(elapsed, 1e-9):,.0f} ticks/s)")
+    for key in ("score", "length", "ticks"):
+        if key in summary:
+            stats = summary[key]
+            print(f"{key:7s} mean {stats['mean']:10.1f}  median {stats['median']:8.1f}  "
+                  f"p90 {stats['p90']:8d}  max {stats['max']:8d}")
+    if results:
+        print("causes  " + ", ".join(f"{cause} {count}" for cause, count in sorted(summary["causes"].items())))
+        print("eaten   " + ", ".join(f"{name} {count}" for name, count in summary["eaten"].items()))
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
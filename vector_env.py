@@ -0,0 +1,283 @@
+"""Gym-style vectorized environments for training agents on the snake rules.
+
+``SnakeVecEnv`` steps a batch of games in this process on a
+``simulation.BatchSimulation``. ``SharedMemoryVecEnv`` splits the batch over
+worker processes. Observations, rewards, flags and actions all live in one
+``multiprocessing.shared_memory`` block. Each worker writes its slice of the
+batch in place, and only one-byte commands go through the pipes, so results
+come back without pickling or copying.
+
+Both follow the Gymnasium vector API without depending on it::
+
+    env = SharedMemoryVecEnv(1024, workers=4, seed=0)
+    obs, info = env.reset()
+    obs, rewards, terminated, truncated, info = env.step(actions)
+
+``actions`` holds an index into DIRECTIONS per game, or -1 to keep going.
+``obs["board"]`` is a ``(n, height, width)`` uint8 grid of EMPTY, BODY,
+HEAD and FOOD. ``obs["features"]`` is ``(n, len(FEATURES))`` float32. A
+game that ends is reset in the same step. Its final score is in
+``info["final_score"]``, which is -1 for games that didn't end. The arrays
+returned are the env's own buffers and are overwritten by the next step;
+copy whatever you keep.
+"""
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError:  # Only the environments need numpy
+    np = None
+
+from simulation import GRID_HEIGHT, GRID_WIDTH, BatchSimulation
+
+# --- Board Codes ---
+EMPTY = 0
+BODY = 1
+HEAD = 2
+FOOD = 3
+
+FEATURES = ("head_x", "head_y", "food_x", "food_y", "up", "right", "down", "left", "length")
+MAX_TICKS = 10000 # Games still going after this many ticks are truncated
+DEATH_REWARD = -1.0 # Reward for the step a game dies; eating gives the food's power
+
+
+def _layout(n, width, height):
+    """Name, shape and dtype of every array in the shared block."""
+    return [
+        ("board", (n, height, width), "uint8"),
+        ("features", (n, len(FEATURES)), "float32"),
+        ("rewards", (n,), "float32"),
+        ("terminated", (n,), "bool"),
+        ("truncated", (n,), "bool"),
+        ("final_score", (n,), "int32"),
+        ("actions", (n,), "int8"),
+    ]
+
+
+class SharedArrays:
+    """NumPy arrays laid out in one shared memory block.
+
+    Without ``name`` a new block is created; with it an existing one is
+    attached, e.g. in a worker. ``arrays`` maps each name in ``layout`` to
+    its array.
+    """
+    ALIGN = 64
+
+    def __init__(self, layout, name=None):
+        offsets, size = [], 0
+        for _, shape, dtype in layout:
+            offsets.append(size)
+            size += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // self.ALIGN) * self.ALIGN
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.layout = layout
+        self.arrays = {key: np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+                       for (key, shape, dtype), offset in zip(layout, offsets)}
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        """Detaches from the block; the arrays can't be used after this."""
+        self.arrays = {}
+        self.shm.close()
+
+    def unlink(self):
+        """Frees the block once every process has closed it."""
+        self.shm.unlink()
+
+
+class SnakeVecEnv:
+    """``n`` games stepped together in this process.
+
+    ``buffers`` maps the names from the shared layout to arrays of the
+    right shape to write into; by default the env allocates its own.
+    """
+    def __init__(self, n, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None, max_ticks=MAX_TICKS, buffers=None):
+        if np is None:
+            raise ImportError("SnakeVecEnv requires numpy")
+        self.n = n
+        self.width = width
+        self.height = height
+        self.max_ticks = max_ticks
+        self.sim = BatchSimulation(n, width, height, seed=seed)
+        if buffers is None:
+            buffers = {key: np.zeros(shape, dtype=dtype) for key, shape, dtype in _layout(n, width, height)}
+        self.buffers = buffers
+        self._rows = np.arange(n)
+        self._scale = np.array([1.0 / width, 1.0 / height], dtype=np.float32)
+
+    @property
+    def observations(self):
+        return {"board": self.buffers["board"], "features": self.buffers["features"]}
+
+    def _observe(self):
+        """Writes every game's board and features into the buffers."""
+        sim, rows = self.sim, self._rows
+        board = self.buffers["board"].reshape(self.n, -1)
+        np.copyto(board, sim.occupied, casting="unsafe") # BODY where occupied
+        heads = sim.heads()
+        board[rows, heads] = HEAD
+        food = sim.food_pos
+        has_food = food >= 0
+        board[rows[has_food], food[has_food]] = FOOD
+
+        features = self.buffers["features"]
+        features[:, 0] = heads % self.width
+        features[:, 1] = heads // self.width
+        features[:, 2] = np.where(has_food, food % self.width, -self.width)
+        features[:, 3] = np.where(has_food, food // self.width, -self.height)
+        features[:, 0:2] *= self._scale
+        features[:, 2:4] *= self._scale
+        features[:, 4:8] = 0.0
+        features[rows, 4 + sim.direction] = 1.0
+        features[:, 8] = sim.length / float(self.width * self.height)
+
+    def reset(self):
+        """Starts every game over; returns ``(observations, info)``."""
+        self.sim.reset()
+        self.buffers["rewards"][:] = 0.0
+        self.buffers["terminated"][:] = False
+        self.buffers["truncated"][:] = False
+        self.buffers["final_score"][:] = -1
+        self._observe()
+        return self.observations, {"final_score": self.buffers["final_score"]}
+
+    def step(self, actions):
+        """Advances every game one tick; returns ``(observations, rewards, terminated, truncated, info)``."""
+        sim = self.sim
+        score = sim.score.copy()
+        ate, died = sim.step(actions)
+        rewards = self.buffers["rewards"]
+        rewards[:] = sim.score - score
+        rewards[died] = DEATH_REWARD
+        terminated, truncated = self.buffers["terminated"], self.buffers["truncated"]
+        np.copyto(terminated, died)
+        np.logical_and(sim.alive, sim.ticks >= self.max_ticks, out=truncated)
+        done = terminated | truncated
+        final_score = self.buffers["final_score"]
+        final_score[:] = -1
+        final_score[done] = sim.score[done]
+        if done.any():
+            sim.reset(done)
+        self._observe()
+        return self.observations, rewards, terminated, truncated, {"final_score": final_score}
+
+    def close(self):
+        """Nothing to release; here for parity with SharedMemoryVecEnv."""
+
+
+# --- Worker Commands ---
+STEP = b"s"
+RESET = b"r"
+CLOSE = b"c"
+
+
+def _worker(conn, name, layout, start, stop, width, height, seed, max_ticks):
+    """Runs games ``start:stop`` of the batch, reading actions from and writing results to the shared block."""
+    shared = SharedArrays(layout, name)
+    buffers = {key: array[start:stop] for key, array in shared.arrays.items()}
+    env = SnakeVecEnv(stop - start, width, height, seed, max_ticks, buffers)
+    try:
+        while True:
+            command = conn.recv_bytes()
+            if command == STEP:
+                env.step(buffers["actions"])
+            elif command == RESET:
+                env.reset()
+            else:
+                break
+            conn.send_bytes(b"")
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del env, buffers
+        shared.close()
+
+
+class SharedMemoryVecEnv:
+    """``n`` games split over ``workers`` processes, with results in shared memory.
+
+    ``step`` copies the actions into the shared block, wakes every worker
+    and waits for all of them; the worker processes step their games in
+    parallel. ``close`` (or the context manager) stops them and frees the
+    block.
+    """
+    def __init__(self, n, workers=None, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None, max_ticks=MAX_TICKS,
+                 context=None):
+        if np is None:
+            raise ImportError("SharedMemoryVecEnv requires numpy")
+        workers = max(1, min(workers or os.cpu_count() or 1, n))
+        self.n = n
+        self.width = width
+        self.height = height
+        self.workers = workers
+        layout = _layout(n, width, height)
+        self.shared = SharedArrays(layout)
+        self.buffers = self.shared.arrays
+        ctx = context or multiprocessing.get_context()
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        bounds = [n * i // workers for i in range(workers + 1)]
+        self._conns, self._processes = [], []
+        for i in range(workers):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_worker, name=f"snake-env-{i}", daemon=True,
+                                  args=(child, self.shared.name, layout, bounds[i], bounds[i + 1],
+                                        width, height, seeds[i], max_ticks))
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+        self._closed = False
+
+    @property
+    def observations(self):
+        return {"board": self.buffers["board"], "features": self.buffers["features"]}
+
+    def _command(self, command):
+        for conn in self._conns:
+            conn.send_bytes(command)
+        for conn in self._conns:
+            conn.recv_bytes()
+
+    def reset(self):
+        """Starts every game over; returns ``(observations, info)``."""
+        self._command(RESET)
+        return self.observations, {"final_score": self.buffers["final_score"]}
+
+    def step(self, actions):
+        """Advances every game one tick; returns ``(observations, rewards, terminated, truncated, info)``."""
+        self.buffers["actions"][:] = actions
+        self._command(STEP)
+        buffers = self.buffers
+        return (self.observations, buffers["rewards"], buffers["terminated"], buffers["truncated"],
+                {"final_score": buffers["final_score"]})
+
+    def close(self):
+        """Stops the workers and frees the shared memory; arrays it returned are invalid after this."""
+        if self._closed:
+            return
+        self._closed = True
+        for conn in self._conns:
+            try:
+                conn.send_bytes(CLOSE)
+            except OSError:
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.buffers = {}
+        self.shared.close()
+        self.shared.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()